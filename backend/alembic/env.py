@@ -1,6 +1,6 @@
 """
 Configuration Alembic pour Pinarr
-Ce fichier configure Alembic pour fonctionner avec notre base de données SQLite
+Ce fichier configure Alembic pour fonctionner avec notre base de données (SQLite ou PostgreSQL)
 """
 
 import os
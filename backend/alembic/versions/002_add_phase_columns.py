@@ -19,8 +19,7 @@ depends_on = None
 
 def upgrade() -> None:
     connection = op.get_bind()
-    result = connection.execute(sa.text("PRAGMA table_info(bottles)")).fetchall()
-    existing_cols = {row[1] for row in result}
+    existing_cols = {col["name"] for col in sa.inspect(connection).get_columns("bottles")}
 
     if "jeunesse_end" not in existing_cols:
         op.add_column("bottles", sa.Column("jeunesse_end", sa.Integer(), nullable=True))
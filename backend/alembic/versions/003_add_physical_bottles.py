@@ -19,18 +19,12 @@ depends_on = None
 
 
 def _table_exists(connection, table_name):
-    result = connection.execute(
-        sa.text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
-        {"name": table_name}
-    ).fetchone()
-    return result is not None
+    return sa.inspect(connection).has_table(table_name)
 
 
 def _column_exists(connection, table_name, column_name):
-    rows = connection.execute(
-        sa.text(f"PRAGMA table_info({table_name})")
-    ).fetchall()
-    return any(row[1] == column_name for row in rows)
+    columns = sa.inspect(connection).get_columns(table_name)
+    return any(col["name"] == column_name for col in columns)
 
 
 def upgrade():
@@ -152,7 +146,11 @@ def upgrade():
     # ── 4. Supprimer la colonne bottle_id de positions (ancienne FK) ──
     # Seulement si elle existe (DB legacy)
     if _column_exists(connection, "positions", "bottle_id"):
-        # SQLite-only: reconstruction manuelle
+        if connection.dialect.name != "sqlite":
+            op.drop_column("positions", "bottle_id")
+            return
+
+        # SQLite : reconstruction manuelle
         connection.execute(sa.text("""
             CREATE TABLE positions_new (
                 id INTEGER NOT NULL,
@@ -191,6 +189,18 @@ def downgrade():
         """)
     )
 
+    if connection.dialect.name != "sqlite":
+        op.drop_column("positions", "physical_bottle_id")
+    else:
+        _rebuild_positions_with_bottle_id(connection)
+
+    op.drop_index("ix_physical_bottles_position_id", "physical_bottles")
+    op.drop_index("ix_physical_bottles_bottle_id", "physical_bottles")
+    op.drop_index("ix_physical_bottles_qr_code", "physical_bottles")
+    op.drop_table("physical_bottles")
+
+
+def _rebuild_positions_with_bottle_id(connection):
     # SQLite: reconstruction manuelle pour supprimer physical_bottle_id
     connection.execute(sa.text("""
         CREATE TABLE positions_new (
@@ -210,8 +220,3 @@ def downgrade():
     """))
     connection.execute(sa.text("DROP TABLE positions"))
     connection.execute(sa.text("ALTER TABLE positions_new RENAME TO positions"))
-
-    op.drop_index("ix_physical_bottles_position_id", "physical_bottles")
-    op.drop_index("ix_physical_bottles_bottle_id", "physical_bottles")
-    op.drop_index("ix_physical_bottles_qr_code", "physical_bottles")
-    op.drop_table("physical_bottles")
@@ -20,16 +20,11 @@ depends_on = None
 
 
 def _has_col(connection, table, col):
-    rows = connection.execute(sa.text(f"PRAGMA table_info({table})")).fetchall()
-    return any(r[1] == col for r in rows)
+    return any(c["name"] == col for c in sa.inspect(connection).get_columns(table))
 
 
 def _has_table(connection, table):
-    rows = connection.execute(
-        sa.text("SELECT name FROM sqlite_master WHERE type='table' AND name=:t"),
-        {"t": table}
-    ).fetchall()
-    return bool(rows)
+    return sa.inspect(connection).has_table(table)
 
 
 def upgrade():
@@ -43,6 +38,11 @@ def upgrade():
     if not _has_col(connection, "positions", "physical_bottle_id"):
         return
 
+    # Les autres bases suppriment la colonne et sa contrainte directement
+    if connection.dialect.name != "sqlite":
+        op.drop_column("positions", "physical_bottle_id")
+        return
+
     # Reconstruction manuelle car SQLite n'aime pas DROP COLUMN + FK
     # 1. Créer la nouvelle table sans physical_bottle_id
     connection.execute(
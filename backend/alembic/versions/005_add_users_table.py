@@ -17,11 +17,7 @@ depends_on = None
 
 
 def _table_exists(connection, table_name):
-    result = connection.execute(
-        sa.text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
-        {"name": table_name}
-    ).fetchone()
-    return result is not None
+    return sa.inspect(connection).has_table(table_name)
 
 
 def upgrade():
@@ -0,0 +1,72 @@
+"""Localisation dénormalisée des positions (code, rangée, colonne, cave)
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+LOCATION_COLUMNS = [
+    ("code", sa.String()),
+    ("row_name", sa.String()),
+    ("column_id", sa.Integer()),
+    ("column_name", sa.String()),
+    ("cave_id", sa.Integer()),
+    ("cave_name", sa.String()),
+]
+
+
+def _column_exists(connection, table_name, column_name):
+    columns = sa.inspect(connection).get_columns(table_name)
+    return any(col["name"] == column_name for col in columns)
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    for name, type_ in LOCATION_COLUMNS:
+        if not _column_exists(connection, "positions", name):
+            op.add_column("positions", sa.Column(name, type_, nullable=True))
+
+    # Remplir depuis la hiérarchie rangée → colonne → cave
+    connection.execute(sa.text("""
+        UPDATE positions SET
+            row_name = (SELECT r.name FROM cave_rows r WHERE r.id = positions.row_id),
+            column_id = (SELECT r.column_id FROM cave_rows r WHERE r.id = positions.row_id),
+            column_name = (
+                SELECT c.name FROM cave_rows r
+                JOIN cave_columns c ON c.id = r.column_id
+                WHERE r.id = positions.row_id
+            ),
+            cave_id = (
+                SELECT c.cave_id FROM cave_rows r
+                JOIN cave_columns c ON c.id = r.column_id
+                WHERE r.id = positions.row_id
+            ),
+            cave_name = (
+                SELECT cv.name FROM cave_rows r
+                JOIN cave_columns c ON c.id = r.column_id
+                JOIN caves cv ON cv.id = c.cave_id
+                WHERE r.id = positions.row_id
+            )
+    """))
+    connection.execute(sa.text("""
+        UPDATE positions
+        SET code = column_name || '-' || row_name
+            || '-L' || CAST(line AS TEXT) || '-P' || CAST(position AS TEXT)
+    """))
+
+
+def downgrade():
+    with op.batch_alter_table("positions") as batch_op:
+        for name, _ in reversed(LOCATION_COLUMNS):
+            batch_op.drop_column(name)
@@ -0,0 +1,44 @@
+"""Cache négatif du géocodage des régions
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(connection, table_name):
+    return sa.inspect(connection).has_table(table_name)
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    if not _table_exists(connection, "geocode_misses"):
+        op.create_table(
+            "geocode_misses",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="1"),
+            sa.Column("last_attempt", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_geocode_misses_id", "geocode_misses", ["id"])
+        op.create_index(
+            "ix_geocode_misses_name", "geocode_misses", ["name"], unique=True
+        )
+
+
+def downgrade():
+    op.drop_index("ix_geocode_misses_name", "geocode_misses")
+    op.drop_index("ix_geocode_misses_id", "geocode_misses")
+    op.drop_table("geocode_misses")
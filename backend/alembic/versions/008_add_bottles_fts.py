@@ -0,0 +1,64 @@
+"""Index plein texte FTS5 des vins, synchronisé par triggers
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "name, domaine, cepage, region, tags, description"
+NEW = "new.name, new.domaine, new.cepage, new.region, new.tags, new.description"
+OLD = "old.name, old.domaine, old.cepage, old.region, old.tags, old.description"
+
+
+def upgrade():
+    # PostgreSQL : index de trigrammes créé par 013
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    op.execute(
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS bottles_fts USING fts5(
+            {COLUMNS},
+            content='bottles', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )"""
+    )
+    op.execute(
+        f"""CREATE TRIGGER IF NOT EXISTS bottles_fts_ai AFTER INSERT ON bottles BEGIN
+            INSERT INTO bottles_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW});
+        END"""
+    )
+    op.execute(
+        f"""CREATE TRIGGER IF NOT EXISTS bottles_fts_ad AFTER DELETE ON bottles BEGIN
+            INSERT INTO bottles_fts(bottles_fts, rowid, {COLUMNS})
+            VALUES ('delete', old.id, {OLD});
+        END"""
+    )
+    op.execute(
+        f"""CREATE TRIGGER IF NOT EXISTS bottles_fts_au AFTER UPDATE OF {COLUMNS} ON bottles BEGIN
+            INSERT INTO bottles_fts(bottles_fts, rowid, {COLUMNS})
+            VALUES ('delete', old.id, {OLD});
+            INSERT INTO bottles_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW});
+        END"""
+    )
+    # Indexer les vins existants
+    op.execute("INSERT INTO bottles_fts(bottles_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS bottles_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS bottles_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS bottles_fts_ai")
+    op.execute("DROP TABLE IF EXISTS bottles_fts")
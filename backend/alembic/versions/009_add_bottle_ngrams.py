@@ -0,0 +1,40 @@
+"""Index de trigrammes pour la détection de doublons
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 18:00:00.000000
+
+L'index est rempli au démarrage de l'application (normalisation en Python).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(connection, table_name):
+    return sa.inspect(connection).has_table(table_name)
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    if not _table_exists(connection, "bottle_ngrams"):
+        op.create_table(
+            "bottle_ngrams",
+            sa.Column("year", sa.Integer(), nullable=False),
+            sa.Column("gram", sa.String(), nullable=False),
+            sa.Column("bottle_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["bottle_id"], ["bottles.id"]),
+            sa.PrimaryKeyConstraint("year", "gram", "bottle_id"),
+            sqlite_with_rowid=False,
+        )
+
+
+def downgrade():
+    op.drop_table("bottle_ngrams")
@@ -0,0 +1,37 @@
+"""Index des colonnes de filtres et facettes du catalogue
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+FACET_COLUMNS = ("type", "country", "region", "year")
+
+
+def _index_exists(connection, table_name, index_name):
+    indexes = sa.inspect(connection).get_indexes(table_name)
+    return any(ix["name"] == index_name for ix in indexes)
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    for column in FACET_COLUMNS:
+        name = f"ix_bottles_{column}"
+        if not _index_exists(connection, "bottles", name):
+            op.create_index(name, "bottles", [column])
+
+
+def downgrade():
+    for column in FACET_COLUMNS:
+        op.drop_index(f"ix_bottles_{column}", "bottles")
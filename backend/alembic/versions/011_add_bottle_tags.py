@@ -0,0 +1,87 @@
+"""Tags normalisés (tags, bottle_tags) alimentés depuis bottles.tags
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 20:00:00.000000
+
+La colonne bottles.tags est conservée : elle reste la forme exposée par
+l'API et indexée par bottles_fts.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(connection, table_name):
+    return sa.inspect(connection).has_table(table_name)
+
+
+def _split_tags(text):
+    """Même découpage que services.tag_service.split_tags."""
+    tags = {}
+    for part in (text or "").split(","):
+        name = " ".join(part.split())
+        if name:
+            tags.setdefault(name.lower(), name)
+    return tags
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    if not _table_exists(connection, "tags"):
+        op.create_table(
+            "tags",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("key", sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_tags_key", "tags", ["key"], unique=True)
+
+    if not _table_exists(connection, "bottle_tags"):
+        op.create_table(
+            "bottle_tags",
+            sa.Column("tag_id", sa.Integer(), nullable=False),
+            sa.Column("bottle_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["tag_id"], ["tags.id"]),
+            sa.ForeignKeyConstraint(["bottle_id"], ["bottles.id"]),
+            sa.PrimaryKeyConstraint("tag_id", "bottle_id"),
+            sqlite_with_rowid=False,
+        )
+        op.create_index("ix_bottle_tags_bottle_id", "bottle_tags", ["bottle_id"])
+
+        # Reprise des chaînes existantes
+        rows = connection.execute(
+            sa.text("SELECT id, tags FROM bottles WHERE tags IS NOT NULL AND tags != ''")
+        ).fetchall()
+        tag_ids = {}
+        for bottle_id, text in rows:
+            for key, name in _split_tags(text).items():
+                if key not in tag_ids:
+                    tag_ids[key] = connection.execute(
+                        sa.text(
+                            "INSERT INTO tags (name, key) VALUES (:name, :key) RETURNING id"
+                        ),
+                        {"name": name, "key": key},
+                    ).scalar()
+                connection.execute(
+                    sa.text(
+                        "INSERT INTO bottle_tags (tag_id, bottle_id) "
+                        "VALUES (:tag_id, :bottle_id)"
+                    ),
+                    {"tag_id": tag_ids[key], "bottle_id": bottle_id},
+                )
+
+
+def downgrade():
+    op.drop_index("ix_bottle_tags_bottle_id", "bottle_tags")
+    op.drop_table("bottle_tags")
+    op.drop_index("ix_tags_key", "tags")
+    op.drop_table("tags")
@@ -0,0 +1,109 @@
+"""Index secondaires des bouteilles physiques, positions et de la hiérarchie de cave
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18 21:00:00.000000
+
+Les index remplacent des parcours complets relevés par
+scripts/check-query-plans.py. L'index unique (row_id, line, position)
+impose qu'un emplacement n'existe qu'une fois par rangée : les doublons
+éventuels sont fusionnés avant sa création.
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+# (nom, table, colonnes, unique)
+INDEXES = (
+    ("ix_physical_bottles_bottle_id_status", "physical_bottles", ["bottle_id", "status"], False),
+    ("ix_physical_bottles_position_id", "physical_bottles", ["position_id"], False),
+    ("ix_physical_bottles_status", "physical_bottles", ["status"], False),
+    ("ix_positions_row_id_line_position", "positions", ["row_id", "line", "position"], True),
+    ("ix_cave_rows_column_id", "cave_rows", ["column_id"], False),
+    ("ix_cave_columns_cave_id", "cave_columns", ["cave_id"], False),
+    ("ix_bottle_ngrams_bottle_id", "bottle_ngrams", ["bottle_id"], False),
+    ("ix_bottles_image_path", "bottles", ["image_path"], False),
+)
+
+# Préfixe de ix_physical_bottles_bottle_id_status (créé par 003)
+REDUNDANT_INDEX = "ix_physical_bottles_bottle_id"
+
+
+def _index_exists(connection, table_name, index_name):
+    indexes = sa.inspect(connection).get_indexes(table_name)
+    return any(ix["name"] == index_name for ix in indexes)
+
+
+def _merge_duplicate_positions(connection):
+    """Garde la plus ancienne position de chaque emplacement en double.
+
+    Les bouteilles des doublons sont reportées sur la position conservée si
+    elle est libre, sinon retirées de la grille (elles restent en cave).
+    """
+    duplicates = connection.execute(sa.text(
+        "SELECT row_id, line, position, min(id) FROM positions "
+        "GROUP BY row_id, line, position HAVING count(*) > 1"
+    )).fetchall()
+
+    for row_id, line, position, keep_id in duplicates:
+        extra_ids = [
+            r[0] for r in connection.execute(
+                sa.text(
+                    "SELECT id FROM positions WHERE row_id = :row_id "
+                    "AND line = :line AND position = :position AND id != :keep_id"
+                ),
+                {"row_id": row_id, "line": line, "position": position, "keep_id": keep_id},
+            )
+        ]
+        for extra_id in extra_ids:
+            occupied = connection.execute(
+                sa.text("SELECT 1 FROM physical_bottles WHERE position_id = :id"),
+                {"id": keep_id},
+            ).fetchone()
+            connection.execute(
+                sa.text(
+                    "UPDATE physical_bottles SET position_id = :target "
+                    "WHERE position_id = :extra_id"
+                ),
+                {"target": None if occupied else keep_id, "extra_id": extra_id},
+            )
+            connection.execute(
+                sa.text("DELETE FROM positions WHERE id = :id"), {"id": extra_id}
+            )
+
+    if duplicates:
+        log.info("%d emplacement(s) en double fusionné(s)", len(duplicates))
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    if not _index_exists(connection, "positions", "ix_positions_row_id_line_position"):
+        _merge_duplicate_positions(connection)
+
+    for name, table, columns, unique in INDEXES:
+        if not _index_exists(connection, table, name):
+            op.create_index(name, table, columns, unique=unique)
+
+    if _index_exists(connection, "physical_bottles", REDUNDANT_INDEX):
+        op.drop_index(REDUNDANT_INDEX, "physical_bottles")
+
+
+def downgrade():
+    connection = op.get_bind()
+
+    if not _index_exists(connection, "physical_bottles", REDUNDANT_INDEX):
+        op.create_index(REDUNDANT_INDEX, "physical_bottles", ["bottle_id"])
+
+    for name, table, _columns, _unique in reversed(INDEXES):
+        op.drop_index(name, table)
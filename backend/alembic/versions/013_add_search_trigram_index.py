@@ -0,0 +1,48 @@
+"""Index de recherche des vins sous PostgreSQL (pg_trgm, GIN)
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18 23:00:00.000000
+
+Pendant PostgreSQL de bottles_fts (008) : un index GIN de trigrammes sur le
+texte replié (minuscules, sans accents) des colonnes recherchées. Sans
+effet sous SQLite, qui garde son index FTS5.
+"""
+
+from alembic import op
+
+
+revision = "013"
+down_revision = "012"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("name", "domaine", "cepage", "region", "tags", "description")
+DOCUMENT = "pinarr_fold({})".format(
+    " || ' ' || ".join(f"coalesce({c}, '')" for c in COLUMNS)
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute(
+        """CREATE OR REPLACE FUNCTION pinarr_fold(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1)) $$"""
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_bottles_search_trgm "
+        f"ON bottles USING gin ({DOCUMENT} gin_trgm_ops)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("DROP INDEX IF EXISTS ix_bottles_search_trgm")
+    op.execute("DROP FUNCTION IF EXISTS pinarr_fold(text)")
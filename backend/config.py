@@ -1,6 +1,7 @@
 """Configuration centralisée de l'application Pinarr."""
 
 import os
+import tempfile
 from pathlib import Path
 
 # Répertoire de base du projet
@@ -9,6 +10,28 @@ BASE_DIR = Path(__file__).parent
 # Configuration base de données
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pinarr.db")
 
+# Profil SQLite (pragmas appliqués à chaque nouvelle connexion)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # WAL | DELETE (volume réseau)
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL est sûr en WAL
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "16"))  # par connexion
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "128"))  # 0 = désactivé
+SQLITE_FOREIGN_KEYS = os.getenv("SQLITE_FOREIGN_KEYS", "1") == "1"
+
+# Pool de connexions (lectures concurrentes ; en WAL un seul écrivain à la fois)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "8"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # secondes
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # secondes, PostgreSQL
+
+# Écrivains en parallèle : SQLite n'en admet qu'un, PostgreSQL verrouille par ligne
+DB_WRITE_WORKERS = int(
+    os.getenv("DB_WRITE_WORKERS", "1" if DATABASE_URL.startswith("sqlite") else "4")
+)
+
+# Écrivain unique : mutations des routes exécutées une à une par un thread dédié
+WRITE_QUEUE_LIMIT = int(os.getenv("WRITE_QUEUE_LIMIT", "32"))  # au-delà : 503
+
 # Configuration uploads
 UPLOAD_DIR = Path("/app/uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -25,6 +48,39 @@ ALLOWED_MIME_TYPES = {
     "image/heif",
 }
 
+# Variantes redimensionnées servies via /uploads/{name}?w=
+IMAGE_VARIANT_WIDTHS = (96, 320, 1920)
+IMAGE_VARIANT_DIR = UPLOAD_DIR / ".variants"
+IMAGE_VARIANT_CACHE_MB = int(os.getenv("IMAGE_VARIANT_CACHE_MB", "256"))
+
+# Nettoyage des images orphelines (non référencées par bottles.image_path)
+UPLOAD_ORPHAN_GRACE_HOURS = int(os.getenv("UPLOAD_ORPHAN_GRACE_HOURS", "24"))
+UPLOAD_SWEEP_INTERVAL_HOURS = int(os.getenv("UPLOAD_SWEEP_INTERVAL_HOURS", "6"))  # 0 = désactivé
+
+# Traitement d'images (pool de processus borné)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))  # 0 = conversion dans le thread
+IMAGE_QUEUE_LIMIT = int(os.getenv("IMAGE_QUEUE_LIMIT", "8"))
+
+# Étiquettes PDF
+LABEL_WORKERS = int(os.getenv("LABEL_WORKERS", "2"))  # 0 = rendu dans le thread
+LABEL_CACHE_MB = int(os.getenv("LABEL_CACHE_MB", "32"))
+
+# Géocodage des régions (tâche de fond, une requête à la fois)
+GEOCODER = os.getenv("GEOCODER", "nominatim")  # nominatim | offline
+GEOCODER_URL = os.getenv("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODER_USER_AGENT = os.getenv("GEOCODER_USER_AGENT", "Pinarr (self-hosted wine cellar)")
+GEOCODER_MIN_INTERVAL = float(os.getenv("GEOCODER_MIN_INTERVAL", "1.1"))  # secondes
+GEOCODE_RETRY_DAYS = int(os.getenv("GEOCODE_RETRY_DAYS", "30"))  # cache négatif
+GEOCODE_SCAN_INTERVAL_MINUTES = int(os.getenv("GEOCODE_SCAN_INTERVAL_MINUTES", "60"))
+GEOCODE_MAX_NETWORK_ERRORS = 3  # erreurs réseau consécutives avant d'interrompre une passe
+
+# Serveur multi-workers (gunicorn) : fichiers partagés par les processus d'une instance
+RUN_DIR = Path(os.getenv("RUN_DIR", tempfile.gettempdir()))
+BACKGROUND_LOCK_FILE = RUN_DIR / "pinarr-background.lock"  # worker des tâches de fond
+BACKGROUND_TAKEOVER_SECONDS = int(os.getenv("BACKGROUND_TAKEOVER_SECONDS", "30"))
+GEOCODE_WAKEUP_FILE = RUN_DIR / "pinarr-geocode.wakeup"  # signal des autres workers
+GEOCODE_WAKEUP_POLL_SECONDS = 2
+
 # CORS
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 
@@ -1,10 +1,26 @@
 # backend/database.py
 import os
+import sqlite3
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from config import (
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_WRITE_WORKERS,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_MB,
+    SQLITE_FOREIGN_KEYS,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE_MB,
+    SQLITE_SYNCHRONOUS,
+)
+
 # Utiliser DATABASE_URL depuis l'environnement ou valeur par défaut
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./pinarr.db")
 
@@ -16,6 +32,9 @@ if DATABASE_URL.startswith("sqlite:///./"):
         db_file = db_file[5:]
     db_path = f"sqlite:////app/data/{db_file}"
     SQLALCHEMY_DATABASE_URL = db_path
+elif DATABASE_URL.startswith(("postgres://", "postgresql://")):
+    # Pilote psycopg (v3) : le même sert aux moteurs synchrones et asynchrones
+    SQLALCHEMY_DATABASE_URL = "postgresql+psycopg://" + DATABASE_URL.split("://", 1)[1]
 else:
     SQLALCHEMY_DATABASE_URL = DATABASE_URL
 
@@ -26,11 +45,126 @@ if SQLALCHEMY_DATABASE_URL.startswith("sqlite://"):
     if db_dir and not os.path.exists(db_dir):
         os.makedirs(db_dir, exist_ok=True)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+# Pragmas de connexion : busy_timeout en premier, le passage en WAL pouvant
+# attendre le verrou d'une autre connexion
+SQLITE_PRAGMAS = (
+    f"busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+    f"journal_mode = {SQLITE_JOURNAL_MODE}",
+    f"synchronous = {SQLITE_SYNCHRONOUS}",
+    f"cache_size = {-SQLITE_CACHE_SIZE_MB * 1024}",  # négatif = en Kio
+    f"mmap_size = {SQLITE_MMAP_SIZE_MB * 1024 * 1024}",
+    "temp_store = MEMORY",
+    f"foreign_keys = {'ON' if SQLITE_FOREIGN_KEYS else 'OFF'}",
+)
+
+_is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+_is_sqlite_memory = _is_sqlite and (
+    ":memory:" in SQLALCHEMY_DATABASE_URL or SQLALCHEMY_DATABASE_URL == "sqlite://"
 )
+_is_postgres = SQLALCHEMY_DATABASE_URL.startswith("postgresql")
+
+# SQLite n'admet qu'un écrivain à la fois, quel que soit DB_WRITE_WORKERS
+WRITE_WORKERS = 1 if _is_sqlite else max(1, DB_WRITE_WORKERS)
+
+engine_options = {}
+if not _is_sqlite_memory:
+    # Une connexion par thread de requête : les lectures avancent en parallèle
+    # (WAL), les écritures attendent leur tour dans busy_timeout
+    engine_options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+if not _is_sqlite:
+    # Serveur distant : connexions coupées (redémarrage, pare-feu) écartées
+    # avant usage et renouvelées périodiquement
+    engine_options.update(pool_pre_ping=True, pool_recycle=DB_POOL_RECYCLE)
+
+
+def _connect_args(read_only: bool = False) -> dict:
+    """Arguments du pilote pour chaque nouvelle connexion."""
+    if _is_sqlite:
+        return {
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+    if _is_postgres and read_only:
+        # Équivalent de query_only : toute écriture est refusée par le serveur
+        return {"options": "-c default_transaction_read_only=on"}
+    return {}
+
+
+def _apply_pragmas_on_connect(target_engine, read_only: bool = False) -> None:
+    """Applique le profil SQLite à chaque connexion ouverte par le moteur."""
+    pragmas = SQLITE_PRAGMAS + (("query_only = ON",) if read_only else ())
+
+    @event.listens_for(target_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(f"PRAGMA {pragma}")
+        finally:
+            cursor.close()
+
+
+def _create_engine(read_only: bool = False, **options):
+    """Moteur sur la base de l'application, profil SQLite appliqué à chaque connexion."""
+    new_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args=_connect_args(read_only),
+        **{**engine_options, **options},
+    )
+    if _is_sqlite:
+        _apply_pragmas_on_connect(new_engine, read_only)
+    return new_engine
+
+
+# Moteur général : tâches de fond, scripts, création du schéma
+engine = _create_engine()
+
+# Séparation lecture/écriture (sauf SQLite en mémoire : chaque moteur y
+# verrait une base différente)
+if _is_sqlite_memory:
+    read_engine = write_engine = engine
+else:
+    # Lectures des routes : connexions refusant toute écriture
+    read_engine = _create_engine(read_only=True)
+
+    # Écritures des routes : les connexions des threads écrivains (writer.py)
+    write_engine = _create_engine(pool_size=WRITE_WORKERS, max_overflow=0)
+
+    if _is_sqlite:
+        # Les transactions prennent le verrou dès BEGIN IMMEDIATE, où busy_timeout
+        # s'applique, au lieu de le réclamer en cours de transaction (SQLITE_BUSY
+        # immédiat en WAL si un autre écrivain est passé entre-temps)
+        @event.listens_for(write_engine, "connect")
+        def _disable_implicit_begin(dbapi_connection, connection_record):
+            # Le pilote sqlite3 n'émet plus ses propres BEGIN différés
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(write_engine, "begin")
+        def _begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+
+# Lectures asynchrones des routes chaudes (liste, cave, scan, carte) : pilote
+# aiosqlite (ou psycopg en mode asynchrone), les requêtes attendent sur la
+# boucle d'événements au lieu d'occuper un thread du threadpool
+ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=_connect_args(read_only=True), **engine_options
+)
+
+if _is_sqlite:
+    _apply_pragmas_on_connect(async_engine.sync_engine, read_only=True)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
 
@@ -60,3 +194,73 @@ def create_db_tables():
         )
 
     Base.metadata.create_all(bind=engine)
+
+    try:
+        from search_index import create_search_index
+    except ImportError:
+        from .search_index import create_search_index
+
+    with engine.begin() as connection:
+        create_search_index(connection)
+
+
+def check_database() -> None:
+    """Vérifie au démarrage le profil effectif de la base et le journalise.
+
+    Un journal WAL refusé (volume réseau, système de fichiers en lecture
+    seule), des références orphelines héritées ou, sous PostgreSQL, une
+    extension de recherche absente sont signalés sans bloquer.
+    """
+    if _is_postgres:
+        _check_postgres()
+        return
+    if not _is_sqlite:
+        return
+
+    with engine.connect() as connection:
+        def pragma(name):
+            return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+        journal_mode = str(pragma("journal_mode")).lower()
+        if not _is_sqlite_memory and journal_mode != SQLITE_JOURNAL_MODE.lower():
+            print(
+                f"[db] WARN journal_mode={journal_mode} au lieu de "
+                f"{SQLITE_JOURNAL_MODE} : les écritures bloqueront les lectures"
+            )
+
+        if SQLITE_FOREIGN_KEYS:
+            violations = connection.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+            if violations:
+                tables = sorted({row[0] for row in violations})
+                print(
+                    f"[db] WARN {len(violations)} référence(s) orpheline(s) "
+                    f"({', '.join(tables)})"
+                )
+
+        print(
+            f"[db] SQLite {sqlite3.sqlite_version} journal={journal_mode} "
+            f"synchronous={pragma('synchronous')} busy_timeout={pragma('busy_timeout')}ms "
+            f"foreign_keys={pragma('foreign_keys')} pool={DB_POOL_SIZE}+{DB_MAX_OVERFLOW}"
+        )
+
+
+def _check_postgres() -> None:
+    with engine.connect() as connection:
+        version = connection.exec_driver_sql("SHOW server_version").scalar()
+        extensions = {
+            row[0]
+            for row in connection.exec_driver_sql(
+                "SELECT extname FROM pg_extension WHERE extname IN ('pg_trgm', 'unaccent')"
+            )
+        }
+        missing = {"pg_trgm", "unaccent"} - extensions
+        if missing:
+            print(
+                f"[db] WARN extension(s) {', '.join(sorted(missing))} absente(s) : "
+                "recherche des vins indisponible (CREATE EXTENSION requis)"
+            )
+
+        print(
+            f"[db] PostgreSQL {version} pool={DB_POOL_SIZE}+{DB_MAX_OVERFLOW} "
+            f"écrivains={WRITE_WORKERS}"
+        )
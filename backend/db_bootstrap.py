@@ -6,60 +6,63 @@ Il détecte l'état de la DB et agit en conséquence :
 - DB vide          → crée les tables via SQLAlchemy, puis stamp Alembic HEAD
 - DB legacy        → détecte le schéma, stamp Alembic, puis upgrade head
 - DB versionnée    → alembic upgrade head classique
+
+SQLite ou PostgreSQL : l'état est lu par l'inspecteur SQLAlchemy. Sous
+PostgreSQL, un verrou consultatif sérialise les bootstraps concurrents.
 """
 
 import os
-import sqlite3
 import subprocess
 import sys
 
-HEAD = "005"
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+HEAD = "013"
+
+# Clé du verrou consultatif PostgreSQL : un seul bootstrap à la fois quand
+# plusieurs réplicas de l'API démarrent sur la même base
+BOOTSTRAP_LOCK_KEY = 0x50494E41  # "PINA"
 
 
-def _resolve_db_path() -> str:
+def _resolve_database_url() -> str:
     """Miroite exactement la logique de database.py."""
     database_url = os.getenv("DATABASE_URL", "sqlite:///./pinarr.db")
     if database_url.startswith("sqlite:///./"):
         db_file = database_url[12:]  # après "sqlite:///./"
         if db_file.startswith("data/"):
             db_file = db_file[5:]
-        return f"sqlite:////app/data/{db_file}".replace("sqlite://", "")
-    return database_url.replace("sqlite://", "")
+        return f"sqlite:////app/data/{db_file}"
+    if database_url.startswith(("postgres://", "postgresql://")):
+        return "postgresql+psycopg://" + database_url.split("://", 1)[1]
+    return database_url
 
 
-def _db_exists(db_path: str) -> bool:
-    conn = sqlite3.connect(db_path)
-    try:
-        c = conn.cursor()
-        c.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        return len(c.fetchall()) > 0
-    finally:
-        conn.close()
+def _db_exists(connection) -> bool:
+    return len(inspect(connection).get_table_names()) > 0
 
 
-def _detect_schema_state(conn: sqlite3.Connection) -> str:
+def _detect_schema_state(connection) -> str:
     """Détecte l'état du schéma.
-    Retours : fresh, 002, 003, 004, 005, unknown
+    Retours : fresh, 002, 003, 004, 005, 006, 007, 008, 009, 010, 011, 012, 013, unknown
     """
-    c = conn.cursor()
-    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = {row[0] for row in c.fetchall()}
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
 
     if not tables:
         return "fresh"
 
     if "alembic_version" in tables:
-        c.execute("SELECT version_num FROM alembic_version")
-        row = c.fetchone()
+        row = connection.execute(text("SELECT version_num FROM alembic_version")).fetchone()
         if row and row[0]:
             return row[0]
 
-    # Legacy detection (no alembic_version table)
+    # Legacy detection (no alembic_version table, bases SQLite uniquement)
     if "bottles" not in tables:
         return "unknown"
 
-    c.execute("PRAGMA table_info(bottles)")
-    cols = {col[1] for col in c.fetchall()}
+    cols = {col["name"] for col in inspector.get_columns("bottles")}
 
     if "jeunesse_end" not in cols:
         return "unknown"  # Pré-002 non supporté
@@ -67,12 +70,35 @@ def _detect_schema_state(conn: sqlite3.Connection) -> str:
     if "physical_bottles" not in tables:
         return "002"
 
-    # physical_bottles existe : différencier 003 / 004 / 005
+    # physical_bottles existe : différencier 003 à 012 (013 est sans effet sous SQLite)
+    pos_cols = {col["name"] for col in inspector.get_columns("positions")}
+    indexes = {
+        ix["name"]
+        for table in ("bottles", "positions")
+        for ix in inspector.get_indexes(table)
+    }
+
+    if "ix_positions_row_id_line_position" in indexes:
+        return "012"
+
+    if "bottle_tags" in tables:
+        return "011"
+
+    if "ix_bottles_type" in indexes:
+        return "010"
+
+    if "bottle_ngrams" in tables:
+        return "009"
+
+    if "bottles_fts" in tables:
+        return "008"
+
+    if "geocode_misses" in tables:
+        return "007"
+
     if "users" in tables:
-        return "005"
+        return "006" if "code" in pos_cols else "005"
 
-    c.execute("PRAGMA table_info(positions)")
-    pos_cols = {col[1] for col in c.fetchall()}
     return "003" if "physical_bottle_id" in pos_cols else "004"
 
 
@@ -94,27 +120,52 @@ def _create_tables() -> None:
 
 
 def bootstrap():
-    db_path = _resolve_db_path()
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    print(f"[DB]   Path: {db_path}")
+    database_url = _resolve_database_url()
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        db_path = url.database
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        print(f"[DB]   Path: {db_path}")
+    else:
+        print(f"[DB]   URL: {url.render_as_string(hide_password=True)}")
 
-    if not _db_exists(db_path):
+    engine = create_engine(database_url, poolclass=NullPool)
+    try:
+        with engine.connect() as lock_connection:
+            if engine.dialect.name == "postgresql":
+                lock_connection.execute(
+                    text("SELECT pg_advisory_lock(:key)"), {"key": BOOTSTRAP_LOCK_KEY}
+                )
+                lock_connection.commit()
+            try:
+                _bootstrap(engine)
+            finally:
+                if engine.dialect.name == "postgresql":
+                    lock_connection.execute(
+                        text("SELECT pg_advisory_unlock(:key)"), {"key": BOOTSTRAP_LOCK_KEY}
+                    )
+                    lock_connection.commit()
+    finally:
+        engine.dispose()
+
+
+def _bootstrap(engine) -> None:
+    with engine.connect() as connection:
+        exists = _db_exists(connection)
+    if not exists:
         _create_tables()
         _stamp(HEAD)
         print("[DB]   ✅ DB initiale prête.")
         return
 
-    conn = sqlite3.connect(db_path)
-    try:
-        state = _detect_schema_state(conn)
-    finally:
-        conn.close()
+    with engine.connect() as connection:
+        state = _detect_schema_state(connection)
     print(f"[DB]   State: {state}")
 
     if state == HEAD:
         _upgrade_head()
         print("[DB]   ✅ À jour.")
-    elif state in ("002", "003", "004"):
+    elif state in ("002", "003", "004", "005", "006", "007", "008", "009", "010", "011", "012"):
         _stamp(state)
         _upgrade_head()
         print("[DB]   ✅ Upgrade terminé.")
@@ -1,10 +1,11 @@
 """Dépendances FastAPI réutilisables."""
 
 from fastapi import Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import AsyncReadSessionLocal, ReadSessionLocal, SessionLocal
 from exceptions import PinarrException, handle_pinarr_exception
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -16,6 +17,21 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """Fournit une session en lecture seule (routes GET)."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Fournit une session asynchrone en lecture seule (routes `async def`)."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 async def pinarr_exception_handler(request, exc: PinarrException):
     """Gestionnaire d'exceptions personnalisé."""
     raise handle_pinarr_exception(exc)
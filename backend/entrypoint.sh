@@ -53,5 +53,8 @@ python3 /tmp/init_admin.py
 rm /tmp/init_admin.py
 
 echo "=== Lancement de l'application ==="
-# Lancer l'application
-exec uvicorn main:app --host 0.0.0.0 --port 8000
+# Lancer l'application (SERVER=uvicorn : processus unique)
+if [ "${SERVER:-gunicorn}" = "uvicorn" ]; then
+    exec uvicorn main:app --host 0.0.0.0 --port 8000
+fi
+exec gunicorn -c gunicorn.conf.py main:app
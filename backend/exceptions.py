@@ -57,6 +57,24 @@ class InvalidUploadException(PinarrException):
     pass
 
 
+class ImageNotFoundException(PinarrException):
+    """Image non trouvée."""
+
+    pass
+
+
+class ServiceBusyException(PinarrException):
+    """Service saturé, réessayer plus tard."""
+
+    pass
+
+
+class InvalidCursorException(PinarrException):
+    """Curseur de pagination invalide."""
+
+    pass
+
+
 def handle_pinarr_exception(exc: PinarrException) -> HTTPException:
     """Convertit une exception métier en HTTPException."""
     status_map = {
@@ -66,8 +84,11 @@ def handle_pinarr_exception(exc: PinarrException) -> HTTPException:
         RowNotFoundException: 404,
         PositionNotFoundException: 404,
         PhysicalBottleNotFoundException: 404,
+        ImageNotFoundException: 404,
         MaxQuantityReachedException: 400,
         InvalidUploadException: 400,
+        InvalidCursorException: 400,
+        ServiceBusyException: 503,
     }
     status_code = status_map.get(type(exc), 500)
     return HTTPException(status_code=status_code, detail=str(exc))
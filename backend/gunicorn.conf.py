@@ -0,0 +1,52 @@
+"""Configuration gunicorn de Pinarr (serveur de production multi-workers).
+
+    gunicorn -c gunicorn.conf.py main:app
+
+L'application est chargée une fois dans le processus maître (preload) puis
+partagée par fork entre WEB_CONCURRENCY workers uvicorn. Le bootstrap de la
+base et la création de l'admin sont faits avant, par entrypoint.sh.
+
+Rechargement en douceur : `kill -HUP $(cat $RUN_DIR/pinarr-gunicorn.pid)`
+remplace les workers un à un sans couper les requêtes en cours (le code
+préchargé n'est relu qu'au redémarrage du conteneur).
+"""
+
+import os
+import tempfile
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # cœurs réellement alloués (cgroups, taskset)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(_cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# Recyclage : un worker est remplacé après ~MAX_REQUESTS requêtes (fuites
+# mémoire des bibliothèques d'image), à des moments décalés par le jitter
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Rendu d'étiquettes et conversions d'images peuvent dépasser 30 s
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+pidfile = os.path.join(os.getenv("RUN_DIR", tempfile.gettempdir()), "pinarr-gunicorn.pid")
+
+
+def post_fork(server, worker):
+    """Chaque worker ouvre ses propres connexions.
+
+    Le pool hérité du maître est abandonné sans fermer ses connexions
+    éventuelles, qui appartiennent toujours au maître.
+    """
+    from database import async_engine, engine, read_engine, write_engine
+
+    for pooled in {engine, read_engine, write_engine, async_engine.sync_engine}:
+        pooled.dispose(close=False)
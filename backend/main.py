@@ -11,24 +11,38 @@ from fastapi import (
     UploadFile,
     File,
     APIRouter,
+    Query,
     Request,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-import io
-
-from config import API_TITLE, CORS_ORIGINS, UPLOAD_DIR
-from dependencies import get_db
-from exceptions import PinarrException, handle_pinarr_exception
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional, Union
+
+from config import API_TITLE, CORS_ORIGINS
+from database import async_engine, check_database
+from dependencies import get_async_read_db, get_read_db
+from exceptions import (
+    PinarrException,
+    ServiceBusyException,
+    handle_pinarr_exception,
+)
 from routers import auth as auth_router
+from tasks import (
+    start_background_tasks,
+    stop_background_tasks,
+)
 from auth import get_current_user
 import schemas
 from services import (
     # Bottle services
-    get_bottles_with_positions,
+    get_bottles_with_positions_async,
+    get_bottles_page,
+    get_bottle_facets,
+    get_tags,
     get_bottle_with_position,
     check_duplicate_bottles,
     create_bottle,
@@ -38,7 +52,8 @@ from services import (
     validate_bottle_placement,
     # Cave services
     get_caves,
-    get_cave,
+    get_cave_async,
+    get_cave_grid,
     create_cave,
     update_cave,
     delete_cave,
@@ -54,8 +69,8 @@ from services import (
     remove_bottle_from_position,
     consume_bottle_from_position,
     # Physical bottle services
-    get_physical_bottle_by_qr,
-    get_physical_bottle_with_details,
+    get_physical_bottle_by_qr_async,
+    get_physical_bottle_with_details_async,
     get_bottle_physical_bottles,
     generate_qr_codes_for_bottle,
     remove_physical_bottle,
@@ -63,20 +78,36 @@ from services import (
     get_physical_bottle_count_in_cellar,
     # Label service
     generate_label_zip,
+    generate_label_sheet,
     generate_single_label_pdf,
+    shutdown_label_workers,
     # Upload services
     upload_image,
     delete_image,
     upload_image_from_url,
+    get_image_variant,
+    shutdown_image_workers,
     # Geo services
-    get_geocoded_regions,
+    get_geocoded_regions_async,
     create_geocoded_region,
+    get_map_regions,
 )
+from writer import run_write, shutdown_writer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Démarrage / arrêt des ressources de fond."""
+    await run_in_threadpool(check_database)
+    tasks = await start_background_tasks()
+    yield
+    await stop_background_tasks(tasks)
+    await run_in_threadpool(shutdown_writer)
+    shutdown_image_workers()
+    shutdown_label_workers()
+    await async_engine.dispose()
 
-app = FastAPI(title=API_TITLE)
 
-# Servir les fichiers uploadés comme fichiers statiques
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+app = FastAPI(title=API_TITLE, lifespan=lifespan)
 
 # Router principal pour les routes API
 api_router = APIRouter(prefix="/api/v1")
@@ -90,6 +121,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(ServiceBusyException)
+async def service_busy_handler(request, exc: ServiceBusyException):
+    """File d'écriture ou de traitement saturée : 503 avec délai de nouvelle tentative."""
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"}
+    )
+
+
 # Routes d'authentification (non protégées)
 app.include_router(auth_router.router, prefix="/api/v1")
 
@@ -140,17 +180,81 @@ def root():
     return {"message": "Welcome to Pinarr Backend!", "version": "1.0.0"}
 
 
+@app.get("/uploads/{filename}")
+def read_upload(filename: str, w: Optional[int] = None):
+    """Sert une image uploadée, redimensionnée si `w` est fourni (ex: ?w=320)."""
+    try:
+        path = get_image_variant(filename, w)
+    except PinarrException as e:
+        raise handle_pinarr_exception(e)
+    return FileResponse(
+        path, headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+
 # === BOTTLES ===
 
 
-@api_router.get("/bottles", response_model=List[schemas.BottleWithPosition])
-def read_bottles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Récupère toutes les bouteilles avec leurs positions."""
-    return get_bottles_with_positions(db, skip=skip, limit=limit)
+@api_router.get(
+    "/bottles",
+    response_model=Union[List[schemas.BottleWithPosition], schemas.BottlePage],
+)
+async def read_bottles(
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[str] = None,
+    sort: schemas.BottleSort = "id",
+    facets: bool = False,
+    filters: schemas.BottleFilters = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Récupère toutes les bouteilles avec leurs positions.
+
+    Avec `after_id` (vide pour la première page), un filtre, un tri ou
+    `facets=true`, bascule en pagination par curseur : projection légère,
+    curseur opaque `next_cursor` et, sur demande, compteurs de la sélection.
+    """
+    paged = (
+        after_id is not None
+        or sort != "id"
+        or facets
+        or filters.model_dump(exclude_defaults=True)
+    )
+    if paged:
+        # Services synchrones exécutés sur la connexion asynchrone (run_sync)
+        try:
+            items, next_cursor = await db.run_sync(
+                get_bottles_page, after=after_id, limit=limit, filters=filters, sort=sort
+            )
+        except PinarrException as e:
+            raise handle_pinarr_exception(e)
+        page = {"items": items, "next_cursor": next_cursor}
+        if facets:
+            page["facets"] = await db.run_sync(get_bottle_facets, filters)
+        return page
+    return await get_bottles_with_positions_async(db, skip=skip, limit=limit)
+
+
+@api_router.get("/bottles/facets", response_model=schemas.BottleFacets)
+def read_bottle_facets(
+    filters: schemas.BottleFilters = Depends(), db: Session = Depends(get_read_db)
+):
+    """Totaux (vins, bouteilles en cave, valeur) et facettes de la sélection."""
+    return get_bottle_facets(db, filters)
+
+
+@api_router.get("/tags", response_model=List[schemas.TagCount])
+def read_tags(
+    prefix: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+):
+    """Tags utilisés et nombre de vins (nuage de tags, autocomplétion par préfixe)."""
+    return get_tags(db, prefix=prefix, limit=limit)
 
 
 @api_router.get("/bottles/search/")
-def search_bottles(q: str = "", limit: int = 5, db: Session = Depends(get_db)):
+def search_bottles(q: str = "", limit: int = 5, db: Session = Depends(get_read_db)):
     """Recherche des bouteilles par nom."""
     from services.bottle_service import search_bottles_by_name
 
@@ -160,20 +264,23 @@ def search_bottles(q: str = "", limit: int = 5, db: Session = Depends(get_db)):
 
 @api_router.get("/bottles/check-duplicate/")
 def check_duplicate_bottles_endpoint(
-    name: str = "", year: int = None, db: Session = Depends(get_db)
+    name: str = "",
+    year: int = None,
+    domaine: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
-    """Vérifie si des bouteilles avec nom et millésime existent déjà."""
+    """Vérifie si des bouteilles proches (nom, domaine, millésime) existent déjà."""
     from services.bottle_service import check_duplicate_bottles
 
     if not name or year is None:
         return {"matches": []}
 
-    matches = check_duplicate_bottles(db, name, year)
+    matches = check_duplicate_bottles(db, name, year, domaine=domaine)
     return {"matches": matches}
 
 
 @api_router.get("/bottles/{bottle_id}", response_model=schemas.BottleWithPosition)
-def read_bottle(bottle_id: int, db: Session = Depends(get_db)):
+def read_bottle(bottle_id: int, db: Session = Depends(get_read_db)):
     """Récupère une bouteille spécifique avec sa position."""
     try:
         return get_bottle_with_position(db, bottle_id)
@@ -184,18 +291,16 @@ def read_bottle(bottle_id: int, db: Session = Depends(get_db)):
 
 
 @api_router.post("/bottles", response_model=schemas.Bottle)
-def create_bottle_endpoint(bottle: schemas.BottleCreate, db: Session = Depends(get_db)):
+def create_bottle_endpoint(bottle: schemas.BottleCreate):
     """Crée une nouvelle bouteille."""
-    return create_bottle(db, bottle)
+    return run_write(create_bottle, bottle, response_model=schemas.Bottle)
 
 
 @api_router.put("/bottles/{bottle_id}", response_model=schemas.Bottle)
-def update_bottle_endpoint(
-    bottle_id: int, bottle: schemas.BottleCreate, db: Session = Depends(get_db)
-):
+def update_bottle_endpoint(bottle_id: int, bottle: schemas.BottleCreate):
     """Met à jour une bouteille existante."""
     try:
-        return update_bottle(db, bottle_id, bottle)
+        return run_write(update_bottle, bottle_id, bottle, response_model=schemas.Bottle)
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -203,12 +308,10 @@ def update_bottle_endpoint(
 
 
 @api_router.patch("/bottles/{bottle_id}", response_model=schemas.Bottle)
-def patch_bottle_endpoint(
-    bottle_id: int, bottle: schemas.BottlePatch, db: Session = Depends(get_db)
-):
+def patch_bottle_endpoint(bottle_id: int, bottle: schemas.BottlePatch):
     """Met à jour partiellement une bouteille."""
     try:
-        return patch_bottle(db, bottle_id, bottle)
+        return run_write(patch_bottle, bottle_id, bottle, response_model=schemas.Bottle)
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -216,10 +319,10 @@ def patch_bottle_endpoint(
 
 
 @api_router.delete("/bottles/{bottle_id}")
-def delete_bottle_endpoint(bottle_id: int, db: Session = Depends(get_db)):
+def delete_bottle_endpoint(bottle_id: int):
     """Supprime une bouteille."""
     try:
-        delete_bottle(db, bottle_id)
+        run_write(delete_bottle, bottle_id)
         return {"message": "Bottle deleted successfully"}
     except Exception as e:
         if "not found" in str(e).lower():
@@ -231,16 +334,27 @@ def delete_bottle_endpoint(bottle_id: int, db: Session = Depends(get_db)):
 
 
 @api_router.get("/caves", response_model=List[schemas.CaveWithColumns])
-def read_caves(db: Session = Depends(get_db)):
+def read_caves(db: Session = Depends(get_read_db)):
     """Récupère toutes les caves avec leur structure complète."""
     return get_caves(db)
 
 
 @api_router.get("/caves/{cave_id}", response_model=schemas.CaveWithColumns)
-def read_cave(cave_id: int, db: Session = Depends(get_db)):
+async def read_cave(cave_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Récupère une cave spécifique."""
     try:
-        return get_cave(db, cave_id)
+        return await get_cave_async(db, cave_id)
+    except Exception as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise
+
+
+@api_router.get("/caves/{cave_id}/grid", response_model=schemas.CaveGrid)
+def read_cave_grid(cave_id: int, db: Session = Depends(get_read_db)):
+    """Récupère la grille d'occupation compacte d'une cave."""
+    try:
+        return get_cave_grid(db, cave_id)
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -248,18 +362,16 @@ def read_cave(cave_id: int, db: Session = Depends(get_db)):
 
 
 @api_router.post("/caves", response_model=schemas.Cave)
-def create_cave_endpoint(cave: schemas.CaveCreate, db: Session = Depends(get_db)):
+def create_cave_endpoint(cave: schemas.CaveCreate):
     """Crée une nouvelle cave."""
-    return create_cave(db, cave)
+    return run_write(create_cave, cave, response_model=schemas.Cave)
 
 
 @api_router.put("/caves/{cave_id}", response_model=schemas.Cave)
-def update_cave_endpoint(
-    cave_id: int, cave: schemas.CaveCreate, db: Session = Depends(get_db)
-):
+def update_cave_endpoint(cave_id: int, cave: schemas.CaveCreate):
     """Met à jour une cave existante."""
     try:
-        return update_cave(db, cave_id, cave)
+        return run_write(update_cave, cave_id, cave, response_model=schemas.Cave)
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -267,10 +379,10 @@ def update_cave_endpoint(
 
 
 @api_router.delete("/caves/{cave_id}")
-def delete_cave_endpoint(cave_id: int, db: Session = Depends(get_db)):
+def delete_cave_endpoint(cave_id: int):
     """Supprime une cave."""
     try:
-        delete_cave(db, cave_id)
+        run_write(delete_cave, cave_id)
         return {"message": "Cave deleted successfully"}
     except Exception as e:
         if "not found" in str(e).lower():
@@ -282,12 +394,12 @@ def delete_cave_endpoint(cave_id: int, db: Session = Depends(get_db)):
 
 
 @api_router.post("/caves/{cave_id}/columns", response_model=schemas.CaveColumn)
-def create_column_endpoint(
-    cave_id: int, column: schemas.CaveColumnCreate, db: Session = Depends(get_db)
-):
+def create_column_endpoint(cave_id: int, column: schemas.CaveColumnCreate):
     """Crée une nouvelle colonne dans une cave."""
     try:
-        return create_column(db, cave_id, column)
+        return run_write(
+            create_column, cave_id, column, response_model=schemas.CaveColumn
+        )
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -295,12 +407,12 @@ def create_column_endpoint(
 
 
 @api_router.put("/columns/{column_id}", response_model=schemas.CaveColumn)
-def update_column_endpoint(
-    column_id: int, column: schemas.CaveColumnCreate, db: Session = Depends(get_db)
-):
+def update_column_endpoint(column_id: int, column: schemas.CaveColumnCreate):
     """Met à jour une colonne existante."""
     try:
-        return update_column(db, column_id, column)
+        return run_write(
+            update_column, column_id, column, response_model=schemas.CaveColumn
+        )
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -308,10 +420,10 @@ def update_column_endpoint(
 
 
 @api_router.delete("/columns/{column_id}")
-def delete_column_endpoint(column_id: int, db: Session = Depends(get_db)):
+def delete_column_endpoint(column_id: int):
     """Supprime une colonne."""
     try:
-        delete_column(db, column_id)
+        run_write(delete_column, column_id)
         return {"message": "Column deleted successfully"}
     except Exception as e:
         if "not found" in str(e).lower():
@@ -323,12 +435,10 @@ def delete_column_endpoint(column_id: int, db: Session = Depends(get_db)):
 
 
 @api_router.post("/columns/{column_id}/rows", response_model=schemas.CaveRow)
-def create_row_endpoint(
-    column_id: int, row: schemas.CaveRowCreate, db: Session = Depends(get_db)
-):
+def create_row_endpoint(column_id: int, row: schemas.CaveRowCreate):
     """Crée une nouvelle rangée avec positions automatiques."""
     try:
-        return create_row(db, column_id, row)
+        return run_write(create_row, column_id, row, response_model=schemas.CaveRow)
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -336,12 +446,10 @@ def create_row_endpoint(
 
 
 @api_router.put("/rows/{row_id}", response_model=schemas.CaveRow)
-def update_row_endpoint(
-    row_id: int, row: schemas.CaveRowCreate, db: Session = Depends(get_db)
-):
+def update_row_endpoint(row_id: int, row: schemas.CaveRowCreate):
     """Met à jour une rangée et recrée les positions si nécessaire."""
     try:
-        return update_row(db, row_id, row)
+        return run_write(update_row, row_id, row, response_model=schemas.CaveRow)
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -349,10 +457,10 @@ def update_row_endpoint(
 
 
 @api_router.delete("/rows/{row_id}")
-def delete_row_endpoint(row_id: int, db: Session = Depends(get_db)):
+def delete_row_endpoint(row_id: int):
     """Supprime une rangée."""
     try:
-        delete_row(db, row_id)
+        run_write(delete_row, row_id)
         return {"message": "Row deleted successfully"}
     except Exception as e:
         if "not found" in str(e).lower():
@@ -364,12 +472,12 @@ def delete_row_endpoint(row_id: int, db: Session = Depends(get_db)):
 
 
 @api_router.post("/rows/{row_id}/positions", response_model=schemas.Position)
-def create_position_endpoint(
-    row_id: int, position: schemas.PositionCreate, db: Session = Depends(get_db)
-):
+def create_position_endpoint(row_id: int, position: schemas.PositionCreate):
     """Crée une nouvelle position dans une rangée."""
     try:
-        return create_position(db, row_id, position)
+        return run_write(
+            create_position, row_id, position, response_model=schemas.Position
+        )
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -379,30 +487,31 @@ def create_position_endpoint(
 @api_router.get(
     "/rows/{row_id}/positions", response_model=List[schemas.PositionWithBottle]
 )
-def read_positions(row_id: int, db: Session = Depends(get_db)):
+def read_positions(row_id: int, db: Session = Depends(get_read_db)):
     """Récupère toutes les positions d'une rangée avec leurs bouteilles."""
     return get_positions_for_row(db, row_id)
 
 
 @api_router.put("/positions/{position_id}", response_model=schemas.Position)
-def update_position(
-    position_id: int, position: schemas.PositionUpdate, db: Session = Depends(get_db)
-):
+def update_position(position_id: int, position: schemas.PositionUpdate):
     """Met à jour une position et assigne une bouteille si spécifiée."""
     from services import assign_bottle_to_position
 
-    # Vérifier la quantité maximale
-    if position.bottle_id is not None:
-        try:
-            validate_bottle_placement(
-                db, position.bottle_id, exclude_position_id=position_id
-            )
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=str(e))
+    def place(db: Session):
+        # Vérifier la quantité maximale (dans la même écriture que le placement)
+        if position.bottle_id is not None:
+            try:
+                validate_bottle_placement(
+                    db, position.bottle_id, exclude_position_id=position_id
+                )
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        return assign_bottle_to_position(db, position_id, position.bottle_id)
 
     try:
-        db_position = assign_bottle_to_position(db, position_id, position.bottle_id)
-        return db_position
+        return run_write(place, response_model=schemas.Position)
+    except HTTPException:
+        raise
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -410,12 +519,10 @@ def update_position(
 
 
 @api_router.delete("/positions/{position_id}/bottle")
-def remove_bottle_from_position_endpoint(
-    position_id: int, db: Session = Depends(get_db)
-):
+def remove_bottle_from_position_endpoint(position_id: int):
     """Retire une bouteille d'une position (libère la position)."""
     try:
-        remove_bottle_from_position(db, position_id)
+        run_write(remove_bottle_from_position, position_id)
         return {"message": "Bottle removed from position"}
     except Exception as e:
         if "not found" in str(e).lower():
@@ -424,12 +531,10 @@ def remove_bottle_from_position_endpoint(
 
 
 @api_router.post("/positions/{position_id}/consume")
-def consume_bottle_from_position_endpoint(
-    position_id: int, db: Session = Depends(get_db)
-):
+def consume_bottle_from_position_endpoint(position_id: int):
     """Consommer une bouteille depuis sa position (historique)."""
     try:
-        consume_bottle_from_position(db, position_id)
+        run_write(consume_bottle_from_position, position_id)
         return {"message": "Bottle consumed"}
     except Exception as e:
         if "not found" in str(e).lower():
@@ -442,9 +547,16 @@ def consume_bottle_from_position_endpoint(
 
 @api_router.post("/upload")
 async def upload_image_endpoint(file: UploadFile = File(...)):
-    """Upload une image avec validation complète."""
+    """Upload une image avec validation complète.
+
+    La conversion s'exécute hors de la boucle d'événements (pool de processus).
+    """
     try:
-        return upload_image(file)
+        return await run_in_threadpool(upload_image, file)
+    except ServiceBusyException as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "5"}
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -452,11 +564,15 @@ async def upload_image_endpoint(file: UploadFile = File(...)):
 @api_router.post("/upload-from-url")
 async def upload_image_from_url_endpoint(request: dict):
     """Télécharge une image depuis une URL et la sauvegarde localement."""
+    url = request.get("url")
+    if not url:
+        raise HTTPException(status_code=400, detail="URL manquante")
     try:
-        url = request.get("url")
-        if not url:
-            raise HTTPException(status_code=400, detail="URL manquante")
-        return upload_image_from_url(url)
+        return await run_in_threadpool(upload_image_from_url, url)
+    except ServiceBusyException as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "5"}
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -465,15 +581,13 @@ async def upload_image_from_url_endpoint(request: dict):
 
 
 @api_router.post("/bottles/{bottle_id}/generate-qr-codes")
-def generate_qr_codes_endpoint(
-    bottle_id: int,
-    request: schemas.GenerateQrCodesRequest,
-    db: Session = Depends(get_db),
-):
+def generate_qr_codes_endpoint(bottle_id: int, request: schemas.GenerateQrCodesRequest):
     """Génère N codes QR pour une bouteille et crée les bouteilles physiques."""
     try:
-        qr_codes = generate_qr_codes_for_bottle(db, bottle_id, request.count)
+        qr_codes = run_write(generate_qr_codes_for_bottle, bottle_id, request.count)
         return {"qr_codes": qr_codes, "count": len(qr_codes)}
+    except ServiceBusyException:
+        raise
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -481,7 +595,9 @@ def generate_qr_codes_endpoint(
 
 
 @api_router.get("/bottles/{bottle_id}/physical-bottles")
-def get_bottle_physical_bottles_endpoint(bottle_id: int, db: Session = Depends(get_db)):
+def get_bottle_physical_bottles_endpoint(
+    bottle_id: int, db: Session = Depends(get_read_db)
+):
     """Récupère toutes les bouteilles physiques d'un vin."""
     try:
         physical_bottles = get_bottle_physical_bottles(db, bottle_id)
@@ -496,15 +612,17 @@ def get_bottle_physical_bottles_endpoint(bottle_id: int, db: Session = Depends(g
 # Route publique pour scanner un QR code (pas de /api/v1)
 # Routes publiques pour scanner un QR code et retirer une bouteille (non préfixées par /api/v1)
 @app.get("/api/scan/{qr_code}")
-def scan_qr_code_endpoint(qr_code: str, db: Session = Depends(get_db)):
+async def scan_qr_code_endpoint(
+    qr_code: str, db: AsyncSession = Depends(get_async_read_db)
+):
     """Récupère les informations d'une bouteille physique par son code QR (public)."""
     try:
-        physical_bottle = get_physical_bottle_by_qr(db, qr_code)
+        physical_bottle = await get_physical_bottle_by_qr_async(db, qr_code)
         if not physical_bottle:
             raise HTTPException(status_code=404, detail="Code QR non trouvé")
 
         # Récupérer les détails complets
-        details = get_physical_bottle_with_details(db, physical_bottle.id)
+        details = await get_physical_bottle_with_details_async(db, physical_bottle.id)
         return details
     except HTTPException:
         raise
@@ -516,16 +634,15 @@ def scan_qr_code_endpoint(qr_code: str, db: Session = Depends(get_db)):
 
 
 @app.post("/api/remove/{physical_bottle_id}")
-def remove_physical_bottle_public_endpoint(
-    physical_bottle_id: int,
-    db: Session = Depends(get_db),
-):
+def remove_physical_bottle_public_endpoint(physical_bottle_id: int):
     """Retire une bouteille de la cave (marque comme consommée). Public via QR."""
     try:
-        remove_physical_bottle(db, physical_bottle_id)
+        run_write(remove_physical_bottle, physical_bottle_id)
         return {"message": "Bouteille retirée de la cave avec succès"}
     except HTTPException:
         raise
+    except ServiceBusyException:
+        raise
     except Exception as e:
         import traceback
 
@@ -535,14 +652,14 @@ def remove_physical_bottle_public_endpoint(
 
 @api_router.put("/physical-bottles/{physical_bottle_id}/move")
 def move_physical_bottle_endpoint(
-    physical_bottle_id: int,
-    request: schemas.PhysicalBottleMoveRequest,
-    db: Session = Depends(get_db),
+    physical_bottle_id: int, request: schemas.PhysicalBottleMoveRequest
 ):
     """Déplace une bouteille physique vers une nouvelle position."""
     try:
-        move_physical_bottle(db, physical_bottle_id, request.position_id)
+        run_write(move_physical_bottle, physical_bottle_id, request.position_id)
         return {"message": "Bouteille déplacée avec succès"}
+    except ServiceBusyException:
+        raise
     except Exception as e:
         if "not found" in str(e).lower():
             raise HTTPException(status_code=404, detail=str(e))
@@ -553,17 +670,41 @@ def move_physical_bottle_endpoint(
 
 
 @api_router.get("/geocoded-regions", response_model=List[schemas.GeocodedRegion])
-def read_geocoded_regions(db: Session = Depends(get_db)):
+async def read_geocoded_regions(db: AsyncSession = Depends(get_async_read_db)):
     """Récupère toutes les régions géocodées."""
-    return get_geocoded_regions(db)
+    return await get_geocoded_regions_async(db)
 
 
 @api_router.post("/geocoded-regions", response_model=schemas.GeocodedRegion)
-def create_geocoded_region_endpoint(
-    region: schemas.GeocodedRegionCreate, db: Session = Depends(get_db)
-):
+def create_geocoded_region_endpoint(region: schemas.GeocodedRegionCreate):
     """Crée ou retourne une région géocodée existante."""
-    return create_geocoded_region(db, region)
+    return run_write(
+        create_geocoded_region, region, response_model=schemas.GeocodedRegion
+    )
+
+
+@api_router.get("/map/regions", response_model=List[schemas.MapRegion])
+def read_map_regions(
+    bbox: Optional[str] = None,
+    top: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+):
+    """Agrégats par région pour la carte.
+
+    `bbox=min_lon,min_lat,max_lon,max_lat` restreint aux régions visibles.
+    """
+    bounds = None
+    if bbox:
+        try:
+            bounds = tuple(float(v) for v in bbox.split(","))
+        except ValueError:
+            bounds = ()
+        if len(bounds) != 4:
+            raise HTTPException(
+                status_code=400,
+                detail="bbox attendu : min_lon,min_lat,max_lon,max_lat",
+            )
+    return get_map_regions(db, bbox=bounds, top=top)
 
 
 def _get_frontend_url(request: Request) -> str:
@@ -579,25 +720,19 @@ def _get_frontend_url(request: Request) -> str:
 
 @api_router.get("/bottles/{bottle_id}/batch-labels")
 def download_batch_labels_endpoint(
-    bottle_id: int, request: Request, db: Session = Depends(get_db)
+    bottle_id: int, request: Request, db: Session = Depends(get_read_db)
 ):
     """Télécharge un ZIP avec toutes les étiquettes 3×5cm des bouteilles physiques en cave."""
     try:
         frontend_url = _get_frontend_url(request)
-        zip_bytes = generate_label_zip(db, bottle_id, frontend_url=frontend_url)
-        if not zip_bytes:
-            raise HTTPException(
-                status_code=404, detail="Aucune bouteille physique en cave"
-            )
+        zip_stream = generate_label_zip(db, bottle_id, frontend_url=frontend_url)
         return StreamingResponse(
-            io.BytesIO(zip_bytes),
+            zip_stream,
             media_type="application/zip",
             headers={
                 "Content-Disposition": f"attachment; filename=Etiquettes_{bottle_id}.zip"
             },
         )
-    except HTTPException:
-        raise
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -609,9 +744,48 @@ def download_batch_labels_endpoint(
         )
 
 
+@api_router.get("/bottles/{bottle_id}/label-sheet")
+def download_label_sheet_endpoint(
+    bottle_id: int,
+    request: Request,
+    page_size: Literal["A4", "Letter"] = "A4",
+    margin_mm: float = Query(10, ge=0, le=50),
+    bleed_mm: float = Query(2, ge=0, le=10),
+    db: Session = Depends(get_read_db),
+):
+    """Télécharge un PDF unique avec toutes les étiquettes en cave imposées sur planches."""
+    try:
+        frontend_url = _get_frontend_url(request)
+        pdf_bytes = generate_label_sheet(
+            db,
+            bottle_id,
+            frontend_url=frontend_url,
+            page_size=page_size,
+            margin_mm=margin_mm,
+            bleed_mm=bleed_mm,
+        )
+        if not pdf_bytes:
+            raise HTTPException(
+                status_code=404, detail="Aucune bouteille physique en cave"
+            )
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f"attachment; filename=Planche_{bottle_id}.pdf"
+            },
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        if "not found" in str(e).lower():
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @api_router.get("/bottles/{bottle_id}/physical-bottles/{qr_code}/label")
 def download_single_label_endpoint(
-    bottle_id: int, qr_code: str, request: Request, db: Session = Depends(get_db)
+    bottle_id: int, qr_code: str, request: Request, db: Session = Depends(get_read_db)
 ):
     """Télécharge l'étiquette PDF individuelle d'une bouteille physique."""
     try:
@@ -619,8 +793,8 @@ def download_single_label_endpoint(
         pdf_bytes = generate_single_label_pdf(
             db, bottle_id, qr_code, frontend_url=frontend_url
         )
-        return StreamingResponse(
-            io.BytesIO(pdf_bytes),
+        return Response(
+            content=pdf_bytes,
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename=Etiquette_{qr_code}.pdf"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -25,10 +25,10 @@ class Bottle(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     domaine = Column(String, nullable=True)
-    country = Column(String, nullable=True)
-    year = Column(Integer, nullable=True)
-    type = Column(String, nullable=True)
-    region = Column(String, nullable=True)
+    country = Column(String, nullable=True, index=True)
+    year = Column(Integer, nullable=True, index=True)
+    type = Column(String, nullable=True, index=True)
+    region = Column(String, nullable=True, index=True)
     cepage = Column(String, nullable=True)
     alcohol = Column(Float, nullable=True)
     size = Column(String, nullable=True, default="75cl")
@@ -45,7 +45,7 @@ class Bottle(Base):
     rating = Column(Integer, nullable=True)
     tags = Column(String, nullable=True)
     is_favorite = Column(Boolean, nullable=True, default=False)
-    image_path = Column(String, nullable=True)
+    image_path = Column(String, nullable=True, index=True)
 
     physical_bottles = relationship(
         "PhysicalBottle", back_populates="bottle", cascade="all, delete-orphan"
@@ -54,6 +54,44 @@ class Bottle(Base):
     # Positions accessibles via les physical_bottles
 
 
+class BottleNgram(Base):
+    """Index de détection de doublons : trigrammes du nom et du domaine, par millésime."""
+
+    __tablename__ = "bottle_ngrams"
+    __table_args__ = (
+        # Purge des n-grammes d'un vin modifié ou supprimé
+        Index("ix_bottle_ngrams_bottle_id", "bottle_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    year = Column(Integer, primary_key=True)  # 0 = millésime inconnu
+    gram = Column(String, primary_key=True)
+    bottle_id = Column(Integer, ForeignKey("bottles.id"), primary_key=True)
+
+
+class Tag(Base):
+    """Tag normalisé ; `key` est la forme de comparaison (minuscules, espaces simples)."""
+
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)  # Graphie de la première saisie
+    key = Column(String, nullable=False, unique=True, index=True)
+
+
+class BottleTag(Base):
+    """Index inversé tag → vins, tenu à jour depuis Bottle.tags."""
+
+    __tablename__ = "bottle_tags"
+    __table_args__ = (
+        Index("ix_bottle_tags_bottle_id", "bottle_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    bottle_id = Column(Integer, ForeignKey("bottles.id"), primary_key=True)
+
+
 class Cave(Base):
     __tablename__ = "caves"
 
@@ -69,7 +107,7 @@ class CaveColumn(Base):
     __tablename__ = "cave_columns"
 
     id = Column(Integer, primary_key=True, index=True)
-    cave_id = Column(Integer, ForeignKey("caves.id"), nullable=False)
+    cave_id = Column(Integer, ForeignKey("caves.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     order = Column(Integer, default=0)
 
@@ -83,7 +121,7 @@ class CaveRow(Base):
     __tablename__ = "cave_rows"
 
     id = Column(Integer, primary_key=True, index=True)
-    column_id = Column(Integer, ForeignKey("cave_columns.id"), nullable=False)
+    column_id = Column(Integer, ForeignKey("cave_columns.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     width = Column(Integer, nullable=False, default=6)
     height = Column(Integer, nullable=False, default=4)
@@ -101,12 +139,16 @@ class CaveRow(Base):
 
 class PhysicalBottle(Base):
     __tablename__ = "physical_bottles"
+    __table_args__ = (
+        # Bouteilles d'un vin, en cave ou non (préfixe bottle_id seul inclus)
+        Index("ix_physical_bottles_bottle_id_status", "bottle_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     bottle_id = Column(Integer, ForeignKey("bottles.id"), nullable=False)
-    position_id = Column(Integer, ForeignKey("positions.id"), nullable=True)
+    position_id = Column(Integer, ForeignKey("positions.id"), nullable=True, index=True)
     qr_code = Column(String(8), unique=True, index=True, nullable=False)
-    status = Column(String(20), default="in_cellar")  # in_cellar, consumed
+    status = Column(String(20), default="in_cellar", index=True)  # in_cellar, consumed
     acquisition_date = Column(DateTime, default=datetime.utcnow)
     removal_date = Column(DateTime, nullable=True)
     notes = Column(String(500), nullable=True)
@@ -121,11 +163,22 @@ class PhysicalBottle(Base):
 
 class Position(Base):
     __tablename__ = "positions"
+    __table_args__ = (
+        # Un emplacement (ligne, position) n'existe qu'une fois par rangée
+        Index("ix_positions_row_id_line_position", "row_id", "line", "position", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     row_id = Column(Integer, ForeignKey("cave_rows.id"), nullable=False)
     line = Column(Integer, nullable=False)
     position = Column(Integer, nullable=False)
+    # Localisation dénormalisée, tenue à jour par cave_service.sync_position_locations
+    code = Column(String, nullable=True)
+    row_name = Column(String, nullable=True)
+    column_id = Column(Integer, nullable=True)
+    column_name = Column(String, nullable=True)
+    cave_id = Column(Integer, nullable=True)
+    cave_name = Column(String, nullable=True)
 
     row = relationship("CaveRow", back_populates="positions")
     physical_bottle = relationship(
@@ -144,12 +197,6 @@ class Position(Base):
         """Compatibilité: retourne directement l'ID de la bouteille assignée, via physical_bottle."""
         return self.physical_bottle.bottle_id if self.physical_bottle else None
 
-    @property
-    def code(self):
-        row_name = self.row.name if self.row else "?"
-        col_name = self.row.column.name if self.row and self.row.column else "?"
-        return f"{col_name}-{row_name}-L{self.line}-P{self.position}"
-
 
 class GeocodedRegion(Base):
     __tablename__ = "geocoded_regions"
@@ -158,3 +205,14 @@ class GeocodedRegion(Base):
     name = Column(String, unique=True, index=True)
     lat = Column(Float, nullable=False)
     lon = Column(Float, nullable=False)
+
+
+class GeocodeMiss(Base):
+    """Cache négatif : régions que le géocodeur n'a pas su résoudre."""
+
+    __tablename__ = "geocode_misses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False)
+    attempts = Column(Integer, default=1, nullable=False)
+    last_attempt = Column(DateTime, default=datetime.utcnow, nullable=False)
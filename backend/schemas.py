@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Literal
 from pydantic import ConfigDict
 from datetime import datetime
 
@@ -90,6 +90,64 @@ class BottleWithPosition(Bottle):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BottleListItem(Bottle):
+    """Vin en projection pour la liste paginée par curseur."""
+
+    cellar_quantity: int = 0
+    physical_count: int = 0
+    position_codes: List[str] = []
+
+
+BottleSort = Literal[
+    "id", "name", "-name", "year", "-year", "price", "-price", "rating", "-rating"
+]
+
+
+class BottleFilters(BaseModel):
+    """Filtres du catalogue, lus depuis les paramètres de GET /bottles."""
+
+    q: Optional[str] = None
+    type: Optional[str] = None
+    country: Optional[str] = None
+    region: Optional[str] = None
+    domaine: Optional[str] = None
+    cepage: Optional[str] = None
+    tag: Optional[str] = None
+    year: Optional[int] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    favorite: Optional[bool] = None
+    color: Optional[Literal["RED", "WHITE", "ROSE", "EFFERVESCENT", "OTHER"]] = None
+    phase: Optional[Literal["JEUNESSE", "MATURITE", "APOGEE", "DECLIN"]] = None
+    # cellar : au moins une bouteille en cave ; history : toutes sorties
+    status: Literal["all", "cellar", "history"] = "all"
+
+
+class BottleFacets(BaseModel):
+    """Compteurs de la sélection : totaux, puis nombre de vins par valeur."""
+
+    wine_count: int = 0
+    bottle_count: int = 0
+    total_value: float = 0.0
+    status: Dict[str, int] = {}
+    type: Dict[str, int] = {}
+    country: Dict[str, int] = {}
+    region: Dict[str, int] = {}
+    year: Dict[str, int] = {}  # par décennie : "2010" = 2010-2019
+    tag: Dict[str, int] = {}
+
+
+class TagCount(BaseModel):
+    name: str
+    count: int
+
+
+class BottlePage(BaseModel):
+    items: List[BottleListItem] = []
+    next_cursor: Optional[str] = None
+    facets: Optional[BottleFacets] = None
+
+
 # === Physical Bottles (QR Codes) ===
 
 
@@ -165,6 +223,29 @@ class CaveWithColumns(Cave):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CaveGridRow(BaseModel):
+    id: int
+    name: str
+    width: int
+    height: int
+    order: Optional[int] = 0
+    # Une entrée par position, dans l'ordre de CaveGrid.slot_fields
+    slots: List[list] = []
+
+
+class CaveGridColumn(BaseModel):
+    id: int
+    name: str
+    order: Optional[int] = 0
+    rows: List[CaveGridRow] = []
+
+
+class CaveGrid(Cave):
+    slot_fields: List[str] = []
+    columns: List[CaveGridColumn] = []
+    wines: Dict[int, BottleSummary] = {}
+
+
 class CaveColumnBase(BaseModel):
     name: str
     order: Optional[int] = 0
@@ -257,3 +338,12 @@ class GeocodedRegion(GeocodedRegionBase):
     id: int
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class MapRegion(GeocodedRegionBase):
+    """Agrégat par région pour la carte (sans le détail des vins)."""
+
+    wine_count: int
+    bottle_count: int
+    types: Dict[str, int]
+    top_wine_ids: List[int]
@@ -0,0 +1,160 @@
+"""Index plein texte des vins (SQLite FTS5, PostgreSQL pg_trgm).
+
+SQLite : table virtuelle à contenu externe sur `bottles`, tenue à jour par
+triggers : toute écriture sur les colonnes indexées (ORM, SQL brut,
+migrations) est répercutée sans code applicatif. Le tokenizer
+`unicode61 remove_diacritics 2` rend la recherche insensible à la casse et
+aux accents ; les préfixes de 2 et 3 caractères sont pré-indexés pour
+l'autocomplétion.
+
+PostgreSQL : index GIN de trigrammes sur le texte des colonnes indexées,
+replié (minuscules, sans accents) par `pinarr_fold()`. Chaque mot saisi doit
+commencer un mot du vin (expression rationnelle de début de mot, servie par l'index) ;
+le classement pondère la similarité de chaque colonne.
+"""
+
+import re
+
+from sqlalchemy import Integer, column, text
+
+# Colonnes indexées, dans l'ordre des poids BM25 ci-dessous
+FTS_COLUMNS = ("name", "domaine", "cepage", "region", "tags", "description")
+FTS_WEIGHTS = (10.0, 5.0, 2.0, 2.0, 2.0, 1.0)
+
+_cols = ", ".join(FTS_COLUMNS)
+_new = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS bottles_fts USING fts5(
+        {_cols},
+        content='bottles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS bottles_fts_ai AFTER INSERT ON bottles BEGIN
+        INSERT INTO bottles_fts(rowid, {_cols}) VALUES (new.id, {_new});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bottles_fts_ad AFTER DELETE ON bottles BEGIN
+        INSERT INTO bottles_fts(bottles_fts, rowid, {_cols})
+        VALUES ('delete', old.id, {_old});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bottles_fts_au AFTER UPDATE OF {_cols} ON bottles BEGIN
+        INSERT INTO bottles_fts(bottles_fts, rowid, {_cols})
+        VALUES ('delete', old.id, {_old});
+        INSERT INTO bottles_fts(rowid, {_cols}) VALUES (new.id, {_new});
+    END""",
+]
+
+
+# Extensions « trusted » : le propriétaire de la base peut les créer
+PG_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() n'est pas IMMUTABLE : l'enveloppe fixe son dictionnaire pour
+    # pouvoir servir dans un index d'expression
+    """CREATE OR REPLACE FUNCTION pinarr_fold(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1)) $$""",
+]
+PG_INDEX_NAME = "ix_bottles_search_trgm"
+
+
+def pg_document(alias: str = "") -> str:
+    """Texte replié des colonnes indexées, tel qu'écrit dans l'index GIN."""
+    prefix = f"{alias}." if alias else ""
+    joined = " || ' ' || ".join(f"coalesce({prefix}{c}, '')" for c in FTS_COLUMNS)
+    return f"pinarr_fold({joined})"
+
+
+PG_INDEX_DDL = (
+    f"CREATE INDEX IF NOT EXISTS {PG_INDEX_NAME} "
+    f"ON bottles USING gin ({pg_document()} gin_trgm_ops)"
+)
+
+
+def create_search_index(connection) -> None:
+    """Crée l'index (et ses triggers sous SQLite) s'il manque, puis le reconstruit."""
+    if connection.dialect.name == "postgresql":
+        for statement in PG_DDL + [PG_INDEX_DDL]:
+            connection.execute(text(statement))
+        return
+    if connection.dialect.name != "sqlite":
+        return
+
+    for statement in FTS_DDL:
+        connection.execute(text(statement))
+    connection.execute(text("INSERT INTO bottles_fts(bottles_fts) VALUES ('rebuild')"))
+
+
+def _tokens(query: str):
+    return re.findall(r"\w+", query)
+
+
+def fts_query(query: str) -> str:
+    """Transforme une saisie libre en requête FTS5 : chaque mot devient un
+    préfixe entre guillemets (« chat marg » → "chat"* "marg"*), combinés en ET.
+    """
+    return " ".join(f'"{token}"*' for token in _tokens(query))
+
+
+def _pg_word_prefixes(query: str, alias: str):
+    """Clause « chaque mot saisi commence un mot du vin » et ses paramètres."""
+    params = {f"search_{i}": token for i, token in enumerate(_tokens(query))}
+    document = pg_document(alias)
+    clause = " AND ".join(
+        f"{document} ~ ('\\m' || pinarr_fold(:{name}))" for name in params
+    )
+    return clause, params
+
+
+def search_clause(dialect: str, query: str, bottle_id):
+    """Filtre WHERE sur `bottles` retenant les vins qui correspondent à la saisie.
+
+    `bottle_id` est la colonne `bottles.id` de la requête englobante. None si
+    la saisie ne contient aucun mot.
+    """
+    if not _tokens(query):
+        return None
+    if dialect == "postgresql":
+        clause, params = _pg_word_prefixes(query, "bottles")
+        return text(clause).bindparams(**params)
+
+    matching = (
+        text("SELECT rowid FROM bottles_fts WHERE bottles_fts MATCH :fts_match")
+        .bindparams(fts_match=fts_query(query))
+        .columns(column("rowid", Integer))
+    )
+    return bottle_id.in_(matching)
+
+
+def search_statement(dialect: str, query: str):
+    """Recherche classée (meilleurs résultats d'abord), paramètre `:limit` à lier.
+
+    Colonnes : id, name, year, domaine, quantity, image_path. None si la
+    saisie ne contient aucun mot.
+    """
+    if not _tokens(query):
+        return None
+    select_list = "SELECT b.id, b.name, b.year, b.domaine, b.quantity, b.image_path "
+
+    if dialect == "postgresql":
+        clause, params = _pg_word_prefixes(query, "b")
+        rank = " + ".join(
+            f"{weight} * word_similarity(pinarr_fold(:search_query), "
+            f"pinarr_fold(coalesce(b.{c}, '')))"
+            for c, weight in zip(FTS_COLUMNS, FTS_WEIGHTS)
+        )
+        return text(
+            select_list + "FROM bottles b "
+            f"WHERE {clause} "
+            f"ORDER BY {rank} DESC, b.name "
+            "LIMIT :limit"
+        ).bindparams(search_query=query, **params)
+
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    return text(
+        select_list + "FROM bottles_fts JOIN bottles b ON b.id = bottles_fts.rowid "
+        "WHERE bottles_fts MATCH :match "
+        f"ORDER BY bm25(bottles_fts, {weights}), b.name "
+        "LIMIT :limit"
+    ).bindparams(match=fts_query(query))
@@ -4,7 +4,9 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import SessionLocal, create_db_tables
-from models import Base, Cave, CaveColumn, CaveRow, Position, Bottle
+from models import Base, Cave, CaveColumn, CaveRow, PhysicalBottle, Position, Bottle
+from services import sync_position_locations
+from services.physical_bottle_service import generate_qr_code
 
 
 def seed_database():
@@ -131,54 +133,38 @@ def seed_database():
         db.add_all(bottles)
         db.flush()
 
-        pos_a1_1 = Position(
-            row_id=row_a1.id, line=1, position=1, bottle_id=bottles[0].id
-        )
-        pos_a1_2 = Position(
-            row_id=row_a1.id, line=1, position=2, bottle_id=bottles[0].id
-        )
-        pos_a1_3 = Position(
-            row_id=row_a1.id, line=1, position=3, bottle_id=bottles[1].id
-        )
-        pos_a1_4 = Position(
-            row_id=row_a1.id, line=1, position=4, bottle_id=bottles[2].id
-        )
-        pos_a2_1 = Position(
-            row_id=row_a2.id, line=2, position=1, bottle_id=bottles[3].id
-        )
-        pos_a2_2 = Position(
-            row_id=row_a2.id, line=2, position=2, bottle_id=bottles[4].id
-        )
-        pos_b1_1 = Position(
-            row_id=row_b1.id, line=1, position=1, bottle_id=bottles[0].id
-        )
-        pos_b1_2 = Position(
-            row_id=row_b1.id, line=1, position=2, bottle_id=bottles[1].id
-        )
-        pos_b1_3 = Position(
-            row_id=row_b1.id, line=1, position=3, bottle_id=bottles[2].id
-        )
-        pos_c1_1 = Position(
-            row_id=row_c1.id, line=1, position=1, bottle_id=bottles[3].id
-        )
-        pos_c1_2 = Position(
-            row_id=row_c1.id, line=1, position=2, bottle_id=bottles[4].id
-        )
-        db.add_all(
-            [
-                pos_a1_1,
-                pos_a1_2,
-                pos_a1_3,
-                pos_a1_4,
-                pos_a2_1,
-                pos_a2_2,
-                pos_b1_1,
-                pos_b1_2,
-                pos_b1_3,
-                pos_c1_1,
-                pos_c1_2,
+        # Bouteilles physiques de chaque vin, dont quelques-unes placées
+        placements = [
+            (row_a1, 1, 1, 0),
+            (row_a1, 1, 2, 0),
+            (row_a1, 1, 3, 1),
+            (row_a1, 1, 4, 2),
+            (row_a2, 2, 1, 3),
+            (row_a2, 2, 2, 4),
+            (row_b1, 1, 1, 0),
+            (row_b1, 1, 2, 1),
+            (row_b1, 1, 3, 2),
+            (row_c1, 1, 1, 3),
+            (row_c1, 1, 2, 4),
+        ]
+        physical_bottles = {
+            bottle.id: [
+                PhysicalBottle(bottle_id=bottle.id, qr_code=generate_qr_code())
+                for _ in range(bottle.quantity)
             ]
-        )
+            for bottle in bottles
+        }
+        for pbs in physical_bottles.values():
+            db.add_all(pbs)
+
+        for row, line, position, wine in placements:
+            db_position = Position(row_id=row.id, line=line, position=position)
+            db.add(db_position)
+            db.flush()
+            physical_bottles[bottles[wine].id].pop().position_id = db_position.id
+
+        # Code et noms dénormalisés des positions créées ci-dessus
+        sync_position_locations(db)
 
         db.commit()
         print("Database seeded successfully!")
@@ -2,6 +2,8 @@
 
 from .bottle_service import (
     get_bottles_with_positions,
+    get_bottles_with_positions_async,
+    get_bottles_page,
     get_bottle_with_position,
     check_duplicate_bottles,
     create_bottle,
@@ -11,9 +13,25 @@ from .bottle_service import (
     validate_bottle_placement,
 )
 
+from .catalog_service import get_bottle_facets
+
+from .tag_service import (
+    get_tags,
+    rebuild_tag_index,
+    tag_index_is_stale,
+)
+
+from .duplicate_service import (
+    find_duplicates,
+    rebuild_duplicate_index,
+    duplicate_index_is_stale,
+)
+
 from .cave_service import (
     get_caves,
     get_cave,
+    get_cave_async,
+    get_cave_grid,
     create_cave,
     update_cave,
     delete_cave,
@@ -29,11 +47,14 @@ from .cave_service import (
     assign_bottle_to_position,
     remove_bottle_from_position,
     consume_bottle_from_position,
+    sync_position_locations,
 )
 
 from .physical_bottle_service import (
     get_physical_bottle_by_qr,
+    get_physical_bottle_by_qr_async,
     get_physical_bottle_with_details,
+    get_physical_bottle_with_details_async,
     get_bottle_physical_bottles,
     generate_qr_codes_for_bottle,
     remove_physical_bottle,
@@ -41,15 +62,48 @@ from .physical_bottle_service import (
     get_physical_bottle_count_in_cellar,
 )
 
-from .upload_service import upload_image, delete_image, upload_image_from_url
+from .upload_service import (
+    upload_image,
+    delete_image,
+    upload_image_from_url,
+    get_image_variant,
+    release_image,
+    sweep_orphan_images,
+    shutdown_image_workers,
+)
 
-from .geo_service import get_geocoded_regions, create_geocoded_region
-from .label_service import generate_label_zip, generate_single_label_pdf
+from .geo_service import (
+    get_geocoded_regions,
+    get_geocoded_regions_async,
+    create_geocoded_region,
+    get_map_regions,
+    request_geocoding,
+    get_geocoder,
+    geocode_pending_regions,
+    wait_for_geocoding_request,
+    stop_geocoding,
+    geocoding_stopped,
+)
+from .label_service import (
+    generate_label_zip,
+    generate_label_sheet,
+    generate_single_label_pdf,
+    shutdown_label_workers,
+)
 
 __all__ = [
     "get_bottles_with_positions",
+    "get_bottles_with_positions_async",
+    "get_bottles_page",
+    "get_bottle_facets",
     "get_bottle_with_position",
     "check_duplicate_bottles",
+    "find_duplicates",
+    "rebuild_duplicate_index",
+    "duplicate_index_is_stale",
+    "get_tags",
+    "rebuild_tag_index",
+    "tag_index_is_stale",
     "create_bottle",
     "update_bottle",
     "patch_bottle",
@@ -57,6 +111,8 @@ __all__ = [
     "validate_bottle_placement",
     "get_caves",
     "get_cave",
+    "get_cave_async",
+    "get_cave_grid",
     "create_cave",
     "update_cave",
     "delete_cave",
@@ -72,8 +128,11 @@ __all__ = [
     "assign_bottle_to_position",
     "remove_bottle_from_position",
     "consume_bottle_from_position",
+    "sync_position_locations",
     "get_physical_bottle_by_qr",
+    "get_physical_bottle_by_qr_async",
     "get_physical_bottle_with_details",
+    "get_physical_bottle_with_details_async",
     "get_bottle_physical_bottles",
     "generate_qr_codes_for_bottle",
     "remove_physical_bottle",
@@ -82,7 +141,21 @@ __all__ = [
     "upload_image",
     "delete_image",
     "upload_image_from_url",
+    "get_image_variant",
+    "release_image",
+    "sweep_orphan_images",
+    "shutdown_image_workers",
     "get_geocoded_regions",
+    "get_geocoded_regions_async",
     "create_geocoded_region",
+    "get_map_regions",
+    "request_geocoding",
+    "get_geocoder",
+    "geocode_pending_regions",
+    "wait_for_geocoding_request",
+    "stop_geocoding",
+    "geocoding_stopped",
     "generate_label_zip",
+    "generate_label_sheet",
+    "shutdown_label_workers",
 ]
@@ -1,11 +1,32 @@
 """Service pour la gestion des bouteilles."""
 
+import base64
+import binascii
+import json
 from datetime import datetime
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import models
 import schemas
-from exceptions import BottleNotFoundException, MaxQuantityReachedException
+from config import MAX_PAGE_SIZE
+from search_index import search_statement
+from .catalog_service import apply_bottle_filters, sort_expression
+from .duplicate_service import find_duplicates, index_bottle, unindex_bottle
+from .geo_service import request_geocoding
+from .tag_service import set_bottle_tags, unset_bottle_tags
+from exceptions import (
+    BottleNotFoundException,
+    InvalidCursorException,
+    MaxQuantityReachedException,
+)
+
+# Champs qui alimentent l'index de doublons
+DUPLICATE_KEY_FIELDS = {"name", "domaine", "year"}
+
+# Séparateur des codes de position agrégés (caractère non saisissable)
+_CODE_SEPARATOR = "\x1f"
 
 
 def _build_position_data(pos: models.Position) -> Optional[Dict[str, Any]]:
@@ -13,22 +34,7 @@ def _build_position_data(pos: models.Position) -> Optional[Dict[str, Any]]:
     if not pos:
         return None
 
-    row = pos.row
-    col = row.column if row else None
-    cave = col.cave if col else None
-
-    return {
-        "id": pos.id,
-        "line": pos.line,
-        "position": pos.position,
-        "row_id": pos.row_id,
-        "row_name": row.name if row else None,
-        "column_id": col.id if col else None,
-        "column_name": col.name if col else None,
-        "cave_id": cave.id if cave else None,
-        "cave_name": cave.name if cave else None,
-        "code": pos.code,
-    }
+    return _serialize_position(pos)
 
 
 def _serialize_physical_bottle(pb: models.PhysicalBottle) -> Dict[str, Any]:
@@ -40,32 +46,22 @@ def _serialize_physical_bottle(pb: models.PhysicalBottle) -> Dict[str, Any]:
         "acquisition_date": pb.acquisition_date,
         "position_id": pb.position_id,
         "position_code": pb.position.code if pb.position else None,
-        "cave_name": (
-            pb.position.row.column.cave.name
-            if pb.position
-            and pb.position.row
-            and pb.position.row.column
-            and pb.position.row.column.cave
-            else None
-        ),
+        "cave_name": pb.position.cave_name if pb.position else None,
     }
 
 
 def _serialize_position(pos: models.Position) -> Dict[str, Any]:
-    """Sérialise une position en dict."""
-    row = pos.row
-    col = row.column if row else None
-    cave = col.cave if col else None
+    """Sérialise une position en dict (localisation dénormalisée)."""
     return {
         "id": pos.id,
         "line": pos.line,
         "position": pos.position,
         "row_id": pos.row_id,
-        "row_name": row.name if row else None,
-        "column_id": col.id if col else None,
-        "column_name": col.name if col else None,
-        "cave_id": cave.id if cave else None,
-        "cave_name": cave.name if cave else None,
+        "row_name": pos.row_name,
+        "column_id": pos.column_id,
+        "column_name": pos.column_name,
+        "cave_id": pos.cave_id,
+        "cave_name": pos.cave_name,
         "code": pos.code,
     }
 
@@ -90,24 +86,147 @@ def _serialize_bottle(bottle: models.Bottle) -> Dict[str, Any]:
     }
 
 
+def _bottles_with_positions_query(skip: int, limit: int):
+    return (
+        select(models.Bottle)
+        .options(
+            joinedload(models.Bottle.physical_bottles).joinedload(
+                models.PhysicalBottle.position
+            )
+        )
+        .offset(skip)
+        .limit(limit)
+    )
+
+
 def get_bottles_with_positions(
     db: Session, skip: int = 0, limit: int = 100
 ) -> List[Dict[str, Any]]:
     """Récupère toutes les bouteilles avec leurs positions."""
-    bottles = (
-        db.query(models.Bottle)
-        .options(
-            joinedload(models.Bottle.physical_bottles)
-            .joinedload(models.PhysicalBottle.position)
-            .joinedload(models.Position.row)
-            .joinedload(models.CaveRow.column)
-            .joinedload(models.CaveColumn.cave)
+    bottles = db.execute(_bottles_with_positions_query(skip, limit)).unique().scalars()
+    return [_serialize_bottle(b) for b in bottles]
+
+
+async def get_bottles_with_positions_async(
+    db: AsyncSession, skip: int = 0, limit: int = 100
+) -> List[Dict[str, Any]]:
+    """Version asynchrone de get_bottles_with_positions (même requête)."""
+    result = await db.execute(_bottles_with_positions_query(skip, limit))
+    return [_serialize_bottle(b) for b in result.unique().scalars()]
+
+
+def _encode_cursor(bottle_id: int, sort: str = "id", key: Any = None) -> str:
+    """Encode la position de la dernière bouteille en curseur opaque.
+
+    Tri par ID : « b:<id> » ; autre tri : « k:[tri, clé, id] » (JSON).
+    """
+    if sort == "id":
+        raw = f"b:{bottle_id}"
+    else:
+        raw = "k:" + json.dumps([sort, key, bottle_id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str = "id") -> Tuple[Any, int]:
+    """Décode un curseur opaque en (clé de tri, ID de bouteille)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded).decode().partition(":")
+        if prefix == "b" and sort == "id":
+            return None, int(value)
+        if prefix == "k":
+            cursor_sort, key, bottle_id = json.loads(value)
+            if cursor_sort == sort:
+                return key, int(bottle_id)
+        raise ValueError(cursor)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursorException(f"Curseur invalide: {cursor}")
+
+
+def get_bottles_page(
+    db: Session,
+    after: Optional[str] = None,
+    limit: int = 100,
+    filters: Optional[schemas.BottleFilters] = None,
+    sort: str = "id",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Liste paginée par curseur (keyset) des bouteilles, en projection seule.
+
+    Les filtres et le tri sont appliqués en SQL ; le curseur porte la clé de
+    tri et l'ID de la dernière ligne, l'ID départageant les ex æquo. Les
+    colonnes du vin sont lues sans hydrater d'objets ORM, puis les agrégats
+    par vin (stock en cave, codes de position) sont calculés par une seule
+    requête groupée sur la page courante.
+
+    Returns:
+        Tuple (bouteilles, curseur suivant ou None si dernière page)
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    columns = [getattr(models.Bottle, name) for name in schemas.Bottle.model_fields]
+    key, descending = sort_expression(sort)
+
+    query = apply_bottle_filters(
+        db.query(*columns, key.label("sort_key")), filters
+    ).order_by(key.desc() if descending else key, models.Bottle.id)
+    if after:
+        after_key, after_id = _decode_cursor(after, sort)
+        if sort == "id":
+            query = query.filter(models.Bottle.id > after_id)
+        else:
+            beyond = key < after_key if descending else key > after_key
+            query = query.filter(
+                or_(beyond, and_(key == after_key, models.Bottle.id > after_id))
+            )
+    rows = query.limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return [], None
+
+    bottle_ids = [row.id for row in rows]
+    aggregates = (
+        db.query(
+            models.PhysicalBottle.bottle_id,
+            func.count(models.PhysicalBottle.id).label("physical_count"),
+            func.sum(
+                case((models.PhysicalBottle.status == "in_cellar", 1), else_=0)
+            ).label("cellar_quantity"),
+            func.aggregate_strings(models.Position.code, _CODE_SEPARATOR).label(
+                "position_codes"
+            ),
         )
-        .offset(skip)
-        .limit(limit)
+        .outerjoin(
+            models.Position, models.Position.id == models.PhysicalBottle.position_id
+        )
+        .filter(models.PhysicalBottle.bottle_id.in_(bottle_ids))
+        .group_by(models.PhysicalBottle.bottle_id)
         .all()
     )
-    return [_serialize_bottle(b) for b in bottles]
+    aggregates_by_bottle = {agg.bottle_id: agg for agg in aggregates}
+
+    items = []
+    for row in rows:
+        agg = aggregates_by_bottle.get(row.id)
+        fields = row._asdict()
+        fields.pop("sort_key")
+        items.append(
+            {
+                **fields,
+                "cellar_quantity": agg.cellar_quantity if agg else 0,
+                "physical_count": agg.physical_count if agg else 0,
+                "position_codes": (
+                    agg.position_codes.split(_CODE_SEPARATOR)
+                    if agg and agg.position_codes
+                    else []
+                ),
+            }
+        )
+
+    next_cursor = (
+        _encode_cursor(bottle_ids[-1], sort, rows[-1].sort_key) if has_more else None
+    )
+    return items, next_cursor
 
 
 def get_bottle_with_position(db: Session, bottle_id: int) -> Dict[str, Any]:
@@ -115,11 +234,9 @@ def get_bottle_with_position(db: Session, bottle_id: int) -> Dict[str, Any]:
     bottle = (
         db.query(models.Bottle)
         .options(
-            joinedload(models.Bottle.physical_bottles)
-            .joinedload(models.PhysicalBottle.position)
-            .joinedload(models.Position.row)
-            .joinedload(models.CaveRow.column)
-            .joinedload(models.CaveColumn.cave)
+            joinedload(models.Bottle.physical_bottles).joinedload(
+                models.PhysicalBottle.position
+            )
         )
         .filter(models.Bottle.id == bottle_id)
         .first()
@@ -131,33 +248,29 @@ def get_bottle_with_position(db: Session, bottle_id: int) -> Dict[str, Any]:
     return _serialize_bottle(bottle)
 
 
-def check_duplicate_bottles(db: Session, name: str, year: int) -> List[Dict[str, Any]]:
-    """Vérifie si des bouteilles similaires existent déjà."""
-    matches = (
-        db.query(models.Bottle)
-        .filter(models.Bottle.name.ilike(f"%{name}%"), models.Bottle.year == year)
-        .all()
-    )
-
-    return [
-        {
-            "id": b.id,
-            "name": b.name,
-            "year": b.year,
-            "domaine": b.domaine,
-            "quantity": b.quantity,
-        }
-        for b in matches
-    ]
+def check_duplicate_bottles(
+    db: Session, name: str, year: int, domaine: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Vérifie si des bouteilles similaires existent déjà (correspondance
+    approximative, candidats notés du plus au moins probable).
+    """
+    return find_duplicates(db, name, year, domaine=domaine)
 
 
 def create_bottle(db: Session, bottle: schemas.BottleCreate) -> models.Bottle:
     """Crée une nouvelle bouteille."""
     db_bottle = models.Bottle(**bottle.model_dump())
     db.add(db_bottle)
+    db.flush()
+    index_bottle(db, db_bottle)
+    if db_bottle.tags:
+        set_bottle_tags(db, db_bottle)
     db.commit()
     db.refresh(db_bottle)
 
+    if db_bottle.region:
+        request_geocoding()
+
     # Générer automatiquement les bouteilles physiques (QR codes) si quantity > 0
     if db_bottle.quantity and db_bottle.quantity > 0:
         from services.physical_bottle_service import generate_qr_codes_for_bottle
@@ -175,14 +288,26 @@ def update_bottle(
     if not db_bottle:
         raise BottleNotFoundException(f"Bottle {bottle_id} not found")
 
+    old_image_path = db_bottle.image_path
     data = bottle_data.model_dump(exclude_unset=True)
     for key, value in data.items():
         setattr(db_bottle, key, value)
 
     db.add(db_bottle)
+    if DUPLICATE_KEY_FIELDS & data.keys():
+        index_bottle(db, db_bottle)
+    if "tags" in data:
+        set_bottle_tags(db, db_bottle)
     db.commit()
     db.refresh(db_bottle)
 
+    # Libérer l'ancienne image si elle a été remplacée
+    if old_image_path != db_bottle.image_path:
+        _release_image(db, old_image_path)
+
+    if data.get("region"):
+        request_geocoding()
+
     # Synchroniser les bouteilles physiques si quantity modifiée
     if "quantity" in data:
         _sync_physical_bottles(db, bottle_id, data.get("quantity"))
@@ -199,14 +324,26 @@ def patch_bottle(
     if not db_bottle:
         raise BottleNotFoundException(f"Bottle {bottle_id} not found")
 
+    old_image_path = db_bottle.image_path
     data = bottle_data.model_dump(exclude_unset=True)
     for key, value in data.items():
         setattr(db_bottle, key, value)
 
     db.add(db_bottle)
+    if DUPLICATE_KEY_FIELDS & data.keys():
+        index_bottle(db, db_bottle)
+    if "tags" in data:
+        set_bottle_tags(db, db_bottle)
     db.commit()
     db.refresh(db_bottle)
 
+    # Libérer l'ancienne image si elle a été remplacée
+    if old_image_path != db_bottle.image_path:
+        _release_image(db, old_image_path)
+
+    if data.get("region"):
+        request_geocoding()
+
     # Synchroniser les bouteilles physiques si quantity modifiée
     if "quantity" in data:
         _sync_physical_bottles(db, bottle_id, data.get("quantity"))
@@ -215,6 +352,13 @@ def patch_bottle(
     return db_bottle
 
 
+def _release_image(db: Session, image_path: Optional[str]) -> None:
+    """Supprime l'image locale si plus aucun vin ne l'utilise."""
+    from services.upload_service import release_image
+
+    release_image(db, image_path)
+
+
 def _sync_physical_bottles(
     db: Session, bottle_id: int, target_quantity: Optional[int]
 ) -> None:
@@ -275,9 +419,14 @@ def delete_bottle(db: Session, bottle_id: int) -> None:
     if not db_bottle:
         raise BottleNotFoundException(f"Bottle {bottle_id} not found")
 
+    image_path = db_bottle.image_path
+    unindex_bottle(db, bottle_id)
+    unset_bottle_tags(db, bottle_id)
     db.delete(db_bottle)
     db.commit()
 
+    _release_image(db, image_path)
+
 
 def validate_bottle_placement(
     db: Session, bottle_id: int, exclude_position_id: Optional[int] = None
@@ -314,26 +463,32 @@ def validate_bottle_placement(
         )
 
 
+def _search_result(b: models.Bottle) -> Dict[str, Any]:
+    return {
+        "id": b.id,
+        "name": b.name,
+        "year": b.year,
+        "domaine": b.domaine,
+        "quantity": b.quantity,
+        "image_path": b.image_path,
+    }
+
+
 def search_bottles_by_name(
     db: Session, query: str, limit: int = 5
 ) -> List[Dict[str, Any]]:
-    """Recherche des bouteilles par nom (recherche partielle)."""
-    bottles = (
-        db.query(models.Bottle)
-        .filter(models.Bottle.name.ilike(f"%{query}%"))
-        .order_by(models.Bottle.name)
-        .limit(limit)
-        .all()
-    )
+    """Recherche des bouteilles sur tous les champs texte (index FTS5 ou trigrammes).
+
+    Préfixes insensibles aux accents, résultats classés par pertinence avec
+    un poids plus fort sur le nom puis le domaine.
+    """
+    statement = search_statement(db.get_bind().dialect.name, query)
+    if statement is None:
+        if query.strip():
+            return []  # saisie sans aucun mot (ponctuation seule) : aucun vin
+        bottles = db.query(models.Bottle).order_by(models.Bottle.name).limit(limit)
+        return [_search_result(b) for b in bottles]
+
+    rows = db.execute(statement, {"limit": limit})
+    return [dict(row._mapping) for row in rows]
 
-    return [
-        {
-            "id": b.id,
-            "name": b.name,
-            "year": b.year,
-            "domaine": b.domaine,
-            "quantity": b.quantity,
-            "image_path": b.image_path,
-        }
-        for b in bottles
-    ]
@@ -0,0 +1,205 @@
+"""Filtres, tris et facettes du catalogue de vins (GET /bottles).
+
+Tout est calculé en SQL : chaque filtre devient une clause WHERE sur
+`bottles`, l'état en cave un EXISTS sur physical_bottles, et chaque facette
+un GROUP BY sur une colonne indexée. Le client ne reçoit qu'une page de
+résultats et les compteurs, jamais la cave entière.
+"""
+
+from datetime import datetime
+from sqlalchemy import and_, case, exists, false, func, or_
+from sqlalchemy.orm import Query, Session, aliased
+from typing import Any, Dict, Optional, Tuple
+
+import models
+import schemas
+from search_index import search_clause
+from .tag_service import tag_filter_clause
+
+# Valeur de substitution des NULL pour le tri : toujours en fin de liste
+_NULLS_LAST = 2**31 - 1
+
+_SORT_COLUMNS = {
+    "id": models.Bottle.id,
+    "name": func.lower(models.Bottle.name),
+    "year": models.Bottle.year,
+    "price": models.Bottle.price,
+    "rating": models.Bottle.rating,
+}
+
+
+def _in_cellar():
+    # Alias : la requête englobante peut déjà joindre physical_bottles
+    pb = aliased(models.PhysicalBottle)
+    return exists().where(pb.bottle_id == models.Bottle.id, pb.status == "in_cellar")
+
+
+def _has_physical_bottles():
+    pb = aliased(models.PhysicalBottle)
+    return exists().where(pb.bottle_id == models.Bottle.id)
+
+
+def color_expression():
+    """Couleur déduite du type saisi (mêmes règles que l'affichage)."""
+    type_ = func.lower(func.coalesce(models.Bottle.type, ""))
+    return case(
+        (type_.contains("rouge"), "RED"),
+        (type_.contains("blanc"), "WHITE"),
+        (or_(type_.contains("rosé"), type_.contains("rose")), "ROSE"),
+        (
+            or_(
+                type_.contains("champagne"),
+                type_.contains("crémant"),
+                type_.contains("effervescent"),
+            ),
+            "EFFERVESCENT",
+        ),
+        else_="OTHER",
+    )
+
+
+def phase_expression(current_year: Optional[int] = None):
+    """Phase d'évolution à l'année courante ; NULL sans millésime ni bornes.
+
+    Bornes par défaut quand elles manquent : jeunesse jusqu'à millésime + 1,
+    maturité + 4, apogée + 9.
+    """
+    b = models.Bottle
+    current_year = current_year or datetime.now().year
+    return case(
+        (b.year.is_(None), None),
+        (
+            and_(
+                b.jeunesse_end.is_(None),
+                b.maturite_end.is_(None),
+                b.apogee_end.is_(None),
+            ),
+            None,
+        ),
+        (current_year <= func.coalesce(b.jeunesse_end, b.year + 1), "JEUNESSE"),
+        (current_year <= func.coalesce(b.maturite_end, b.year + 4), "MATURITE"),
+        (current_year <= func.coalesce(b.apogee_end, b.year + 9), "APOGEE"),
+        else_="DECLIN",
+    )
+
+
+def _fts_clause(query: Query, q: str):
+    dialect = query.session.get_bind().dialect.name
+    return search_clause(dialect, q, models.Bottle.id)
+
+
+def apply_bottle_filters(
+    query: Query, filters: Optional[schemas.BottleFilters], with_status: bool = True
+) -> Query:
+    """Ajoute les clauses des filtres à une requête portant sur `bottles`."""
+    if filters is None:
+        return query
+    b = models.Bottle
+
+    for field in ("type", "country", "region", "domaine", "cepage"):
+        value = getattr(filters, field)
+        if value:
+            query = query.filter(getattr(b, field) == value)
+    if filters.year is not None:
+        query = query.filter(b.year == filters.year)
+    if filters.year_min is not None:
+        query = query.filter(b.year >= filters.year_min)
+    if filters.year_max is not None:
+        query = query.filter(b.year <= filters.year_max)
+    if filters.favorite is True:
+        query = query.filter(b.is_favorite.is_(True))
+    elif filters.favorite is False:
+        query = query.filter(or_(b.is_favorite.is_(False), b.is_favorite.is_(None)))
+    if filters.tag:
+        query = query.filter(tag_filter_clause(filters.tag))
+    if filters.color:
+        query = query.filter(color_expression() == filters.color)
+    if filters.phase:
+        query = query.filter(phase_expression() == filters.phase)
+    if filters.q and filters.q.strip():
+        clause = _fts_clause(query, filters.q)
+        # Saisie sans aucun mot (ponctuation seule) : aucun vin ne correspond
+        query = query.filter(clause if clause is not None else false())
+
+    if with_status and filters.status == "cellar":
+        query = query.filter(_in_cellar())
+    elif with_status and filters.status == "history":
+        query = query.filter(~_in_cellar(), _has_physical_bottles())
+    return query
+
+
+def sort_expression(sort: str) -> Tuple[Any, bool]:
+    """Expression de tri et sens (True = décroissant) pour un tri « [-]champ »."""
+    descending = sort.startswith("-")
+    key = _SORT_COLUMNS[sort.lstrip("-")]
+    if sort.lstrip("-") in ("year", "price", "rating"):
+        key = func.coalesce(key, -_NULLS_LAST if descending else _NULLS_LAST)
+    return key, descending
+
+
+def _group_counts(db: Session, key, filters) -> Dict[str, int]:
+    query = (
+        db.query(key, func.count(models.Bottle.id))
+        .filter(key.isnot(None))
+        .group_by(key)
+    )
+    rows = apply_bottle_filters(query, filters).all()
+    return {str(value): count for value, count in rows if value != ""}
+
+
+def _tag_counts(db: Session, filters) -> Dict[str, int]:
+    """Vins par tag, via l'index inversé bottle_tags."""
+    count = func.count(models.BottleTag.bottle_id)
+    query = (
+        db.query(models.Tag.name, count)
+        .select_from(models.BottleTag)
+        .join(models.Tag, models.Tag.id == models.BottleTag.tag_id)
+        .join(models.Bottle, models.Bottle.id == models.BottleTag.bottle_id)
+        .group_by(models.Tag.id, models.Tag.name)
+        .order_by(count.desc(), models.Tag.key)
+    )
+    return dict(apply_bottle_filters(query, filters).all())
+
+
+def get_bottle_facets(
+    db: Session, filters: Optional[schemas.BottleFilters] = None
+) -> Dict[str, Any]:
+    """Totaux et compteurs par valeur pour la sélection courante.
+
+    Les compteurs `status` (en cave / historique) ignorent le filtre de
+    statut pour alimenter les onglets ; tous les autres le respectent.
+    """
+    b = models.Bottle
+    pb = models.PhysicalBottle
+
+    wine_count = apply_bottle_filters(db.query(func.count(b.id)), filters).scalar()
+
+    stock = (
+        db.query(func.count(pb.id), func.coalesce(func.sum(b.price), 0))
+        .select_from(b)
+        .join(pb, pb.bottle_id == b.id)
+        .filter(pb.status == "in_cellar")
+    )
+    bottle_count, total_value = apply_bottle_filters(stock, filters).one()
+
+    in_cellar = _in_cellar()
+    status = db.query(
+        func.coalesce(func.sum(case((in_cellar, 1), else_=0)), 0),
+        func.coalesce(
+            func.sum(case((and_(~in_cellar, _has_physical_bottles()), 1), else_=0)),
+            0,
+        ),
+    ).select_from(b)
+    cellar, history = apply_bottle_filters(status, filters, with_status=False).one()
+
+    return {
+        "wine_count": wine_count,
+        "bottle_count": bottle_count,
+        "total_value": round(float(total_value), 2),
+        "status": {"cellar": cellar, "history": history},
+        "type": _group_counts(db, b.type, filters),
+        "country": _group_counts(db, b.country, filters),
+        "region": _group_counts(db, b.region, filters),
+        "year": _group_counts(db, (b.year // 10) * 10, filters),
+        "tag": _tag_counts(db, filters),
+    }
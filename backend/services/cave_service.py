@@ -1,5 +1,8 @@
 """Service pour la gestion des caves."""
 
+from sqlalchemy import String, cast, delete, exists, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 import models
@@ -12,6 +15,68 @@ from exceptions import (
 )
 
 
+# === LOCALISATION DÉNORMALISÉE ===
+
+
+def sync_position_locations(
+    db: Session,
+    row_id: Optional[int] = None,
+    column_id: Optional[int] = None,
+    cave_id: Optional[int] = None,
+) -> None:
+    """Recalcule la localisation dénormalisée (code, noms, IDs) des positions.
+
+    Le périmètre est restreint à une rangée, une colonne ou une cave ; sans
+    filtre, toutes les positions sont recalculées. Un seul UPDATE est émis,
+    les valeurs étant lues dans la hiérarchie par sous-requêtes corrélées.
+    """
+    Position = models.Position
+    row_of_position = models.CaveRow.id == Position.row_id
+    column_of_row = models.CaveColumn.id == models.CaveRow.column_id
+    cave_of_column = models.Cave.id == models.CaveColumn.cave_id
+
+    row_name = select(models.CaveRow.name).where(row_of_position).scalar_subquery()
+    column = select(models.CaveColumn).join(
+        models.CaveRow, column_of_row
+    ).where(row_of_position)
+    column_name = column.with_only_columns(models.CaveColumn.name).scalar_subquery()
+    cave = column.join(models.Cave, cave_of_column)
+
+    stmt = update(Position).values(
+        row_name=row_name,
+        column_id=column.with_only_columns(models.CaveColumn.id).scalar_subquery(),
+        column_name=column_name,
+        cave_id=cave.with_only_columns(models.Cave.id).scalar_subquery(),
+        cave_name=cave.with_only_columns(models.Cave.name).scalar_subquery(),
+        code=column_name
+        + "-"
+        + row_name
+        + "-L"
+        + cast(Position.line, String)
+        + "-P"
+        + cast(Position.position, String),
+    )
+
+    if row_id is not None:
+        stmt = stmt.where(Position.row_id == row_id)
+    if column_id is not None:
+        stmt = stmt.where(
+            Position.row_id.in_(
+                select(models.CaveRow.id).where(models.CaveRow.column_id == column_id)
+            )
+        )
+    if cave_id is not None:
+        stmt = stmt.where(
+            Position.row_id.in_(
+                select(models.CaveRow.id)
+                .join(models.CaveColumn, column_of_row)
+                .where(models.CaveColumn.cave_id == cave_id)
+            )
+        )
+
+    db.execute(stmt, execution_options={"synchronize_session": False})
+
+
 # === CAVES ===
 
 
@@ -30,10 +95,10 @@ def get_caves(db: Session) -> List[models.Cave]:
     )
 
 
-def get_cave(db: Session, cave_id: int) -> models.Cave:
-    """Récupère une cave par son ID."""
-    cave = (
-        db.query(models.Cave)
+def _cave_query(cave_id: int):
+    """Cave et toute sa structure chargées d'un coup (aucun chargement différé)."""
+    return (
+        select(models.Cave)
         .options(
             joinedload(models.Cave.columns)
             .joinedload(models.CaveColumn.rows)
@@ -41,16 +106,137 @@ def get_cave(db: Session, cave_id: int) -> models.Cave:
             .joinedload(models.Position.physical_bottle)
             .joinedload(models.PhysicalBottle.bottle)
         )
-        .filter(models.Cave.id == cave_id)
-        .first()
+        .where(models.Cave.id == cave_id)
     )
 
+
+def get_cave(db: Session, cave_id: int) -> models.Cave:
+    """Récupère une cave par son ID."""
+    cave = db.execute(_cave_query(cave_id)).unique().scalars().first()
+
     if not cave:
         raise CaveNotFoundException(f"Cave {cave_id} not found")
 
     return cave
 
 
+async def get_cave_async(db: AsyncSession, cave_id: int) -> models.Cave:
+    """Version asynchrone de get_cave (même requête)."""
+    result = await db.execute(_cave_query(cave_id))
+    cave = result.unique().scalars().first()
+
+    if not cave:
+        raise CaveNotFoundException(f"Cave {cave_id} not found")
+
+    return cave
+
+
+GRID_SLOT_FIELDS = ["id", "line", "position", "bottle_id", "qr_code", "type"]
+
+
+def get_cave_grid(db: Session, cave_id: int) -> dict:
+    """Récupère la grille d'occupation compacte d'une cave.
+
+    Toute la structure (colonnes, rangées, positions occupées ou non) est lue
+    en une seule requête à plat ; chaque position devient une liste de valeurs
+    ordonnées selon GRID_SLOT_FIELDS. Les vins présents sont renvoyés une
+    seule fois dans un dictionnaire indexé par ID.
+    """
+    rows = (
+        db.query(
+            models.Cave.name.label("cave_name"),
+            models.CaveColumn.id.label("column_id"),
+            models.CaveColumn.name.label("column_name"),
+            models.CaveColumn.order.label("column_order"),
+            models.CaveRow.id.label("row_id"),
+            models.CaveRow.name.label("row_name"),
+            models.CaveRow.width,
+            models.CaveRow.height,
+            models.CaveRow.order.label("row_order"),
+            models.Position.id.label("position_id"),
+            models.Position.line,
+            models.Position.position,
+            models.PhysicalBottle.bottle_id,
+            models.PhysicalBottle.qr_code,
+            models.Bottle.type,
+        )
+        .outerjoin(models.CaveColumn, models.CaveColumn.cave_id == models.Cave.id)
+        .outerjoin(models.CaveRow, models.CaveRow.column_id == models.CaveColumn.id)
+        .outerjoin(models.Position, models.Position.row_id == models.CaveRow.id)
+        .outerjoin(
+            models.PhysicalBottle,
+            models.PhysicalBottle.position_id == models.Position.id,
+        )
+        .outerjoin(models.Bottle, models.Bottle.id == models.PhysicalBottle.bottle_id)
+        .filter(models.Cave.id == cave_id)
+        .order_by(
+            models.CaveColumn.order,
+            models.CaveColumn.id,
+            models.CaveRow.order,
+            models.CaveRow.id,
+            models.Position.line,
+            models.Position.position,
+        )
+        .all()
+    )
+
+    if not rows:
+        raise CaveNotFoundException(f"Cave {cave_id} not found")
+
+    columns = {}
+    grid_rows = {}
+    bottle_ids = set()
+    for r in rows:
+        if r.column_id is None:
+            continue
+        if r.column_id not in columns:
+            columns[r.column_id] = {
+                "id": r.column_id,
+                "name": r.column_name,
+                "order": r.column_order,
+                "rows": [],
+            }
+        if r.row_id is None:
+            continue
+        if r.row_id not in grid_rows:
+            grid_rows[r.row_id] = {
+                "id": r.row_id,
+                "name": r.row_name,
+                "width": r.width,
+                "height": r.height,
+                "order": r.row_order,
+                "slots": [],
+            }
+            columns[r.column_id]["rows"].append(grid_rows[r.row_id])
+        if r.position_id is None:
+            continue
+        grid_rows[r.row_id]["slots"].append(
+            [r.position_id, r.line, r.position, r.bottle_id, r.qr_code, r.type]
+        )
+        if r.bottle_id is not None:
+            bottle_ids.add(r.bottle_id)
+
+    wines = {}
+    if bottle_ids:
+        summary_columns = [
+            getattr(models.Bottle, name) for name in schemas.BottleSummary.model_fields
+        ]
+        wines = {
+            w.id: w._asdict()
+            for w in db.query(*summary_columns)
+            .filter(models.Bottle.id.in_(bottle_ids))
+            .all()
+        }
+
+    return {
+        "id": cave_id,
+        "name": rows[0].cave_name,
+        "slot_fields": GRID_SLOT_FIELDS,
+        "columns": list(columns.values()),
+        "wines": wines,
+    }
+
+
 def create_cave(db: Session, cave: schemas.CaveCreate) -> models.Cave:
     """Crée une nouvelle cave."""
     db_cave = models.Cave(name=cave.name)
@@ -68,6 +254,8 @@ def update_cave(db: Session, cave_id: int, cave: schemas.CaveCreate) -> models.C
 
     db_cave.name = cave.name  # type: ignore
     db.add(db_cave)
+    db.flush()
+    sync_position_locations(db, cave_id=cave_id)
     db.commit()
     db.refresh(db_cave)
     return db_cave
@@ -116,6 +304,8 @@ def update_column(
     db_column.name = column.name  # type: ignore
     db_column.order = column.order or 0  # type: ignore
     db.add(db_column)
+    db.flush()
+    sync_position_locations(db, column_id=column_id)
     db.commit()
     db.refresh(db_column)
     return db_column
@@ -156,17 +346,18 @@ def create_row(
     # Transaction atomique (sans db.begin, déjà ouverte par FastAPI)
     db.add(db_row)
     db.flush()
-    db.refresh(db_row)
 
-    # Créer automatiquement les positions
-    positions_to_create = []
-    for line in range(1, row.height + 1):
-        for pos in range(1, row.width + 1):
-            positions_to_create.append(
-                models.Position(row_id=db_row.id, line=line, position=pos)
-            )
-
-    db.add_all(positions_to_create)
+    # Créer automatiquement les positions (insertion groupée, sans objets ORM)
+    _insert_positions(
+        db,
+        db_row.id,
+        [
+            (line, pos)
+            for line in range(1, row.height + 1)
+            for pos in range(1, row.width + 1)
+        ],
+    )
+    sync_position_locations(db, row_id=db_row.id)
     db.commit()
     db.refresh(db_row)
 
@@ -174,7 +365,12 @@ def create_row(
 
 
 def update_row(db: Session, row_id: int, row: schemas.CaveRowCreate) -> models.CaveRow:
-    """Met à jour une rangée et recrée les positions si dimensions changées."""
+    """Met à jour une rangée et ajuste les positions si dimensions changées.
+
+    Le redimensionnement est incrémental : seules les positions hors de la
+    nouvelle grille sont supprimées et seules les positions manquantes sont
+    créées, les autres conservent leur ID.
+    """
     db_row = db.query(models.CaveRow).filter(models.CaveRow.id == row_id).first()
     if not db_row:
         raise RowNotFoundException(f"Row {row_id} not found")
@@ -187,36 +383,52 @@ def update_row(db: Session, row_id: int, row: schemas.CaveRowCreate) -> models.C
     db_row.height = row.height  # type: ignore
     db_row.order = row.order or 0  # type: ignore
 
-    # Recréer les positions si dimensions changées
+    # Ajuster les positions si dimensions changées
     if row.width != old_width or row.height != old_height:
-        # Vérifier s'il y a des positions occupées
-        from sqlalchemy import exists
+        out_of_bounds = (
+            models.Position.row_id == row_id,
+            or_(models.Position.line > row.height, models.Position.position > row.width),
+        )
 
+        # Vérifier qu'aucune position à supprimer n'est occupée
         occupied = (
             db.query(models.Position)
             .filter(
-                models.Position.row_id == row_id,
+                *out_of_bounds,
                 exists().where(models.PhysicalBottle.position_id == models.Position.id),
             )
             .count()
         )
         if occupied > 0:
             raise Exception(
-                f"Impossible de modifier les dimensions : {occupied} position(s) occupée(s). "
-                "Veuillez d'abord retirer les bouteilles."
+                f"Impossible de modifier les dimensions : {occupied} position(s) occupée(s) "
+                "hors des nouvelles dimensions. Veuillez d'abord retirer les bouteilles."
             )
 
-        db.query(models.Position).filter(models.Position.row_id == row_id).delete()
+        db.execute(
+            delete(models.Position).where(*out_of_bounds),
+            execution_options={"synchronize_session": False},
+        )
 
-        positions_to_create = []
-        for line in range(1, row.height + 1):
-            for pos in range(1, row.width + 1):
-                positions_to_create.append(
-                    models.Position(row_id=row_id, line=line, position=pos)
-                )
-        db.add_all(positions_to_create)
+        existing = set(
+            db.query(models.Position.line, models.Position.position)
+            .filter(models.Position.row_id == row_id)
+            .all()
+        )
+        _insert_positions(
+            db,
+            row_id,
+            [
+                (line, pos)
+                for line in range(1, row.height + 1)
+                for pos in range(1, row.width + 1)
+                if (line, pos) not in existing
+            ],
+        )
 
     db.add(db_row)
+    db.flush()
+    sync_position_locations(db, row_id=row_id)
     db.commit()
     db.refresh(db_row)
     return db_row
@@ -235,6 +447,16 @@ def delete_row(db: Session, row_id: int) -> None:
 # === POSITIONS ===
 
 
+def _insert_positions(db: Session, row_id: int, slots: List[tuple]) -> None:
+    """Insère les positions (ligne, position) d'une rangée en un seul executemany."""
+    if not slots:
+        return
+    db.execute(
+        insert(models.Position),
+        [{"row_id": row_id, "line": line, "position": pos} for line, pos in slots],
+    )
+
+
 def get_positions_for_row(db: Session, row_id: int) -> List[models.Position]:
     """Récupère toutes les positions d'une rangée avec les bouteilles associées."""
     return (
@@ -252,25 +474,14 @@ def get_positions_for_row(db: Session, row_id: int) -> List[models.Position]:
 def create_position(
     db: Session, row_id: int, position: schemas.PositionCreate
 ) -> models.Position:
-    """Crée une nouvelle position."""
-    row = db.query(models.CaveRow).filter(models.CaveRow.id == row_id).first()
-    if not row:
-        raise RowNotFoundException(f"Row {row_id} not found")
-
-    db_position = models.Position(
-        row_id=row_id, line=position.line, position=position.position
-    )
-    db.add(db_position)
-    db.commit()
-    db.refresh(db_position)
-    return db_position
+    """Crée une nouvelle position (ou retourne celle qui occupe déjà l'emplacement)."""
+    return get_or_create_position(db, row_id, position.line, position.position)
 
 
-def get_or_create_position(
+def _find_position(
     db: Session, row_id: int, line: int, pos: int
-) -> models.Position:
-    """Récupère une position existante ou la crée si elle n'existe pas."""
-    db_position = (
+) -> Optional[models.Position]:
+    return (
         db.query(models.Position)
         .filter(
             models.Position.row_id == row_id,
@@ -280,13 +491,26 @@ def get_or_create_position(
         .first()
     )
 
+
+def get_or_create_position(
+    db: Session, row_id: int, line: int, pos: int
+) -> models.Position:
+    """Récupère une position existante ou la crée si elle n'existe pas."""
+    db_position = _find_position(db, row_id, line, pos)
+
     if not db_position:
         row = db.query(models.CaveRow).filter(models.CaveRow.id == row_id).first()
         if not row:
             raise RowNotFoundException(f"Row {row_id} not found")
 
-        db_position = models.Position(row_id=row_id, line=line, position=pos)
-        db.add(db_position)
+        try:
+            with db.begin_nested():
+                db_position = models.Position(row_id=row_id, line=line, position=pos)
+                db.add(db_position)
+        except IntegrityError:
+            # Créée entre-temps par une autre requête (index unique row/line/position)
+            return _find_position(db, row_id, line, pos)
+        sync_position_locations(db, row_id=row_id)
         db.commit()
         db.refresh(db_position)
 
@@ -297,8 +521,13 @@ def assign_bottle_to_position(
     db: Session, position_id: int, bottle_id: Optional[int]
 ) -> models.Position:
     """Assigne une bouteille physique à une position (ou la retire si None)."""
+    # Verrou de ligne (PostgreSQL) : deux placements simultanés sur la même
+    # position s'exécutent l'un après l'autre ; sans effet sous SQLite
     db_position = (
-        db.query(models.Position).filter(models.Position.id == position_id).first()
+        db.query(models.Position)
+        .filter(models.Position.id == position_id)
+        .with_for_update()
+        .first()
     )
     if not db_position:
         raise PositionNotFoundException(f"Position {position_id} not found")
@@ -316,6 +545,7 @@ def assign_bottle_to_position(
                 models.PhysicalBottle.position_id == None,
                 models.PhysicalBottle.status == "in_cellar",
             )
+            .with_for_update(skip_locked=True)
             .first()
         )
         if physical_bottle:
@@ -330,7 +560,10 @@ def assign_bottle_to_position(
 def remove_bottle_from_position(db: Session, position_id: int) -> None:
     """Retire une bouteille d'une position (bouteille devient non placée mais reste en cave en stock)."""
     db_position = (
-        db.query(models.Position).filter(models.Position.id == position_id).first()
+        db.query(models.Position)
+        .filter(models.Position.id == position_id)
+        .with_for_update()
+        .first()
     )
     if not db_position:
         raise PositionNotFoundException(f"Position {position_id} not found")
@@ -348,7 +581,10 @@ def consume_bottle_from_position(db: Session, position_id: int) -> None:
     from datetime import datetime
 
     db_position = (
-        db.query(models.Position).filter(models.Position.id == position_id).first()
+        db.query(models.Position)
+        .filter(models.Position.id == position_id)
+        .with_for_update()
+        .first()
     )
     if not db_position:
         raise PositionNotFoundException(f"Position {position_id} not found")
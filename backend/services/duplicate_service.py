@@ -0,0 +1,183 @@
+"""Détection de doublons approximative (trigrammes) à la création d'un vin.
+
+Chaque vin est indexé dans `bottle_ngrams` par (millésime, trigramme) à
+partir de son nom et de son domaine normalisés : minuscules, sans accents,
+abréviations développées (« Ch. » → « chateau ») et mots vides retirés.
+La recherche ne lit que les listes du millésime demandé, puis note les
+candidats par coefficient de Dice sur leurs ensembles de trigrammes.
+"""
+
+import re
+import unicodedata
+from sqlalchemy import delete, func, insert
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import models
+
+# Score minimal (Dice, 0..1) pour signaler un doublon probable
+DUPLICATE_MIN_SCORE = 0.6
+# Candidats relus depuis l'index avant notation
+DUPLICATE_CANDIDATES = 20
+
+ABBREVIATIONS = {
+    "ch": "chateau",
+    "chat": "chateau",
+    "chx": "chateau",
+    "dom": "domaine",
+    "dne": "domaine",
+    "st": "saint",
+    "ste": "sainte",
+    "mt": "mont",
+}
+STOPWORDS = {"d", "l", "de", "du", "des", "la", "le", "les", "et", "en"}
+# Marque d'un vin indexé sans trigramme (nom vide, fait de mots vides…) : il
+# compte comme indexé sans jamais être candidat (les trigrammes font 3 caractères)
+NO_GRAM = ""
+
+
+def normalize_tokens(text: Optional[str]) -> List[str]:
+    """Découpe et normalise un libellé de vin en mots comparables."""
+    text = unicodedata.normalize("NFD", text or "")
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    tokens = [ABBREVIATIONS.get(t, t) for t in tokens]
+    return [t for t in tokens if t not in STOPWORDS]
+
+
+def trigrams(tokens: Iterable[str]) -> Set[str]:
+    """Trigrammes de chaque mot, bordés comme pg_trgm (« ␣␣m », « ␣ma », …, « ux␣ »)."""
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _year_key(year: Optional[int]) -> int:
+    return year or 0
+
+
+def _bottle_grams(name: Optional[str], domaine: Optional[str]) -> Set[str]:
+    """Trigrammes indexés d'un vin, NO_GRAM s'il n'en a aucun."""
+    grams = trigrams(normalize_tokens(name)) | trigrams(normalize_tokens(domaine))
+    return grams or {NO_GRAM}
+
+
+def index_bottle(db: Session, bottle: models.Bottle) -> None:
+    """(Ré)indexe un vin ; à appeler dans la transaction qui l'écrit."""
+    unindex_bottle(db, bottle.id)
+    year = _year_key(bottle.year)
+    db.execute(
+        insert(models.BottleNgram),
+        [
+            {"year": year, "gram": g, "bottle_id": bottle.id}
+            for g in _bottle_grams(bottle.name, bottle.domaine)
+        ],
+    )
+
+
+def unindex_bottle(db: Session, bottle_id: int) -> None:
+    db.execute(
+        delete(models.BottleNgram).where(models.BottleNgram.bottle_id == bottle_id)
+    )
+
+
+def rebuild_duplicate_index(db: Session) -> int:
+    """Reconstruit tout l'index depuis `bottles`. Retourne le nombre de vins."""
+    db.execute(delete(models.BottleNgram))
+    rows = db.query(
+        models.Bottle.id, models.Bottle.name, models.Bottle.domaine, models.Bottle.year
+    ).all()
+    batch = [
+        {"year": _year_key(year), "gram": g, "bottle_id": bottle_id}
+        for bottle_id, name, domaine, year in rows
+        for g in _bottle_grams(name, domaine)
+    ]
+    if batch:
+        # executemany sur la table, sans passer par l'ORM : l'index compte
+        # ~30 lignes par vin
+        db.connection().execute(insert(models.BottleNgram.__table__), batch)
+    db.commit()
+    return len(rows)
+
+
+def duplicate_index_is_stale(db: Session) -> bool:
+    """Vrai si des vins manquent à l'index (base migrée, imports en SQL brut).
+
+    Chaque vin y a au moins une ligne, NO_GRAM à défaut de trigramme.
+    """
+    indexed = db.query(func.count(func.distinct(models.BottleNgram.bottle_id))).scalar()
+    return indexed != db.query(func.count(models.Bottle.id)).scalar()
+
+
+def find_duplicates(
+    db: Session,
+    name: str,
+    year: Optional[int],
+    domaine: Optional[str] = None,
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    """Vins du même millésime dont le nom (et le domaine) ressemblent à la saisie.
+
+    Retourne les candidats notés (score de 0 à 1), du plus probable au moins probable.
+    """
+    name_grams = trigrams(normalize_tokens(name))
+    query_grams = name_grams | trigrams(normalize_tokens(domaine))
+    if not query_grams:
+        return []
+
+    ngram = models.BottleNgram
+    # Un doublon au-dessus du seuil partage forcément une part des trigrammes
+    min_shared = max(1, int(len(name_grams) * DUPLICATE_MIN_SCORE / 2))
+    shared = func.count(ngram.gram)
+    candidate_ids = [
+        row[0]
+        for row in db.query(ngram.bottle_id)
+        .filter(ngram.year == _year_key(year), ngram.gram.in_(query_grams))
+        .group_by(ngram.bottle_id)
+        .having(shared >= min_shared)
+        .order_by(shared.desc())
+        .limit(DUPLICATE_CANDIDATES)
+    ]
+    if not candidate_ids:
+        return []
+
+    candidates = (
+        db.query(
+            models.Bottle.id,
+            models.Bottle.name,
+            models.Bottle.year,
+            models.Bottle.domaine,
+            models.Bottle.quantity,
+        )
+        .filter(models.Bottle.id.in_(candidate_ids))
+        .all()
+    )
+
+    matches = []
+    for c in candidates:
+        # Nom seul, ou nom + domaine quand l'un des deux côtés le précise
+        c_name = trigrams(normalize_tokens(c.name))
+        c_full = c_name | trigrams(normalize_tokens(c.domaine)) if c.domaine else c_name
+        score = max(_dice(name_grams, c_name), _dice(query_grams, c_full))
+        if score >= DUPLICATE_MIN_SCORE:
+            matches.append(
+                {
+                    "id": c.id,
+                    "name": c.name,
+                    "year": c.year,
+                    "domaine": c.domaine,
+                    "quantity": c.quantity,
+                    "score": round(score, 3),
+                }
+            )
+
+    matches.sort(key=lambda m: m["score"], reverse=True)
+    return matches[:limit]
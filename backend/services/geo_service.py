@@ -1,9 +1,49 @@
-"""Service pour la gestion des régions géocodées."""
+"""Service pour la gestion des régions géocodées.
 
+Les coordonnées sont résolues côté serveur par une tâche de fond unique :
+gazetteer embarqué d'abord, puis géocodeur externe (une requête à la fois,
+espacées de GEOCODER_MIN_INTERVAL). Les échecs sont mémorisés dans
+geocode_misses pour ne pas réinterroger le fournisseur avant
+GEOCODE_RETRY_DAYS. La carte ne lit que des coordonnées précalculées.
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
 import models
 import schemas
+from config import (
+    GEOCODER,
+    GEOCODER_MIN_INTERVAL,
+    GEOCODER_URL,
+    GEOCODER_USER_AGENT,
+    GEOCODE_MAX_NETWORK_ERRORS,
+    GEOCODE_RETRY_DAYS,
+    GEOCODE_WAKEUP_FILE,
+    GEOCODE_WAKEUP_POLL_SECONDS,
+)
+from wine_regions import WINE_REGIONS
+
+Coords = Tuple[float, float]
+BBox = Tuple[float, float, float, float]
+
+# Réveil de la tâche de fond (nouvelle région saisie) et arrêt
+_wakeup = threading.Event()
+_stop = threading.Event()
+_last_request = 0.0
+# Dernier signal des autres workers déjà pris en compte (mtime du fichier)
+_wakeup_seen = 0.0
 
 
 def get_geocoded_regions(db: Session) -> List[models.GeocodedRegion]:
@@ -11,6 +51,97 @@ def get_geocoded_regions(db: Session) -> List[models.GeocodedRegion]:
     return db.query(models.GeocodedRegion).all()
 
 
+async def get_geocoded_regions_async(db: AsyncSession) -> List[models.GeocodedRegion]:
+    """Version asynchrone de get_geocoded_regions."""
+    result = await db.execute(select(models.GeocodedRegion))
+    return list(result.scalars())
+
+
+def _bbox_filter(query, bbox: BBox):
+    """Restreint aux régions dans la boîte (min_lon, min_lat, max_lon, max_lat).
+
+    Une boîte avec min_lon > max_lon traverse l'antiméridien.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    region = models.GeocodedRegion
+    query = query.filter(region.lat.between(min_lat, max_lat))
+    if min_lon <= max_lon:
+        return query.filter(region.lon.between(min_lon, max_lon))
+    return query.filter(or_(region.lon >= min_lon, region.lon <= max_lon))
+
+
+def get_map_regions(
+    db: Session, bbox: Optional[BBox] = None, top: int = 10
+) -> List[Dict[str, Any]]:
+    """Agrège les vins par région géocodée pour la carte.
+
+    Un GROUP BY (région, type) joint à geocoded_regions donne les compteurs ;
+    une seconde requête fenêtrée donne les `top` vins les mieux fournis.
+    """
+    bottle = models.Bottle
+    region = models.GeocodedRegion
+
+    counts = (
+        db.query(
+            region.name,
+            region.lat,
+            region.lon,
+            bottle.type,
+            func.count(bottle.id),
+            func.coalesce(func.sum(bottle.quantity), 0),
+        )
+        .join(bottle, bottle.region == region.name)
+        .group_by(region.name, region.lat, region.lon, bottle.type)
+    )
+    if bbox:
+        counts = _bbox_filter(counts, bbox)
+
+    regions: Dict[str, Dict[str, Any]] = {}
+    for name, lat, lon, type_, wines, bottles in counts.all():
+        entry = regions.setdefault(
+            name,
+            {
+                "name": name,
+                "lat": lat,
+                "lon": lon,
+                "wine_count": 0,
+                "bottle_count": 0,
+                "types": {},
+                "top_wine_ids": [],
+            },
+        )
+        entry["wine_count"] += wines
+        entry["bottle_count"] += bottles
+        if type_:
+            entry["types"][type_] = entry["types"].get(type_, 0) + wines
+
+    if not regions:
+        return []
+
+    rank = (
+        func.row_number()
+        .over(
+            partition_by=bottle.region,
+            order_by=(bottle.quantity.desc(), bottle.id),
+        )
+        .label("rank")
+    )
+    ranked = (
+        db.query(bottle.id.label("id"), bottle.region.label("region"), rank)
+        .filter(bottle.region.in_(list(regions)))
+        .subquery()
+    )
+    top_rows = (
+        db.query(ranked.c.id, ranked.c.region)
+        .filter(ranked.c.rank <= top)
+        .order_by(ranked.c.region, ranked.c.rank)
+    )
+    for wine_id, name in top_rows:
+        regions[name]["top_wine_ids"].append(wine_id)
+
+    return sorted(regions.values(), key=lambda r: r["bottle_count"], reverse=True)
+
+
 def create_geocoded_region(
     db: Session, region: schemas.GeocodedRegionCreate
 ) -> models.GeocodedRegion:
@@ -28,3 +159,228 @@ def create_geocoded_region(
     db.commit()
     db.refresh(db_region)
     return db_region
+
+
+# ── Gazetteer ──
+
+
+def _normalize(text: str) -> str:
+    """Minuscules, sans accents ni ponctuation, espaces simples."""
+    text = unicodedata.normalize("NFD", text or "")
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    text = re.sub(r"[^a-z0-9\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+_GAZETTEER = [(_normalize(name), coords) for name, coords in WINE_REGIONS.items()]
+
+
+def lookup_gazetteer(region: str) -> Optional[Coords]:
+    """Rapproche un nom de région du gazetteer embarqué.
+
+    Essaie dans l'ordre : égalité, inclusion dans un sens ou dans l'autre,
+    puis un mot significatif (plus de 3 lettres) en commun.
+    """
+    normalized = _normalize(region)
+    if not normalized:
+        return None
+
+    for key, coords in _GAZETTEER:
+        if key == normalized:
+            return coords
+
+    for key, coords in _GAZETTEER:
+        if key in normalized or normalized in key:
+            return coords
+
+    words = {w for w in normalized.split(" ") if len(w) > 3}
+    for key, coords in _GAZETTEER:
+        if words & set(key.split(" ")):
+            return coords
+
+    return None
+
+
+# ── Fournisseurs ──
+
+
+class NominatimGeocoder:
+    """Géocodeur OpenStreetMap Nominatim (https://nominatim.org)."""
+
+    def __init__(self, url: str, user_agent: str):
+        self.url = url
+        self.user_agent = user_agent
+
+    def geocode(self, query: str) -> Optional[Coords]:
+        response = requests.get(
+            self.url,
+            params={"q": query, "format": "json", "limit": 1},
+            headers={"User-Agent": self.user_agent, "Accept-Language": "fr"},
+            timeout=10,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            return None
+        return float(data[0]["lat"]), float(data[0]["lon"])
+
+
+class OfflineGeocoder:
+    """Fournisseur hors ligne : seul le gazetteer embarqué est utilisé."""
+
+    def geocode(self, query: str) -> Optional[Coords]:
+        return None
+
+
+def get_geocoder():
+    """Instancie le fournisseur configuré par GEOCODER."""
+    if GEOCODER == "offline":
+        return OfflineGeocoder()
+    if GEOCODER == "nominatim":
+        return NominatimGeocoder(GEOCODER_URL, GEOCODER_USER_AGENT)
+    raise ValueError(f"Unknown GEOCODER: {GEOCODER}")
+
+
+# ── File de géocodage ──
+
+
+def _wakeup_file_mtime() -> float:
+    try:
+        return os.stat(GEOCODE_WAKEUP_FILE).st_mtime
+    except OSError:
+        return 0.0
+
+
+def request_geocoding() -> None:
+    """Signale à la tâche de fond qu'une région est peut-être à résoudre.
+
+    Serveur multi-workers : la tâche tourne dans un seul processus, les
+    autres lui font signe en touchant GEOCODE_WAKEUP_FILE.
+    """
+    _wakeup.set()
+    try:
+        GEOCODE_WAKEUP_FILE.touch()
+    except OSError:
+        pass
+
+
+def wait_for_geocoding_request(timeout: float) -> None:
+    """Bloque jusqu'à un signal, l'arrêt, ou l'expiration du délai."""
+    global _wakeup_seen
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or _wakeup.wait(min(remaining, GEOCODE_WAKEUP_POLL_SECONDS)):
+            break
+        if _wakeup_file_mtime() != _wakeup_seen:
+            break
+    _wakeup_seen = _wakeup_file_mtime()
+    _wakeup.clear()
+
+
+def stop_geocoding() -> None:
+    """Interrompt la tâche de fond, y compris pendant une attente de quota."""
+    _stop.set()
+    _wakeup.set()
+
+
+def geocoding_stopped() -> bool:
+    return _stop.is_set()
+
+
+def _throttle() -> bool:
+    """Espace les requêtes externes ; retourne False si l'arrêt est demandé."""
+    global _last_request
+    remaining = _last_request + GEOCODER_MIN_INTERVAL - time.monotonic()
+    if remaining > 0 and _stop.wait(remaining):
+        return False
+    _last_request = time.monotonic()
+    return not _stop.is_set()
+
+
+def get_pending_regions(db: Session) -> List[str]:
+    """Régions saisies sans coordonnées ni échec récent."""
+    retry_before = datetime.utcnow() - timedelta(days=GEOCODE_RETRY_DAYS)
+    resolved = db.query(models.GeocodedRegion.name)
+    recent_misses = db.query(models.GeocodeMiss.name).filter(
+        models.GeocodeMiss.last_attempt >= retry_before
+    )
+    rows = (
+        db.query(models.Bottle.region)
+        .filter(
+            models.Bottle.region.isnot(None),
+            models.Bottle.region != "",
+            models.Bottle.region.notin_(resolved),
+            models.Bottle.region.notin_(recent_misses),
+        )
+        .distinct()
+        .all()
+    )
+    return [row[0] for row in rows]
+
+
+def _geocode_remote(geocoder, region: str) -> Optional[Coords]:
+    """Interroge le fournisseur avec des variantes de plus en plus larges.
+
+    Les erreurs réseau remontent : elles ne doivent pas alimenter le cache négatif.
+    """
+    for query in (region, f"{region}, France", f"{region}, Europe"):
+        if not _throttle():
+            return None
+        coords = geocoder.geocode(query)
+        if coords:
+            return coords
+    return None
+
+
+def _record_miss(db: Session, region: str) -> None:
+    miss = (
+        db.query(models.GeocodeMiss)
+        .filter(models.GeocodeMiss.name == region)
+        .first()
+    )
+    if miss:
+        miss.attempts += 1
+        miss.last_attempt = datetime.utcnow()
+    else:
+        db.add(models.GeocodeMiss(name=region))
+
+
+def geocode_pending_regions(db: Session, geocoder=None) -> int:
+    """Résout les régions en attente, une par une. Retourne le nombre résolu.
+
+    Une erreur réseau ne fait que sauter sa région (sans cache négatif, elle
+    sera retentée à la passe suivante). La passe n'est interrompue, en
+    relançant l'erreur, qu'après GEOCODE_MAX_NETWORK_ERRORS échecs consécutifs.
+    """
+    geocoder = geocoder or get_geocoder()
+    resolved = 0
+    network_errors = 0
+    for region in get_pending_regions(db):
+        if _stop.is_set():
+            break
+        try:
+            coords = lookup_gazetteer(region) or _geocode_remote(geocoder, region)
+        except requests.RequestException:
+            network_errors += 1
+            if network_errors >= GEOCODE_MAX_NETWORK_ERRORS:
+                raise
+            continue
+        network_errors = 0
+        if _stop.is_set() and not coords:
+            break
+
+        if coords:
+            db.add(models.GeocodedRegion(name=region, lat=coords[0], lon=coords[1]))
+            db.query(models.GeocodeMiss).filter(
+                models.GeocodeMiss.name == region
+            ).delete(synchronize_session=False)
+            resolved += 1
+        else:
+            _record_miss(db, region)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Région ajoutée entre-temps (POST /geocoded-regions)
+            db.rollback()
+    return resolved
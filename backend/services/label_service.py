@@ -1,13 +1,21 @@
 """Service pour la génération d'étiquettes 3×5cm @ 300dpi (PDF via ReportLab)."""
 
+import hashlib
 import io
+import json
 import os
+import threading
 import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import qrcode
-from PIL import Image
 from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, letter
 from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm, mm
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
@@ -15,6 +23,7 @@ from reportlab.platypus import Paragraph
 from sqlalchemy.orm import Session
 
 import models
+from config import LABEL_WORKERS, LABEL_CACHE_MB
 
 # ── Dimensions (points = px de la maquette @ 300dpi) ──
 LABEL_W = 354   # ≈ 3cm  @ 300dpi
@@ -33,143 +42,399 @@ FOOTER_BOTTOM = 14       # distance depuis le BAS
 NAME_MAX_H = 100         # zone maximale disponible pour le nom (220 -> 320)
 NAME_AVAILABLE_BOTTOM = NAME_TOP + NAME_MAX_H  # 320 depuis le haut
 
+# Taille imprimée réelle (planches) et facteur d'échelle depuis la maquette
+PRINT_W = 3 * cm
+PRINT_H = 5 * cm
+LABEL_SCALE = PRINT_W / LABEL_W
+SHEET_SIZES = {"A4": A4, "Letter": letter}
+
+# En dessous de ce nombre d'étiquettes, le rendu reste dans le processus courant
+LABEL_PARALLEL_MIN = 8
+# Nombre d'étiquettes rendues avant d'être écrites dans le flux ZIP
+LABEL_STREAM_BATCH = 16
+
+# ── Styles (invariants, partagés par toutes les étiquettes) ──
+YEAR_STYLE = ParagraphStyle(
+    "Year",
+    fontName="NunitoSans-Regular",
+    fontSize=30,
+    leading=36,
+    alignment=1,  # centre
+    textColor=colors.HexColor("#1a1a1a"),
+)
+NAME_STYLE = ParagraphStyle(
+    "Name",
+    fontName="Montserrat-Bold",
+    fontSize=20,
+    leading=26,
+    alignment=1,
+    textColor=colors.HexColor("#111111"),
+)
+PHASE_STYLE = ParagraphStyle(
+    "Phase",
+    fontName="NunitoSans-Bold",
+    fontSize=15,
+    leading=20,
+    alignment=1,
+    textColor=colors.HexColor("#222222"),
+)
+
 # ── Polices ──
 FONTS_DIR = os.path.join(os.path.dirname(__file__), "..", "fonts")
 
 
+_fonts_lock = threading.Lock()
+# PID du processus où les fonts sont enregistrées : le registre de reportlab
+# est propre à chaque processus (workers gunicorn, pool de rendu)
+_fonts_pid = None
+
+
 def _register_fonts() -> None:
-    """Enregistre les fonts TTF une seule fois."""
-    if getattr(_register_fonts, "_done", False):
+    """Enregistre les fonts TTF une seule fois par processus."""
+    global _fonts_pid
+    if _fonts_pid == os.getpid():
         return
-    _register_fonts._done = True
-    pdfmetrics.registerFont(
-        TTFont("Montserrat-Bold", os.path.join(FONTS_DIR, "Montserrat-Bold.ttf"))
-    )
-    pdfmetrics.registerFont(
-        TTFont("NunitoSans-Bold", os.path.join(FONTS_DIR, "NunitoSans-Bold.ttf"))
-    )
-    pdfmetrics.registerFont(
-        TTFont("NunitoSans-Regular", os.path.join(FONTS_DIR, "NunitoSans-Regular.ttf"))
-    )
+    with _fonts_lock:
+        if _fonts_pid == os.getpid():
+            return
+        pdfmetrics.registerFont(
+            TTFont("Montserrat-Bold", os.path.join(FONTS_DIR, "Montserrat-Bold.ttf"))
+        )
+        pdfmetrics.registerFont(
+            TTFont("NunitoSans-Bold", os.path.join(FONTS_DIR, "NunitoSans-Bold.ttf"))
+        )
+        pdfmetrics.registerFont(
+            TTFont("NunitoSans-Regular", os.path.join(FONTS_DIR, "NunitoSans-Regular.ttf"))
+        )
+        # Marqué après coup : un rendu concurrent attend l'enregistrement complet
+        _fonts_pid = os.getpid()
 
 
-def _generate_qr_image(url: str, size: int) -> Image.Image:
-    """Génère un QR code PIL.Image blanc/noir."""
+def _qr_matrix(url: str) -> List[List[bool]]:
+    """Matrice des modules du QR (bordure de 2 modules incluse)."""
     qr = qrcode.QRCode(
         version=None,
         error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
         border=2,
     )
     qr.add_data(url)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white").convert("RGBA")
-    return img.resize((size, size), Image.LANCZOS)
+    return qr.get_matrix()
+
 
+def _label_fields(bottle: models.Bottle) -> Dict:
+    """Extrait les seuls champs du vin imprimés sur l'étiquette."""
+    return {
+        "name": bottle.name,
+        "year": bottle.year,
+        "jeunesse_end": bottle.jeunesse_end,
+        "maturite_end": bottle.maturite_end,
+        "apogee_end": bottle.apogee_end,
+    }
 
-def _fmt_phase(bottle: models.Bottle) -> str:
+
+def _label_revision(fields: Dict) -> str:
+    """Révision du contenu imprimé : change dès qu'un champ de l'étiquette change."""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _fmt_phase(fields: Dict) -> str:
     """Formate toutes les phases de maturité (multi-lignes HTML)."""
+    jeunesse_end = fields["jeunesse_end"]
+    maturite_end = fields["maturite_end"]
+    apogee_end = fields["apogee_end"]
     lines = []
     # Jeunesse (si pas de maturité → on affiche juste la jeunesse)
-    if bottle.jeunesse_end and not bottle.maturite_end:
-        lines.append(f"Jeunesse jusqu'à {bottle.jeunesse_end}")
+    if jeunesse_end and not maturite_end:
+        lines.append(f"Jeunesse jusqu'à {jeunesse_end}")
     # Maturité
-    if bottle.maturite_end:
-        lines.append(f"Maturité : {bottle.jeunesse_end or '?'} – {bottle.maturite_end}")
+    if maturite_end:
+        lines.append(f"Maturité : {jeunesse_end or '?'} – {maturite_end}")
     # Apogée
-    if bottle.apogee_end:
-        lines.append(f"Apogée : {bottle.maturite_end or '?'} – {bottle.apogee_end}")
+    if apogee_end:
+        lines.append(f"Apogée : {maturite_end or '?'} – {apogee_end}")
     return "<br />".join(lines) if lines else ""
 
 
-def _build_label_pdf(bottle: models.Bottle, qr_code: str, url: str) -> bytes:
-    """Génère le PDF d'une seule étiquette et retourne les bytes."""
-    _register_fonts()
+def _wrapped(text: str, style: ParagraphStyle, max_w: float, max_h: float):
+    """Paragraphe mis en page une fois, réutilisable sur plusieurs canvas."""
+    paragraph = Paragraph(text, style)
+    _, h = paragraph.wrap(max_w, max_h)
+    return paragraph, h
 
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=(LABEL_W, LABEL_H))
 
-    # ---------------------------------------------------------------
-    # 1. QR (top = QR_TOP, centré horizontalement)
-    # ---------------------------------------------------------------
-    qr_img = _generate_qr_image(url, size=QR_SIZE)
-    from reportlab.lib.utils import ImageReader
+class _WineLabel:
+    """Éléments invariants d'un vin, calculés une fois pour toutes ses étiquettes."""
+
+    def __init__(self, fields: Dict):
+        _register_fonts()
+        self.year = (
+            _wrapped(str(fields["year"]), YEAR_STYLE, LABEL_W - 32, 30)
+            if fields["year"]
+            else None
+        )
+        self.name = _wrapped(
+            (fields["name"] or "Vin").upper(), NAME_STYLE, LABEL_W - 32, NAME_MAX_H
+        )
+        phase = _fmt_phase(fields)
+        self.phase = _wrapped(phase, PHASE_STYLE, LABEL_W - 20, 55) if phase else None
 
-    img_reader = ImageReader(qr_img)
-    qr_x = (LABEL_W - QR_SIZE) / 2
-    # Le bas du QR en coord RL = LABEL_H - QR_TOP - QR_SIZE
-    qr_y = LABEL_H - QR_TOP - QR_SIZE
-    c.drawImage(img_reader, qr_x, qr_y, width=QR_SIZE, height=QR_SIZE, mask="auto")
 
+def _draw_qr(c: canvas.Canvas, url: str) -> None:
+    """Dessine le QR en vectoriel (top = QR_TOP, centré horizontalement).
+
+    Chaque suite horizontale de modules noirs devient un seul rectangle,
+    le tout rempli en un unique chemin.
+    """
+    matrix = _qr_matrix(url)
+    module = QR_SIZE / len(matrix)
+    qr_x = (LABEL_W - QR_SIZE) / 2
+    # Le haut du QR en coord RL = LABEL_H - QR_TOP
+    qr_top = LABEL_H - QR_TOP
+
+    path = c.beginPath()
+    for r, line in enumerate(matrix):
+        y = qr_top - (r + 1) * module
+        col = 0
+        while col < len(line):
+            if not line[col]:
+                col += 1
+                continue
+            start = col
+            while col < len(line) and line[col]:
+                col += 1
+            path.rect(qr_x + start * module, y, (col - start) * module, module)
+    c.setFillColor(colors.black)
+    c.drawPath(path, stroke=0, fill=1)
+
+
+def _draw_artwork(c: canvas.Canvas, wine: _WineLabel) -> None:
+    """Dessine tout ce qui est commun aux étiquettes d'un vin (hors QR)."""
     # ---------------------------------------------------------------
-    # 2. Millésime (top = YEAR_TOP, centré)
+    # 1. Millésime (top = YEAR_TOP, centré)
     # ---------------------------------------------------------------
-    if bottle.year:
-        year_style = ParagraphStyle(
-            "Year",
-            fontName="NunitoSans-Regular",
-            fontSize=30,
-            leading=36,
-            alignment=1,  # centre
-            textColor=colors.HexColor("#1a1a1a"),
-        )
-        year_p = Paragraph(str(bottle.year), year_style)
-        max_w = LABEL_W - 32
-        w, h = year_p.wrap(max_w, 30)
+    if wine.year:
+        year_p, h = wine.year
         # top = YEAR_TOP → bottom_y = LABEL_H - YEAR_TOP - h
-        year_y = LABEL_H - YEAR_TOP - h
-        year_p.drawOn(c, 16, year_y)
+        year_p.drawOn(c, 16, LABEL_H - YEAR_TOP - h)
 
     # ---------------------------------------------------------------
-    # 3. Nom MAJUSCULES (top = NAME_TOP, centré, multi-lignes)
+    # 2. Nom MAJUSCULES (top = NAME_TOP, centré, multi-lignes)
     # ---------------------------------------------------------------
-    name = (bottle.name or "Vin").upper()
-    name_style = ParagraphStyle(
-        "Name",
-        fontName="Montserrat-Bold",
-        fontSize=20,
-        leading=26,
-        alignment=1,
-        textColor=colors.HexColor("#111111"),
-    )
-    name_p = Paragraph(name, name_style)
-    max_w = LABEL_W - 32
-    w, h = name_p.wrap(max_w, NAME_MAX_H)
+    name_p, h = wine.name
     # on cale le haut du bloc exactement à NAME_TOP
-    name_y = LABEL_H - NAME_TOP - h
-    name_p.drawOn(c, 16, name_y)
+    name_p.drawOn(c, 16, LABEL_H - NAME_TOP - h)
 
     # ---------------------------------------------------------------
-    # 4. Phases (top = PHASE_TOP, centré, multi-lignes)
+    # 3. Phases (top = PHASE_TOP, centré, multi-lignes)
     # ---------------------------------------------------------------
-    phase = _fmt_phase(bottle)
-    if phase:
-        phase_style = ParagraphStyle(
-            "Phase",
-            fontName="NunitoSans-Bold",
-            fontSize=15,
-            leading=20,
-            alignment=1,
-            textColor=colors.HexColor("#222222"),
-        )
-        phase_p = Paragraph(phase, phase_style)
-        w, h = phase_p.wrap(LABEL_W - 20, 55)
-        phase_y = LABEL_H - PHASE_TOP - h
-        phase_p.drawOn(c, 10, phase_y)
+    if wine.phase:
+        phase_p, h = wine.phase
+        phase_p.drawOn(c, 10, LABEL_H - PHASE_TOP - h)
 
     # ---------------------------------------------------------------
-    # 5. Footer (bottom = FOOTER_BOTTOM)
+    # 4. Footer (bottom = FOOTER_BOTTOM)
     # ---------------------------------------------------------------
     c.setFont("NunitoSans-Bold", 18)
     c.setFillColor(colors.HexColor("#777777"))
     c.drawCentredString(CX, FOOTER_BOTTOM, "Made with love for Pinarr lovers")
 
+
+def _build_label_pdf(wine: _WineLabel, url: str) -> bytes:
+    """Génère le PDF d'une seule étiquette et retourne les bytes."""
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=(LABEL_W, LABEL_H))
+    _draw_qr(c, url)
+    _draw_artwork(c, wine)
     c.showPage()
     c.save()
     buf.seek(0)
     return buf.getvalue()
 
 
+def _draw_crop_marks(c: canvas.Canvas, x: float, y: float, bleed: float) -> None:
+    """Traits de coupe aux quatre coins d'une étiquette, dans la zone de fond perdu."""
+    length = bleed * 0.8
+    c.setStrokeColor(colors.HexColor("#999999"))
+    c.setLineWidth(0.25)
+    for cx in (x, x + PRINT_W):
+        for cy in (y, y + PRINT_H):
+            dx = -length if cx == x else length
+            dy = -length if cy == y else length
+            c.line(cx, cy, cx + dx, cy)
+            c.line(cx, cy, cx, cy + dy)
+
+
+def _build_label_sheet(
+    wine: _WineLabel,
+    urls: List[str],
+    page_size: str = "A4",
+    margin_mm: float = 10,
+    bleed_mm: float = 2,
+) -> bytes:
+    """Impose les étiquettes d'un vin sur des planches A4/Letter (un seul PDF).
+
+    Le décor commun est enregistré une fois comme Form XObject puis réutilisé
+    sur chaque emplacement ; les polices ne sont embarquées qu'une fois.
+    """
+    page_w, page_h = SHEET_SIZES[page_size]
+    margin = margin_mm * mm
+    bleed = bleed_mm * mm
+    cell_w = PRINT_W + 2 * bleed
+    cell_h = PRINT_H + 2 * bleed
+    cols = int((page_w - 2 * margin) // cell_w)
+    rows = int((page_h - 2 * margin) // cell_h)
+    if cols < 1 or rows < 1:
+        raise ValueError("Marges trop grandes pour le format de page")
+
+    # Grille centrée sur la page
+    x0 = (page_w - cols * cell_w) / 2 + bleed
+    y_top = page_h - (page_h - rows * cell_h) / 2 - bleed - PRINT_H
+    per_page = cols * rows
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=(page_w, page_h))
+    c.beginForm("wine")
+    _draw_artwork(c, wine)
+    c.endForm()
+
+    for i, url in enumerate(urls):
+        if i and i % per_page == 0:
+            c.showPage()
+        slot = i % per_page
+        x = x0 + (slot % cols) * cell_w
+        y = y_top - (slot // cols) * cell_h
+
+        c.saveState()
+        c.translate(x, y)
+        c.scale(LABEL_SCALE, LABEL_SCALE)
+        c.doForm("wine")
+        _draw_qr(c, url)
+        c.restoreState()
+        if bleed:
+            _draw_crop_marks(c, x, y, bleed)
+
+    c.showPage()
+    c.save()
+    buf.seek(0)
+    return buf.getvalue()
+
+
+def _render_labels(fields: Dict, urls: List[str]) -> List[bytes]:
+    """Rend une série d'étiquettes d'un même vin (exécutable dans un worker)."""
+    wine = _WineLabel(fields)
+    return [_build_label_pdf(wine, url) for url in urls]
+
+
+# ── Cache des PDF rendus : (révision du vin, qr_code, frontend_url) → bytes ──
+
+
+class _LabelCache:
+    """Cache LRU en mémoire, borné en octets."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple[str, str, str], value: bytes) -> None:
+        with self._lock:
+            if key in self._items:
+                self._size -= len(self._items.pop(key))
+            self._items[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+
+_label_cache = _LabelCache(LABEL_CACHE_MB * 1024 * 1024)
+
+# Pool de rendu : LABEL_WORKERS processus, créé à la première série
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Crée le pool de processus au premier rendu parallèle."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=LABEL_WORKERS)
+        return _executor
+
+
+def _discard_executor(broken: ProcessPoolExecutor) -> None:
+    """Abandonne un pool cassé, sauf s'il a déjà été remplacé par un autre thread."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def shutdown_label_workers() -> None:
+    """Arrête le pool de rendu (arrêt de l'application)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _render_parallel(fields: Dict, urls: List[str]) -> List[bytes]:
+    """Répartit le rendu d'une série d'étiquettes sur le pool de processus."""
+    if LABEL_WORKERS <= 0 or len(urls) < LABEL_PARALLEL_MIN:
+        return _render_labels(fields, urls)
+
+    executor = _get_executor()
+    chunk = -(-len(urls) // LABEL_WORKERS)
+    try:
+        futures = [
+            executor.submit(_render_labels, fields, urls[i : i + chunk])
+            for i in range(0, len(urls), chunk)
+        ]
+        return [pdf for future in futures for pdf in future.result()]
+    except BrokenProcessPool:
+        # Un worker est mort (mémoire, plantage de reportlab/PIL) : le pool
+        # sera recréé à la prochaine série, celle-ci est rendue dans le thread
+        _discard_executor(executor)
+        return _render_labels(fields, urls)
+
+
+def _label_url(frontend_url: str, qr_code: str) -> str:
+    """URL encodée dans le QR d'une bouteille physique."""
+    return f"{frontend_url.rstrip('/')}/bottle/{qr_code}"
+
+
+def _render_cached(
+    fields: Dict, qr_codes: List[str], frontend_url: str
+) -> List[bytes]:
+    """Retourne les PDF des étiquettes, en ne rendant que ceux absents du cache."""
+    revision = _label_revision(fields)
+    keys = [(revision, qr_code, frontend_url) for qr_code in qr_codes]
+
+    pdfs = [_label_cache.get(key) for key in keys]
+    missing = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    if missing:
+        rendered = _render_parallel(
+            fields, [_label_url(frontend_url, qr_codes[i]) for i in missing]
+        )
+        for i, pdf in zip(missing, rendered):
+            _label_cache.put(keys[i], pdf)
+            pdfs[i] = pdf
+    return pdfs
+
+
 def generate_single_label_pdf(
     db: Session, bottle_id: int, qr_code: str, frontend_url: str = ""
 ) -> bytes:
@@ -191,16 +456,11 @@ def generate_single_label_pdf(
     if not pb:
         raise ValueError(f"Physical bottle with QR {qr_code} not found or not in cellar")
 
-    url = f"{frontend_url.rstrip('/')}/bottle/{pb.qr_code}"
-    return _build_label_pdf(bottle, pb.qr_code, url)
+    return _render_cached(_label_fields(bottle), [pb.qr_code], frontend_url)[0]
 
 
-def generate_label_zip(
-    db: Session, bottle_id: int, frontend_url: str = ""
-) -> bytes:
-    """Génère un ZIP contenant les étiquettes PDF de toutes les bouteilles
-    physiques en cave pour un vin donné.
-    """
+def _get_cellar_qr_codes(db: Session, bottle_id: int):
+    """Retourne le vin et les QR de ses bouteilles physiques en cave."""
     bottle = db.query(models.Bottle).filter(models.Bottle.id == bottle_id).first()
     if not bottle:
         raise ValueError(f"Bottle {bottle_id} not found")
@@ -214,21 +474,49 @@ def generate_label_zip(
         .order_by(models.PhysicalBottle.id)
         .all()
     )
+    return bottle, [pb.qr_code for pb in physical_bottles]
+
+
+class _ZipChunks(io.RawIOBase):
+    """Flux non seekable qui accumule ce que zipfile écrit, vidé entrée par entrée."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _stream_label_zip(
+    fields: Dict, qr_codes: List[str], frontend_url: str
+) -> Iterator[bytes]:
+    """Produit le ZIP morceau par morceau, par lots de LABEL_STREAM_BATCH PDF."""
+    safe_name = (
+        (fields["name"] or "Vin")
+        .replace("/", "-")
+        .replace("\\", "-")
+        .replace(" ", "_")[:25]
+    )
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for pb in physical_bottles:
-            url = f"{frontend_url.rstrip('/')}/bottle/{pb.qr_code}"
-            pdf_bytes = _build_label_pdf(bottle, pb.qr_code, url)
-
-            safe_name = (
-                (bottle.name or "Vin")
-                .replace("/", "-")
-                .replace("\\", "-")
-                .replace(" ", "_")[:25]
-            )
-            filename = f"Etiquette_{safe_name}_{pb.qr_code}.pdf"
-            zipf.writestr(filename, pdf_bytes)
+    out = _ZipChunks()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for start in range(0, len(qr_codes), LABEL_STREAM_BATCH):
+            batch = qr_codes[start : start + LABEL_STREAM_BATCH]
+            for qr_code, pdf_bytes in zip(
+                batch, _render_cached(fields, batch, frontend_url)
+            ):
+                filename = f"Etiquette_{safe_name}_{qr_code}.pdf"
+                zipf.writestr(filename, pdf_bytes)
+                yield out.drain()
 
         readme = (
             "Instructions d'impression :\n"
@@ -242,5 +530,38 @@ def generate_label_zip(
         )
         zipf.writestr("README.txt", readme.encode("utf-8"))
 
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
+    # Répertoire central, écrit à la fermeture de l'archive
+    yield out.drain()
+
+
+def generate_label_zip(
+    db: Session, bottle_id: int, frontend_url: str = ""
+) -> Iterator[bytes]:
+    """Génère un ZIP contenant les étiquettes PDF de toutes les bouteilles
+    physiques en cave pour un vin donné.
+
+    Les accès base sont faits immédiatement (erreurs levées avant la réponse) ;
+    l'archive est ensuite produite en flux, sans être tenue en mémoire.
+    """
+    bottle, qr_codes = _get_cellar_qr_codes(db, bottle_id)
+    return _stream_label_zip(_label_fields(bottle), qr_codes, frontend_url)
+
+
+def generate_label_sheet(
+    db: Session,
+    bottle_id: int,
+    frontend_url: str = "",
+    page_size: str = "A4",
+    margin_mm: float = 10,
+    bleed_mm: float = 2,
+) -> Optional[bytes]:
+    """Génère un PDF unique imposant toutes les étiquettes en cave d'un vin
+    sur des planches A4/Letter. Retourne None s'il n'y a rien à imprimer.
+    """
+    bottle, qr_codes = _get_cellar_qr_codes(db, bottle_id)
+    if not qr_codes:
+        return None
+
+    wine = _WineLabel(_label_fields(bottle))
+    urls = [_label_url(frontend_url, qr_code) for qr_code in qr_codes]
+    return _build_label_sheet(wine, urls, page_size, margin_mm, bleed_mm)
@@ -1,7 +1,10 @@
 """Service pour la gestion des bouteilles physiques avec QR codes."""
 
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional, Dict, Any
 import uuid
 import models
@@ -9,38 +12,72 @@ import schemas
 from exceptions import BottleNotFoundException, PhysicalBottleNotFoundException, PinarrException
 
 
+# Nombre de tentatives d'insertion en cas de collision concurrente sur qr_code
+QR_INSERT_ATTEMPTS = 5
+
+
 def generate_qr_code() -> str:
     """Génère un code QR unique de 8 caractères alphanumériques."""
     return str(uuid.uuid4())[:8].upper()
 
 
+def _allocate_qr_codes(db: Session, count: int) -> List[str]:
+    """Réserve `count` codes QR libres, par lots.
+
+    Chaque lot de candidats est vérifié par une seule requête IN (...) ;
+    seuls les codes déjà pris sont régénérés au tour suivant.
+    """
+    codes: set = set()
+    while len(codes) < count:
+        candidates = set()
+        while len(candidates) < count - len(codes):
+            code = generate_qr_code()
+            if code not in codes:
+                candidates.add(code)
+
+        taken = {
+            row.qr_code
+            for row in db.query(models.PhysicalBottle.qr_code)
+            .filter(models.PhysicalBottle.qr_code.in_(candidates))
+            .all()
+        }
+        codes |= candidates - taken
+
+    return list(codes)
+
+
+def _by_qr_query(qr_code: str):
+    return select(models.PhysicalBottle).where(models.PhysicalBottle.qr_code == qr_code)
+
+
 def get_physical_bottle_by_qr(
     db: Session, qr_code: str
 ) -> Optional[models.PhysicalBottle]:
     """Récupère une bouteille physique par son code QR."""
-    return (
-        db.query(models.PhysicalBottle)
-        .filter(models.PhysicalBottle.qr_code == qr_code)
-        .first()
-    )
+    return db.execute(_by_qr_query(qr_code)).scalars().first()
 
 
-def get_physical_bottle_with_details(
-    db: Session, physical_bottle_id: int
-) -> Dict[str, Any]:
-    """Récupère une bouteille physique avec toutes les infos du vin et sa position."""
-    physical_bottle = (
-        db.query(models.PhysicalBottle)
-        .filter(models.PhysicalBottle.id == physical_bottle_id)
-        .first()
-    )
+async def get_physical_bottle_by_qr_async(
+    db: AsyncSession, qr_code: str
+) -> Optional[models.PhysicalBottle]:
+    """Version asynchrone de get_physical_bottle_by_qr."""
+    return (await db.execute(_by_qr_query(qr_code))).scalars().first()
 
-    if not physical_bottle:
-        raise PhysicalBottleNotFoundException(
-            f"Bouteille physique {physical_bottle_id} non trouvée"
+
+def _details_query(physical_bottle_id: int):
+    """Bouteille physique avec son vin et sa position, en une requête."""
+    return (
+        select(models.PhysicalBottle)
+        .options(
+            joinedload(models.PhysicalBottle.bottle),
+            joinedload(models.PhysicalBottle.position),
         )
+        .where(models.PhysicalBottle.id == physical_bottle_id)
+    )
 
-    # Construire la réponse
+
+def _serialize_details(physical_bottle: models.PhysicalBottle) -> Dict[str, Any]:
+    """Réponse du scan : bouteille, vin et localisation."""
     result = {
         "id": physical_bottle.id,
         "qr_code": physical_bottle.qr_code,
@@ -75,36 +112,57 @@ def get_physical_bottle_with_details(
             "image_path": bottle.image_path,
         }
 
-    # Ajouter les infos de position
+    # Ajouter les infos de position (localisation dénormalisée)
     if physical_bottle.position:
         pos = physical_bottle.position
-        position_data = {
+        result["position"] = {
             "id": pos.id,
             "code": pos.code,
             "line": pos.line,
             "position": pos.position,
+            "row_name": pos.row_name,
+            "column_name": pos.column_name,
+            "cave_name": pos.cave_name,
+            "cave_id": pos.cave_id,
         }
 
-        # Ajouter les infos de la cave
-        if pos.row:
-            row = pos.row
-            position_data["row_name"] = row.name
-            if row.column:
-                col = row.column
-                position_data["column_name"] = col.name
-                if col.cave:
-                    position_data["cave_name"] = col.cave.name
-                    position_data["cave_id"] = col.cave.id
+    return result
 
-        result["position"] = position_data
 
-    return result
+def get_physical_bottle_with_details(
+    db: Session, physical_bottle_id: int
+) -> Dict[str, Any]:
+    """Récupère une bouteille physique avec toutes les infos du vin et sa position."""
+    physical_bottle = db.execute(_details_query(physical_bottle_id)).scalars().first()
+
+    if not physical_bottle:
+        raise PhysicalBottleNotFoundException(
+            f"Bouteille physique {physical_bottle_id} non trouvée"
+        )
+
+    return _serialize_details(physical_bottle)
+
+
+async def get_physical_bottle_with_details_async(
+    db: AsyncSession, physical_bottle_id: int
+) -> Dict[str, Any]:
+    """Version asynchrone de get_physical_bottle_with_details (même requête)."""
+    result = await db.execute(_details_query(physical_bottle_id))
+    physical_bottle = result.scalars().first()
+
+    if not physical_bottle:
+        raise PhysicalBottleNotFoundException(
+            f"Bouteille physique {physical_bottle_id} non trouvée"
+        )
+
+    return _serialize_details(physical_bottle)
 
 
 def get_bottle_physical_bottles(db: Session, bottle_id: int) -> List[Dict[str, Any]]:
     """Récupère toutes les bouteilles physiques d'un vin."""
     physical_bottles = (
         db.query(models.PhysicalBottle)
+        .options(joinedload(models.PhysicalBottle.position))
         .filter(models.PhysicalBottle.bottle_id == bottle_id)
         .order_by(models.PhysicalBottle.acquisition_date.desc())
         .all()
@@ -122,13 +180,10 @@ def get_bottle_physical_bottles(db: Session, bottle_id: int) -> List[Dict[str, A
 
         if pb.position:
             item["position_code"] = pb.position.code
-            if pb.position.row:
-                item["row_name"] = pb.position.row.name
-                if pb.position.row.column:
-                    item["column_name"] = pb.position.row.column.name
-                    if pb.position.row.column.cave:
-                        item["cave_name"] = pb.position.row.column.cave.name
-                        item["cave_id"] = pb.position.row.column.cave.id
+            item["row_name"] = pb.position.row_name
+            item["column_name"] = pb.position.column_name
+            item["cave_name"] = pb.position.cave_name
+            item["cave_id"] = pb.position.cave_id
 
         result.append(item)
 
@@ -142,28 +197,25 @@ def generate_qr_codes_for_bottle(db: Session, bottle_id: int, count: int) -> Lis
     if not bottle:
         raise BottleNotFoundException(f"Vin {bottle_id} non trouvé")
 
-    qr_codes = []
-
-    for _ in range(count):
-        # Générer un code QR unique
-        qr_code = generate_qr_code()
-        while (
-            db.query(models.PhysicalBottle)
-            .filter(models.PhysicalBottle.qr_code == qr_code)
-            .first()
-        ):
-            qr_code = generate_qr_code()
-
-        # Créer la bouteille physique
-        physical_bottle = models.PhysicalBottle(
-            bottle_id=bottle_id,
-            qr_code=qr_code,
-            status="in_cellar",
-        )
-        db.add(physical_bottle)
-        db.flush()  # Pour obtenir l'ID
-
-        qr_codes.append(qr_code)
+    if count <= 0:
+        return []
+
+    # Insertion multi-lignes ; on ne réessaie qu'en cas de collision concurrente
+    for attempt in range(QR_INSERT_ATTEMPTS):
+        qr_codes = _allocate_qr_codes(db, count)
+        try:
+            with db.begin_nested():
+                db.execute(
+                    insert(models.PhysicalBottle),
+                    [
+                        {"bottle_id": bottle_id, "qr_code": qr_code, "status": "in_cellar"}
+                        for qr_code in qr_codes
+                    ],
+                )
+            break
+        except IntegrityError:
+            if attempt == QR_INSERT_ATTEMPTS - 1:
+                raise
 
     db.commit()
     return qr_codes
@@ -214,8 +266,12 @@ def move_physical_bottle(
 
     # Assigner la nouvelle position
     if position_id:
+        # Verrou de ligne : un autre déplacement vers cette position attend
         new_position = (
-            db.query(models.Position).filter(models.Position.id == position_id).first()
+            db.query(models.Position)
+            .filter(models.Position.id == position_id)
+            .with_for_update()
+            .first()
         )
 
         if new_position:
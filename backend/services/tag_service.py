@@ -0,0 +1,171 @@
+"""Tags normalisés des vins (tables `tags` et `bottle_tags`).
+
+`Bottle.tags` reste la chaîne saisie (« garde, cadeau ») exposée par l'API
+et indexée en plein texte ; chaque écriture la répercute dans `bottle_tags`,
+clé primaire (tag_id, bottle_id). Filtrer par tag ou compter les vins par
+tag devient une lecture d'index au lieu d'un LIKE sur toute la table.
+"""
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional
+
+import models
+
+
+def normalize_tag(tag: str) -> str:
+    """Clé de comparaison : minuscules, espaces simples."""
+    return " ".join(tag.lower().split())
+
+
+def split_tags(text: Optional[str]) -> Dict[str, str]:
+    """Découpe « a, b, A » en {clé: graphie}, première graphie retenue."""
+    tags: Dict[str, str] = {}
+    for part in (text or "").split(","):
+        name = " ".join(part.split())
+        if name:
+            tags.setdefault(normalize_tag(name), name)
+    return tags
+
+
+def tag_filter_clause(tag: str):
+    """Condition « le vin porte ce tag », résolue par les index."""
+    tagged = (
+        select(models.BottleTag.bottle_id)
+        .join(models.Tag, models.Tag.id == models.BottleTag.tag_id)
+        .where(models.Tag.key == normalize_tag(tag))
+    )
+    return models.Bottle.id.in_(tagged)
+
+
+def _tag_ids(db: Session, tags: Dict[str, str]) -> Dict[str, int]:
+    """IDs des tags demandés, créés au besoin."""
+    ids = dict(
+        db.query(models.Tag.key, models.Tag.id).filter(models.Tag.key.in_(list(tags)))
+    )
+    for key, name in tags.items():
+        if key in ids:
+            continue
+        try:
+            with db.begin_nested():
+                tag = models.Tag(name=name, key=key)
+                db.add(tag)
+            ids[key] = tag.id
+        except IntegrityError:
+            # Créé entre-temps par une autre requête
+            ids[key] = db.query(models.Tag.id).filter(models.Tag.key == key).scalar()
+    return ids
+
+
+def _drop_orphans(db: Session, tag_ids: Iterable[int]) -> None:
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    db.execute(
+        delete(models.Tag).where(
+            models.Tag.id.in_(tag_ids),
+            ~exists().where(models.BottleTag.tag_id == models.Tag.id),
+        )
+    )
+
+
+def set_bottle_tags(db: Session, bottle: models.Bottle) -> None:
+    """Aligne `bottle_tags` sur `bottle.tags` ; à appeler dans la transaction."""
+    wanted = set(_tag_ids(db, split_tags(bottle.tags)).values())
+    current = {
+        row[0]
+        for row in db.query(models.BottleTag.tag_id).filter(
+            models.BottleTag.bottle_id == bottle.id
+        )
+    }
+    if wanted - current:
+        db.execute(
+            insert(models.BottleTag),
+            [{"tag_id": t, "bottle_id": bottle.id} for t in wanted - current],
+        )
+    if current - wanted:
+        db.execute(
+            delete(models.BottleTag).where(
+                models.BottleTag.bottle_id == bottle.id,
+                models.BottleTag.tag_id.in_(current - wanted),
+            )
+        )
+        _drop_orphans(db, current - wanted)
+
+
+def unset_bottle_tags(db: Session, bottle_id: int) -> None:
+    """Retire les tags d'un vin supprimé."""
+    tag_ids = [
+        row[0]
+        for row in db.query(models.BottleTag.tag_id).filter(
+            models.BottleTag.bottle_id == bottle_id
+        )
+    ]
+    db.execute(delete(models.BottleTag).where(models.BottleTag.bottle_id == bottle_id))
+    _drop_orphans(db, tag_ids)
+
+
+def get_tags(
+    db: Session, prefix: Optional[str] = None, limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Tags et nombre de vins (nuage de tags, autocomplétion), du plus courant au moins courant."""
+    count = func.count(models.BottleTag.bottle_id)
+    query = (
+        db.query(models.Tag.name, count.label("count"))
+        .join(models.BottleTag, models.BottleTag.tag_id == models.Tag.id)
+        .group_by(models.Tag.key, models.Tag.name)
+        .order_by(count.desc(), models.Tag.key)
+    )
+    if prefix and normalize_tag(prefix):
+        start = normalize_tag(prefix)
+        # Intervalle sur la clé : utilise l'index unique de tags.key
+        query = query.filter(
+            models.Tag.key >= start, models.Tag.key < start + "\U0010ffff"
+        )
+    if limit:
+        query = query.limit(limit)
+    return [{"name": name, "count": n} for name, n in query]
+
+
+def rebuild_tag_index(db: Session) -> int:
+    """Reconstruit `tags`/`bottle_tags` depuis les chaînes. Retourne le nombre de vins tagués."""
+    db.execute(delete(models.BottleTag))
+    db.execute(delete(models.Tag))
+    rows = (
+        db.query(models.Bottle.id, models.Bottle.tags)
+        .filter(models.Bottle.tags.isnot(None), models.Bottle.tags != "")
+        .all()
+    )
+
+    names: Dict[str, str] = {}
+    links = []
+    for bottle_id, text in rows:
+        for key, name in split_tags(text).items():
+            names.setdefault(key, name)
+            links.append((key, bottle_id))
+
+    if names:
+        db.execute(
+            insert(models.Tag), [{"key": k, "name": n} for k, n in names.items()]
+        )
+        ids = dict(db.query(models.Tag.key, models.Tag.id))
+        db.execute(
+            insert(models.BottleTag),
+            [{"tag_id": ids[k], "bottle_id": b} for k, b in links],
+        )
+    db.commit()
+    return len(rows)
+
+
+def tag_index_is_stale(db: Session) -> bool:
+    """Vrai si un vin tagué n'a aucune ligne dans `bottle_tags` (imports en SQL brut)."""
+    untagged = (
+        db.query(models.Bottle.id)
+        .filter(
+            func.trim(func.replace(models.Bottle.tags, ",", "")) != "",
+            ~exists().where(models.BottleTag.bottle_id == models.Bottle.id),
+        )
+        .first()
+    )
+    return untagged is not None
@@ -1,20 +1,37 @@
 """Service pour la gestion des uploads."""
 
+import hashlib
 import os
-import uuid
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from io import BytesIO
+from typing import Iterable, Optional
 from PIL import Image
 from fastapi import UploadFile
+from sqlalchemy.orm import Session
 import requests
+import models
 from config import (
     ALLOWED_EXTENSIONS,
     ALLOWED_MIME_TYPES,
     UPLOAD_DIR,
     MAX_FILE_SIZE_BYTES,
-    MAX_FILE_SIZE_MB,
+    IMAGE_WORKERS,
+    IMAGE_QUEUE_LIMIT,
+    IMAGE_VARIANT_WIDTHS,
+    IMAGE_VARIANT_DIR,
+    IMAGE_VARIANT_CACHE_MB,
+    UPLOAD_ORPHAN_GRACE_HOURS,
+)
+from exceptions import (
+    ImageNotFoundException,
+    InvalidUploadException,
+    ServiceBusyException,
 )
-from exceptions import InvalidUploadException
 
 
 # Signatures de fichiers pour validation
@@ -24,6 +41,13 @@ IMAGE_SIGNATURES = {
     b"RIFF": "webp",  # WebP (simplifié)
 }
 
+# Taille des blocs lus sur le flux d'upload / de téléchargement
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Octets nécessaires pour reconnaître une signature d'image
+SIGNATURE_SIZE = 12
+# Préfixe des images locales dans bottles.image_path
+UPLOAD_URL_PREFIX = "/uploads/"
+
 
 def _get_file_extension(filename: str) -> str:
     """Récupère l'extension du fichier en minuscules."""
@@ -54,9 +78,8 @@ def _validate_file_type(file: UploadFile) -> None:
                 raise InvalidUploadException("Type de fichier non valide")
 
 
-def _validate_file_size(content: bytes) -> None:
+def _validate_file_size(size: int) -> None:
     """Vérifie que la taille du fichier ne dépasse pas la limite."""
-    size = len(content)
     if size > MAX_FILE_SIZE_BYTES:
         size_mb = size / (1024 * 1024)
         max_mb = MAX_FILE_SIZE_BYTES / (1024 * 1024)
@@ -89,12 +112,52 @@ def _validate_image_content(content: bytes) -> None:
         raise InvalidUploadException("Le fichier ne contient pas d'image valide")
 
 
-def _convert_and_compress_image(content: bytes, ext: str) -> tuple[bytes, str]:
+def _spool_stream(chunks: Iterable[bytes], ext: str) -> str:
+    """
+    Écrit un flux d'octets dans un fichier temporaire, bloc par bloc.
+
+    La signature est vérifiée dès les premiers octets et la taille maximale
+    à chaque bloc : la mémoire utilisée reste bornée à un bloc par upload.
+
+    Returns:
+        Chemin du fichier temporaire (à supprimer par l'appelant)
+    """
+    tmp = tempfile.NamedTemporaryFile(prefix="pinarr-", suffix=ext, delete=False)
+    try:
+        with tmp:
+            header = b""
+            size = 0
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                _validate_file_size(size)
+                if len(header) < SIGNATURE_SIZE:
+                    header += chunk[: SIGNATURE_SIZE - len(header)]
+                    if len(header) == SIGNATURE_SIZE:
+                        _validate_image_content(header)
+                tmp.write(chunk)
+            # Flux plus court que la signature
+            if len(header) < SIGNATURE_SIZE:
+                _validate_image_content(header)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return tmp.name
+
+
+def _convert_and_compress_image(src: str, ext: str) -> tuple[str, str]:
     """
     Convertit toutes les images en WebP avec compression optimale.
+
+    Lit l'image depuis `src` et écrit le WebP à côté.
+
+    Returns:
+        Tuple (chemin du fichier résultat, extension) ; le fichier source
+        lui-même si la conversion échoue
     """
     try:
-        img = Image.open(BytesIO(content))
+        img = Image.open(src)
 
         # Redimensionner si trop grand (max 1920px)
         max_size = 1920
@@ -114,16 +177,209 @@ def _convert_and_compress_image(content: bytes, ext: str) -> tuple[bytes, str]:
                 img = img.convert("RGB")
 
         # Sauvegarder en WebP avec compression
-        output = BytesIO()
+        output = f"{src}.webp"
         # Qualité 85 (bon compromis taille/qualité)
         # Method 6 (compression optimale mais plus lente)
         img.save(output, format="WEBP", quality=85, method=6, optimize=True)
 
-        return output.getvalue(), ".webp"
+        return output, ".webp"
 
     except Exception as e:
-        # En cas d'erreur, retourner le contenu original
-        return content, ext
+        # En cas d'erreur, conserver le fichier original
+        return src, ext
+
+
+def _content_digest(path: str) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier, lu par blocs."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store_upload(src: str, ext: str) -> dict:
+    """Convertit le fichier temporaire et le range dans UPLOAD_DIR.
+
+    Le nom final est l'empreinte du contenu converti : une image déjà
+    présente n'est pas stockée deux fois.
+    """
+    converted = src
+    try:
+        converted, final_ext = _convert_in_pool(src, ext)
+
+        filename = f"{_content_digest(converted)[:32]}{final_ext}"
+        filepath = UPLOAD_DIR / filename
+        try:
+            if filepath.exists():
+                # Doublon : repousser l'échéance du nettoyage des orphelins
+                os.utime(filepath)
+            else:
+                shutil.move(converted, filepath)
+        except OSError as e:
+            raise InvalidUploadException(f"Erreur lors de la sauvegarde: {str(e)}")
+
+        return {"filename": filename, "path": f"{UPLOAD_URL_PREFIX}{filename}"}
+    finally:
+        for leftover in {src, converted}:
+            if os.path.exists(leftover):
+                os.unlink(leftover)
+
+
+# Pool de conversion : IMAGE_WORKERS processus, IMAGE_QUEUE_LIMIT tâches en attente
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(IMAGE_WORKERS, 1) + IMAGE_QUEUE_LIMIT)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Crée le pool de processus à la première conversion."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _executor
+
+
+def shutdown_image_workers() -> None:
+    """Arrête le pool de conversion (arrêt de l'application)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _run_in_pool(fn, *args):
+    """
+    Exécute un traitement d'image dans le pool de processus.
+
+    Refuse immédiatement la tâche si le pool et sa file d'attente sont pleins,
+    plutôt que d'accumuler les conversions en attente.
+    """
+    if not _slots.acquire(blocking=False):
+        raise ServiceBusyException(
+            "Traitement d'images saturé, réessayez dans quelques instants"
+        )
+    try:
+        if IMAGE_WORKERS <= 0:
+            return fn(*args)
+        try:
+            return _get_executor().submit(fn, *args).result()
+        except BrokenProcessPool:
+            # Un worker est mort (mémoire, image piégée) : le pool sera recréé
+            shutdown_image_workers()
+            raise InvalidUploadException("Échec de la conversion de l'image")
+    finally:
+        _slots.release()
+
+
+def _convert_in_pool(src: str, ext: str) -> tuple[str, str]:
+    """Exécute la conversion WebP dans le pool de processus."""
+    return _run_in_pool(_convert_and_compress_image, src, ext)
+
+
+def _resolve_upload(filename: str) -> Optional[Path]:
+    """Résout un nom de fichier uploadé, None s'il sort de UPLOAD_DIR."""
+    filepath = (UPLOAD_DIR / filename).resolve()
+    if filepath.parent != UPLOAD_DIR.resolve():
+        return None
+    return filepath
+
+
+def _render_variant(src: str, dest: str, width: int) -> bool:
+    """Produit une variante WebP de `src` limitée à `width` pixels."""
+    try:
+        img = Image.open(src)
+        img.thumbnail((width, width), Image.Resampling.LANCZOS)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        img.save(tmp, format="WEBP", quality=80, method=4)
+        os.replace(tmp, dest)
+        return True
+    except Exception:
+        return False
+
+
+def _evict_variants(keep: Path) -> None:
+    """Supprime les variantes les moins récemment servies au-delà du budget disque.
+
+    La variante `keep`, qui vient d'être produite, n'est jamais évincée.
+    """
+    budget = IMAGE_VARIANT_CACHE_MB * 1024 * 1024
+    entries = []
+    total = 0
+    for entry in os.scandir(IMAGE_VARIANT_DIR):
+        if entry.name.endswith(".tmp"):  # variante en cours d'écriture
+            continue
+        try:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+        except FileNotFoundError:  # évincée entre-temps par un autre worker
+            continue
+        total += stat.st_size
+        if entry.path != str(keep):
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    # mtime sert d'horodatage de dernier accès (mis à jour à chaque hit)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        try:
+            os.unlink(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+
+
+def _variant_path(filepath: Path, width: int) -> Path:
+    """Chemin de cache d'une variante (le nom d'un upload identifie son contenu)."""
+    return IMAGE_VARIANT_DIR / f"{filepath.stem}-w{width}.webp"
+
+
+def get_image_variant(filename: str, width: Optional[int] = None) -> Path:
+    """
+    Retourne le fichier à servir pour une image, éventuellement redimensionnée.
+
+    La largeur demandée est arrondie à la variante supérieure de
+    IMAGE_VARIANT_WIDTHS. La variante est dérivée à la demande puis conservée
+    dans IMAGE_VARIANT_DIR (éviction LRU selon IMAGE_VARIANT_CACHE_MB).
+    L'original est servi s'il est déjà assez petit ou si le pool est saturé.
+    """
+    filepath = _resolve_upload(filename)
+    if filepath is None or not filepath.is_file():
+        raise ImageNotFoundException(f"Image {filename} not found")
+
+    if not width or width <= 0:
+        return filepath
+
+    target = next((w for w in IMAGE_VARIANT_WIDTHS if w >= width), IMAGE_VARIANT_WIDTHS[-1])
+    variant = _variant_path(filepath, target)
+    try:
+        os.utime(variant)
+        return variant
+    except FileNotFoundError:  # absente, ou évincée par un autre worker
+        pass
+
+    try:
+        with Image.open(filepath) as img:
+            if max(img.size) <= target:
+                return filepath
+    except Exception:
+        return filepath
+
+    IMAGE_VARIANT_DIR.mkdir(exist_ok=True)
+    try:
+        rendered = _run_in_pool(_render_variant, str(filepath), str(variant), target)
+    except (ServiceBusyException, InvalidUploadException):
+        return filepath
+    if not rendered:
+        return filepath
+
+    _evict_variants(keep=variant)
+    return variant
 
 
 def upload_image(file: UploadFile) -> dict:
@@ -142,29 +398,16 @@ def upload_image(file: UploadFile) -> dict:
 
     _validate_file_type(file)
 
-    # Lire le contenu
-    content = file.file.read()
-
-    _validate_file_size(content)
-    _validate_image_content(content)
-
     # Générer un nom de fichier unique
     ext = _get_file_extension(file.filename)
 
-    # Convertir et compresser si nécessaire
-    content, final_ext = _convert_and_compress_image(content, ext)
-
-    filename = f"{uuid.uuid4()}{final_ext}"
-    filepath = UPLOAD_DIR / filename
-
-    # Sauvegarder le fichier
-    try:
-        with open(filepath, "wb") as buffer:
-            buffer.write(content)
-    except IOError as e:
-        raise InvalidUploadException(f"Erreur lors de la sauvegarde: {str(e)}")
+    # Lire le contenu par blocs dans un fichier temporaire
+    tmp_path = _spool_stream(
+        iter(lambda: file.file.read(UPLOAD_CHUNK_SIZE), b""), ext
+    )
 
-    return {"filename": filename, "path": f"/uploads/{filename}"}
+    # Convertir, compresser et sauvegarder
+    return _store_upload(tmp_path, ext)
 
 
 def delete_image(filename: str) -> bool:
@@ -177,21 +420,102 @@ def delete_image(filename: str) -> bool:
     Returns:
         True si supprimé, False sinon
     """
-    filepath = UPLOAD_DIR / filename
-
     # Sécurité: vérifier que le chemin reste dans UPLOAD_DIR
-    try:
-        filepath.relative_to(UPLOAD_DIR)
-    except ValueError:
+    filepath = _resolve_upload(filename)
+    if filepath is None:
         return False
 
-    if filepath.exists():
+    if filepath.is_file():
         filepath.unlink()
+        for width in IMAGE_VARIANT_WIDTHS:
+            _variant_path(filepath, width).unlink(missing_ok=True)
         return True
 
     return False
 
 
+def _upload_filename(image_path: Optional[str]) -> Optional[str]:
+    """Nom du fichier local désigné par un image_path, None si externe."""
+    if not image_path or not image_path.startswith(UPLOAD_URL_PREFIX):
+        return None
+    return image_path[len(UPLOAD_URL_PREFIX):] or None
+
+
+def count_image_references(db: Session, filename: str) -> int:
+    """Nombre de vins dont image_path désigne ce fichier."""
+    return (
+        db.query(models.Bottle)
+        .filter(models.Bottle.image_path == f"{UPLOAD_URL_PREFIX}{filename}")
+        .count()
+    )
+
+
+def _is_past_grace(filepath: Path, now: float) -> bool:
+    """Vrai si le fichier n'a pas été écrit ni réutilisé depuis le délai de grâce."""
+    return now - filepath.stat().st_mtime > UPLOAD_ORPHAN_GRACE_HOURS * 3600
+
+
+def release_image(db: Session, image_path: Optional[str]) -> bool:
+    """
+    Libère une image qui n'est plus utilisée par un vin.
+
+    Le fichier est supprimé s'il n'est plus référencé et a dépassé le délai
+    de grâce (un formulaire peut encore être en train de l'utiliser) ; sinon
+    le balayage périodique s'en chargera.
+    """
+    filename = _upload_filename(image_path)
+    if not filename:
+        return False
+
+    filepath = _resolve_upload(filename)
+    if filepath is None or not filepath.is_file():
+        return False
+    if count_image_references(db, filename) > 0:
+        return False
+    if not _is_past_grace(filepath, time.time()):
+        return False
+
+    return delete_image(filename)
+
+
+def sweep_orphan_images(db: Session) -> int:
+    """
+    Supprime les images d'UPLOAD_DIR qu'aucun vin ne référence plus.
+
+    Seuls les fichiers plus anciens que UPLOAD_ORPHAN_GRACE_HOURS sont
+    concernés, afin de ne pas supprimer un upload en attente d'enregistrement.
+    Les variantes dont l'original a disparu sont purgées au passage.
+
+    Returns:
+        Nombre d'images supprimées
+    """
+    referenced = {
+        _upload_filename(path)
+        for (path,) in db.query(models.Bottle.image_path)
+        .filter(models.Bottle.image_path.like(f"{UPLOAD_URL_PREFIX}%"))
+        .distinct()
+        .all()
+    }
+
+    now = time.time()
+    removed = 0
+    for entry in UPLOAD_DIR.iterdir():
+        if not entry.is_file() or entry.name.startswith("."):
+            continue
+        if entry.name in referenced or not _is_past_grace(entry, now):
+            continue
+        if delete_image(entry.name):
+            removed += 1
+
+    if IMAGE_VARIANT_DIR.is_dir():
+        originals = {entry.stem for entry in UPLOAD_DIR.iterdir() if entry.is_file()}
+        for variant in IMAGE_VARIANT_DIR.iterdir():
+            if variant.stem.rsplit("-w", 1)[0] not in originals:
+                variant.unlink(missing_ok=True)
+
+    return removed
+
+
 def upload_image_from_url(url: str) -> dict:
     """
     Télécharge une image depuis une URL et la sauvegarde localement.
@@ -250,33 +574,16 @@ def upload_image_from_url(url: str) -> dict:
                 f"Format non supporté. Formats acceptés: {', '.join(ALLOWED_EXTENSIONS)}"
             )
 
-        # Lire le contenu en streaming
-        content = b""
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                content += chunk
-                # Vérifier la taille pendant le téléchargement
-                if len(content) > MAX_FILE_SIZE_BYTES:
-                    raise InvalidUploadException(
-                        f"Fichier trop volumineux. Maximum: {MAX_FILE_SIZE_MB}MB"
-                    )
-
-        # Valider le contenu téléchargé
-        _validate_image_content(content)
-
-        # Convertir et compresser si nécessaire
-        content, final_ext = _convert_and_compress_image(content, ext)
-
-        # Générer un nom de fichier unique
-        filename = f"{uuid.uuid4()}{final_ext}"
-        filepath = UPLOAD_DIR / filename
-
-        # Sauvegarder le fichier
-        with open(filepath, "wb") as buffer:
-            buffer.write(content)
+        # Lire le contenu en streaming (taille et signature vérifiées au fil de l'eau)
+        tmp_path = _spool_stream(
+            response.iter_content(chunk_size=UPLOAD_CHUNK_SIZE), ext
+        )
 
-        return {"filename": filename, "path": f"/uploads/{filename}"}
+        # Convertir, compresser et sauvegarder
+        return _store_upload(tmp_path, ext)
 
+    except ServiceBusyException:
+        raise
     except requests.exceptions.Timeout:
         raise InvalidUploadException("Le téléchargement a pris trop de temps (timeout)")
     except requests.exceptions.RequestException as e:
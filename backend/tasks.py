@@ -0,0 +1,189 @@
+"""Tâches de fond de Pinarr (démarrées par le lifespan de l'application).
+
+Serveur multi-workers : un seul processus porte les tâches de fond, celui
+qui détient le verrou BACKGROUND_LOCK_FILE. Les autres retentent toutes les
+BACKGROUND_TAKEOVER_SECONDS et reprennent le relais quand il disparaît
+(recyclage, rechargement) : le verrou tombe avec le processus.
+"""
+
+import asyncio
+import os
+import threading
+
+from fastapi.concurrency import run_in_threadpool
+
+from config import (
+    BACKGROUND_LOCK_FILE,
+    BACKGROUND_TAKEOVER_SECONDS,
+    GEOCODE_SCAN_INTERVAL_MINUTES,
+    UPLOAD_SWEEP_INTERVAL_HOURS,
+)
+from database import SessionLocal
+from services import (
+    duplicate_index_is_stale,
+    geocode_pending_regions,
+    geocoding_stopped,
+    get_geocoder,
+    rebuild_duplicate_index,
+    rebuild_tag_index,
+    stop_geocoding,
+    sweep_orphan_images,
+    tag_index_is_stale,
+    wait_for_geocoding_request,
+)
+
+_geocoder_thread = None
+_lock_file = None
+
+
+def sweep_uploads() -> int:
+    """Supprime les images orphelines (appel bloquant, session dédiée)."""
+    db = SessionLocal()
+    try:
+        removed = sweep_orphan_images(db)
+        if removed:
+            print(f"[uploads] {removed} image(s) orpheline(s) supprimée(s)")
+        return removed
+    finally:
+        db.close()
+
+
+def ensure_duplicate_index() -> None:
+    """Reconstruit l'index de doublons s'il ne couvre pas tous les vins."""
+    db = SessionLocal()
+    try:
+        if duplicate_index_is_stale(db):
+            count = rebuild_duplicate_index(db)
+            print(f"[dedupe] index reconstruit ({count} vins)")
+    finally:
+        db.close()
+
+
+def ensure_tag_index() -> None:
+    """Reconstruit l'index des tags si des vins tagués n'y figurent pas."""
+    db = SessionLocal()
+    try:
+        if tag_index_is_stale(db):
+            count = rebuild_tag_index(db)
+            print(f"[tags] index reconstruit ({count} vins tagués)")
+    finally:
+        db.close()
+
+
+async def _sweep_uploads_periodically(interval: float) -> None:
+    """Boucle de balayage des uploads, hors de la boucle d'événements."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(sweep_uploads)
+        except Exception as e:
+            print(f"ERROR sweep_uploads: {e}")
+
+
+def _geocode_regions_forever() -> None:
+    """Unique consommateur de la file de géocodage (thread dédié).
+
+    Une passe au démarrage, puis à chaque nouvelle région signalée par
+    request_geocoding(), et au plus tard toutes les GEOCODE_SCAN_INTERVAL_MINUTES.
+    """
+    geocoder = get_geocoder()
+    while not geocoding_stopped():
+        db = SessionLocal()
+        try:
+            resolved = geocode_pending_regions(db, geocoder)
+            if resolved:
+                print(f"[geo] {resolved} région(s) géocodée(s)")
+        except Exception as e:
+            print(f"ERROR geocode_regions: {e}")
+        finally:
+            db.close()
+        wait_for_geocoding_request(GEOCODE_SCAN_INTERVAL_MINUTES * 60)
+
+
+def _acquire_background_lock() -> bool:
+    """Vrai si ce processus porte (désormais) les tâches de fond."""
+    global _lock_file
+    if _lock_file is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:  # pas de verrou de fichier : processus unique
+        return True
+
+    # Verrou POSIX (lockf) et non flock : il appartient au processus et n'est
+    # pas hérité par fork. Les workers des pools d'images et d'étiquettes,
+    # qui peuvent survivre au porteur tué par gunicorn, ne le retiennent pas.
+    lock_file = open(BACKGROUND_LOCK_FILE, "a")
+    try:
+        fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _lock_file = lock_file
+    return True
+
+
+def _ensure_indexes() -> None:
+    ensure_duplicate_index()
+    ensure_tag_index()
+
+
+def _start_owned_tasks(tasks: list) -> None:
+    """Démarre les tâches de fond dans ce processus (ajoutées à `tasks`)."""
+    if UPLOAD_SWEEP_INTERVAL_HOURS > 0:
+        tasks.append(
+            asyncio.create_task(
+                _sweep_uploads_periodically(UPLOAD_SWEEP_INTERVAL_HOURS * 3600)
+            )
+        )
+
+    global _geocoder_thread
+    _geocoder_thread = threading.Thread(
+        target=_geocode_regions_forever, name="pinarr-geocoder", daemon=True
+    )
+    _geocoder_thread.start()
+
+
+async def _take_over_background_tasks(tasks: list) -> None:
+    """Attend que le processus porteur disparaisse, puis reprend ses tâches."""
+    while not _acquire_background_lock():
+        await asyncio.sleep(BACKGROUND_TAKEOVER_SECONDS)
+    print(f"[tasks] tâches de fond reprises par le processus {os.getpid()}")
+    await run_in_threadpool(_ensure_indexes)
+    _start_owned_tasks(tasks)
+
+
+async def start_background_tasks() -> list:
+    """Lance les tâches périodiques et retourne leurs handles.
+
+    Le processus porteur vérifie d'abord les index dérivés (doublons, tags).
+    """
+    tasks = []
+    if _acquire_background_lock():
+        print(f"[tasks] tâches de fond portées par le processus {os.getpid()}")
+        await run_in_threadpool(_ensure_indexes)
+        _start_owned_tasks(tasks)
+    else:
+        tasks.append(asyncio.create_task(_take_over_background_tasks(tasks)))
+    return tasks
+
+
+async def stop_background_tasks(tasks: list) -> None:
+    """Annule les tâches périodiques et attend leur arrêt."""
+    stop_geocoding()
+    if _geocoder_thread is not None:
+        await run_in_threadpool(_geocoder_thread.join, 5)
+    # La liste peut s'allonger pendant l'annulation (reprise en cours)
+    while tasks:
+        pending = list(tasks)
+        tasks.clear()
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    # Libère le verrou sans attendre la fin du processus : un autre worker
+    # reprend les tâches pendant l'arrêt en douceur de celui-ci
+    global _lock_file
+    if _lock_file is not None:
+        _lock_file.close()
+        _lock_file = None
@@ -0,0 +1,129 @@
+"""Gazetteer embarqué des régions viticoles : nom → (latitude, longitude).
+
+Consulté avant tout géocodeur externe ; les noms saisis sont rapprochés
+après normalisation (casse, accents, ponctuation).
+"""
+
+WINE_REGIONS = {
+    # ── France : grandes régions ──
+    "Bordeaux": (44.8378, -0.5792),
+    "Bourgogne": (47.2805, 4.4107),
+    "Champagne": (49.2583, 4.0317),
+    "Loire": (47.3833, 0.6833),
+    "Val de Loire": (47.3833, 0.6833),
+    "Rhône": (45.7640, 4.8357),
+    "Vallée du Rhône": (45.7640, 4.8357),
+    "Côtes du Rhône": (45.7640, 4.8357),
+    "Provence": (43.9352, 6.0679),
+    "Alsace": (48.3076, 7.4698),
+    "Languedoc": (43.6047, 3.8868),
+    "Languedoc-Roussillon": (43.6047, 3.8868),
+    "Roussillon": (42.6736, 2.8799),
+    "Beaujolais": (46.1094, 4.6536),
+    "Sud-Ouest": (44.3512, 1.7517),
+    "Corse": (42.0396, 9.0129),
+    "Corsica": (42.0396, 9.0129),
+    "Jura": (47.0919, 5.6094),
+    "Savoie": (45.4942, 6.6800),
+    "Bugey": (45.8500, 5.6500),
+    # ── Bordelais ──
+    "Médoc": (45.2000, -0.8000),
+    "Haut-Médoc": (45.1000, -0.7500),
+    "Saint-Émilion": (44.9000, -0.1500),
+    "Pomerol": (44.9300, -0.1900),
+    "Margaux": (44.9500, -0.6700),
+    "Pauillac": (45.1800, -0.7400),
+    "Saint-Julien": (45.1200, -0.7600),
+    "Saint-Estèphe": (45.2600, -0.7700),
+    "Graves": (44.6500, -0.5500),
+    "Pessac-Léognan": (44.7500, -0.6500),
+    "Sauternes": (44.5300, -0.3500),
+    "Entre-deux-Mers": (44.7500, -0.3000),
+    # ── Bourgogne ──
+    "Chablis": (47.8200, 3.8000),
+    "Côte de Beaune": (47.0400, 4.8400),
+    "Côte de Nuits": (47.1700, 4.9500),
+    "Mâconnais": (46.3000, 4.8200),
+    "Côte Chalonnaise": (46.7800, 4.5200),
+    "Nuit-Saint-Georges": (47.1400, 4.9500),
+    "Gevrey-Chambertin": (47.2200, 4.9700),
+    "Vosne-Romanée": (47.1500, 4.9700),
+    "Pommard": (46.9800, 4.7900),
+    "Meursault": (46.9700, 4.7700),
+    "Puligny-Montrachet": (46.9500, 4.7500),
+    "Chassagne-Montrachet": (46.9300, 4.7300),
+    # ── Rhône ──
+    "Côte-Rôtie": (45.4800, 4.8000),
+    "Condrieu": (45.4600, 4.7700),
+    "Hermitage": (45.0700, 4.8400),
+    "Crozes-Hermitage": (45.1000, 4.8500),
+    "Cornas": (44.9600, 4.8500),
+    "Gigondas": (44.1600, 5.0000),
+    "Châteauneuf-du-Pape": (44.0600, 4.8300),
+    "Ardeche": (44.7500, 4.4000),
+    "Drome": (44.6500, 5.0000),
+    "Isere": (45.2000, 5.7000),
+    # ── Loire ──
+    "Sancerre": (47.3300, 2.8400),
+    "Pouilly-Fumé": (47.2900, 2.9600),
+    "Vouvray": (47.4100, 0.8000),
+    "Chinon": (47.1700, 0.2400),
+    "Saumur": (47.2600, -0.0800),
+    "Anjou": (47.4000, -0.6000),
+    "Muscadet": (47.1500, -1.4000),
+    # ── Provence, Languedoc, Roussillon ──
+    "Bandol": (43.1400, 5.7500),
+    "Banyuls": (42.4800, 3.1300),
+    "Collioure": (42.5200, 3.0800),
+    "Minervois": (43.3000, 2.7500),
+    "Corbières": (43.1000, 2.6000),
+    "Fitou": (42.9000, 2.6500),
+    "Cotes du Roussillon": (42.6500, 2.8500),
+    "Cotes Catalanes": (42.6000, 2.7000),
+    # ── Sud-Ouest ──
+    "Cahors": (44.4500, 1.4300),
+    "Gaillac": (43.9200, 1.9000),
+    "Fronton": (43.8400, 1.3800),
+    "Madiran": (43.4500, -0.0500),
+    "Jurançon": (43.2800, -0.4000),
+    # ── Europe ──
+    "Italie": (44.4949, 11.3426),
+    "Toscane": (43.3500, 11.0000),
+    "Chianti": (43.5500, 11.3000),
+    "Piémont": (44.7000, 8.0000),
+    "Barolo": (44.6100, 7.9400),
+    "Vénétie": (45.5000, 11.5000),
+    "Sicile": (37.6000, 14.0000),
+    "Espagne": (40.4637, -3.7492),
+    "Rioja": (42.4500, -2.4500),
+    "Ribera del Duero": (41.6500, -3.7000),
+    "Priorat": (41.2000, 0.8000),
+    "Portugal": (39.3999, -8.2245),
+    "Douro": (41.1500, -7.6000),
+    "Porto": (41.1500, -8.6100),
+    "Allemagne": (51.1657, 10.4515),
+    "Moselle": (49.9000, 7.0000),
+    "Rheingau": (50.0000, 8.0000),
+    "Suisse": (46.8000, 8.2000),
+    "Autriche": (47.5000, 14.5000),
+    "Hongrie": (47.1600, 19.5000),
+    "Tokaj": (48.1200, 21.4000),
+    "Grèce": (39.0700, 21.8000),
+    "Liban": (33.8500, 35.8600),
+    # ── Nouveau monde ──
+    "États-Unis": (37.0902, -95.7129),
+    "Californie": (36.7783, -119.4179),
+    "Napa Valley": (38.5000, -122.3000),
+    "Sonoma": (38.5000, -122.8000),
+    "Canada": (56.1300, -106.3500),
+    "Argentine": (-38.4161, -63.6167),
+    "Mendoza": (-32.9000, -68.8500),
+    "Chili": (-35.6751, -71.5430),
+    "Uruguay": (-32.5000, -55.8000),
+    "Australie": (-25.2744, 133.7751),
+    "Barossa": (-34.5500, 138.9500),
+    "Nouvelle-Zélande": (-40.9006, 174.8860),
+    "Marlborough": (-41.5000, 173.9000),
+    "Afrique du Sud": (-30.5595, 22.9375),
+    "Stellenbosch": (-33.9300, 18.8600),
+}
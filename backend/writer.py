@@ -0,0 +1,81 @@
+"""Écrivain unique de la base (mutations des routes).
+
+Les routes qui écrivent confient leur travail à run_write() : un thread
+dédié l'exécute sur sa propre connexion, une transaction après l'autre.
+Les écritures de l'API ne se disputent plus le verrou SQLite, les lectures
+(ReadSessionLocal) avancent en parallèle grâce au WAL, et une rafale de
+scans attend son tour dans la file au lieu d'échouer sur « database is locked ».
+
+Sous PostgreSQL, WRITE_WORKERS threads (DB_WRITE_WORKERS) écrivent en
+parallèle, chacun sur sa connexion ; les services verrouillent les lignes
+qu'ils modifient de façon concurrente (positions).
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from config import WRITE_QUEUE_LIMIT
+from database import WRITE_WORKERS, WriteSessionLocal
+from exceptions import ServiceBusyException
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Écritures en cours ou en attente
+_slots = threading.BoundedSemaphore(WRITE_QUEUE_LIMIT)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Crée le(s) thread(s) écrivain(s) à la première écriture."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=WRITE_WORKERS, thread_name_prefix="pinarr-writer"
+            )
+        return _executor
+
+
+def shutdown_writer() -> None:
+    """Termine les écritures en file puis arrête les écrivains (arrêt de l'application)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def _execute(fn: Callable[..., Any], args: tuple, response_model: Any) -> Any:
+    db: Session = WriteSessionLocal()
+    try:
+        result = fn(db, *args)
+        if response_model is not None:
+            # Sérialisé tant que la session est ouverte : les relations
+            # chargées à la demande (Position.bottle_id…) restent accessibles
+            result = TypeAdapter(response_model).validate_python(
+                result, from_attributes=True
+            )
+        return result
+    finally:
+        db.close()
+
+
+def run_write(fn: Callable[..., Any], *args, response_model: Any = None) -> Any:
+    """
+    Exécute fn(db, *args) dans le thread écrivain et retourne son résultat.
+
+    Appel bloquant, depuis une route synchrone (threadpool). Avec
+    `response_model`, le résultat est converti avant fermeture de la
+    session. Refuse l'écriture si WRITE_QUEUE_LIMIT écritures attendent déjà.
+    """
+    if not _slots.acquire(blocking=False):
+        raise ServiceBusyException(
+            "Trop d'écritures en attente, réessayez dans quelques instants"
+        )
+    try:
+        return _get_executor().submit(_execute, fn, args, response_model).result()
+    finally:
+        _slots.release()
@@ -68,8 +68,14 @@ except Exception as e:
 PYTHON_SCRIPT
 
 # ── Démarrage applications ──
-echo "Démarrage du backend..."
-python3 -m uvicorn main:app --host 0.0.0.0 --port 8000 &
+# SERVER=gunicorn : WEB_CONCURRENCY workers (défaut : un par cœur), app préchargée
+# SERVER=uvicorn  : processus unique
+echo "Démarrage du backend (${SERVER:-gunicorn})..."
+if [ "${SERVER:-gunicorn}" = "uvicorn" ]; then
+    python3 -m uvicorn main:app --host 0.0.0.0 --port 8000 &
+else
+    python3 -m gunicorn -c gunicorn.conf.py main:app &
+fi
 
 echo "Attente du backend..."
 sleep 3
@@ -1,39 +1,73 @@
-import { ref, computed, onMounted } from 'vue'
+import { ref, computed } from 'vue'
 import BottleService from '../services/bottleService.js'
 
+const PAGE_SIZE = 60
+
 /**
  * Composable pour la gestion des bouteilles
+ *
+ * Le filtrage, le tri et les totaux sont calculés par l'API : seule la page
+ * courante est chargée, les suivantes à la demande via le curseur.
  * @returns {Object} - État et méthodes pour les bouteilles
  */
 export function useBottles() {
   const bottles = ref([])
+  const facets = ref(null)
+  const nextCursor = ref(null)
   const loading = ref(false)
   const error = ref(null)
 
-  const totalBottles = computed(() => 
-    bottles.value.reduce((acc, b) => acc + (b.quantity || 0), 0)
-  )
+  let currentParams = {}
+  // Ignore les réponses d'une sélection remplacée entre-temps
+  let requestId = 0
+
+  const totalBottles = computed(() => facets.value?.bottle_count || 0)
 
-  const totalValue = computed(() => 
-    bottles.value.reduce((acc, b) => acc + ((b.price || 0) * (b.quantity || 0)), 0).toFixed(2)
-  )
+  const totalValue = computed(() => (facets.value?.total_value || 0).toFixed(2))
 
-  async function fetchBottles() {
+  async function fetchBottles(params = currentParams) {
+    currentParams = params
+    const id = ++requestId
     loading.value = true
     error.value = null
-    
+
+    try {
+      const page = await BottleService.getPage({ ...params, limit: PAGE_SIZE, facets: true })
+      if (id !== requestId) return
+      bottles.value = page.items
+      facets.value = page.facets
+      nextCursor.value = page.next_cursor
+    } catch (err) {
+      if (id === requestId) error.value = err.message || 'Erreur lors du chargement des bouteilles'
+    } finally {
+      if (id === requestId) loading.value = false
+    }
+  }
+
+  async function loadMore() {
+    if (!nextCursor.value || loading.value) return
+    const id = requestId
+    loading.value = true
+
     try {
-      bottles.value = await BottleService.getAll()
+      const page = await BottleService.getPage({
+        ...currentParams,
+        limit: PAGE_SIZE,
+        after_id: nextCursor.value,
+      })
+      if (id !== requestId) return
+      bottles.value = [...bottles.value, ...page.items]
+      nextCursor.value = page.next_cursor
     } catch (err) {
       error.value = err.message || 'Erreur lors du chargement des bouteilles'
     } finally {
-      loading.value = false
+      if (id === requestId) loading.value = false
     }
   }
 
   async function deleteBottle(id) {
     if (!confirm('Voulez-vous vraiment supprimer cette bouteille ?')) return
-    
+
     try {
       await BottleService.delete(id)
       bottles.value = bottles.value.filter(b => b.id !== id)
@@ -44,7 +78,7 @@ export function useBottles() {
 
   async function updateQuantity(id, newQuantity) {
     if (newQuantity < 0) return
-    
+
     try {
       await BottleService.updateQuantity(id, newQuantity)
       const bottle = bottles.value.find(b => b.id === id)
@@ -54,15 +88,16 @@ export function useBottles() {
     }
   }
 
-  onMounted(fetchBottles)
-
   return {
     bottles,
+    facets,
+    nextCursor,
     loading,
     error,
     totalBottles,
     totalValue,
     fetchBottles,
+    loadMore,
     deleteBottle,
     updateQuantity,
   }
@@ -4,6 +4,20 @@ import { apiRequest, API_BASE_URL } from './api.js'
  * Service pour la gestion des bouteilles
  */
 
+/**
+ * Sérialise les paramètres de requête en ignorant les valeurs vides
+ * (after_id vide est conservé : il demande la première page)
+ */
+function toQuery(params) {
+  const query = new URLSearchParams()
+  Object.entries(params).forEach(([key, value]) => {
+    if (value === null || value === undefined) return
+    if (value === '' && key !== 'after_id') return
+    query.append(key, value)
+  })
+  return query
+}
+
 const BottleService = {
   /**
    * Récupère toutes les bouteilles
@@ -15,6 +29,34 @@ const BottleService = {
     return await apiRequest(`/bottles?skip=${skip}&limit=${limit}`)
   },
 
+  /**
+   * Récupère une page du catalogue, filtrée et triée côté serveur
+   * @param {Object} params - Filtres (type, region, tag, q, status…), sort, after_id, limit, facets
+   * @returns {Promise<Object>} - { items, next_cursor, facets? }
+   */
+  async getPage(params = {}) {
+    const query = toQuery({ after_id: '', ...params })
+    return await apiRequest(`/bottles?${query}`)
+  },
+
+  /**
+   * Récupère les totaux et facettes d'une sélection
+   * @param {Object} params - Mêmes filtres que getPage
+   * @returns {Promise<Object>} - { wine_count, bottle_count, total_value, status, type, … }
+   */
+  async getFacets(params = {}) {
+    return await apiRequest(`/bottles/facets?${toQuery(params)}`)
+  },
+
+  /**
+   * Récupère les tags utilisés, du plus courant au moins courant
+   * @param {string} [prefix] - Début du tag (autocomplétion)
+   * @returns {Promise<Array>} - [{ name, count }]
+   */
+  async getTags(prefix) {
+    return await apiRequest(`/tags?${toQuery({ prefix })}`)
+  },
+
   /**
    * Récupère une bouteille par ID
    * @param {number} id - ID de la bouteille
@@ -77,10 +119,13 @@ const BottleService = {
    * Vérifie les doublons
    * @param {string} name - Nom de la bouteille
    * @param {number} year - Millésime
-   * @returns {Promise<Object>} - Résultat de la recherche
+   * @param {string} [domaine] - Domaine (affine le score)
+   * @returns {Promise<Object>} - Candidats notés (score 0..1)
    */
-  async checkDuplicate(name, year) {
-    return await apiRequest(`/bottles/check-duplicate/?name=${encodeURIComponent(name)}&year=${year}`)
+  async checkDuplicate(name, year, domaine) {
+    const params = new URLSearchParams({ name, year })
+    if (domaine) params.append('domaine', domaine)
+    return await apiRequest(`/bottles/check-duplicate/?${params}`)
   },
 
   /**
@@ -24,6 +24,15 @@ const CaveService = {
     return await apiRequest(`/caves/${id}`)
   },
 
+  /**
+   * Récupère la grille d'occupation compacte d'une cave
+   * @param {number} id - ID de la cave
+   * @returns {Promise<Object>} - Grille (slots par rangée + dictionnaire des vins)
+   */
+  async getGrid(id) {
+    return await apiRequest(`/caves/${id}/grid`)
+  },
+
   /**
    * Crée une nouvelle cave
    * @param {Object} caveData - Données de la cave
@@ -24,10 +24,12 @@ fi
 echo "📦 Création du backup: $BACKUP_NAME.sql.gz..."
 sqlite3 "$DATABASE_FILE" ".backup /tmp/backup_temp.db" 2>/dev/null || true
 
-# Si sqlite3 backup échoue, copier directement
+# Si la CLI sqlite3 est absente, passer par l'API de backup de Python
+# (une copie du fichier seul perdrait les écritures encore dans le journal WAL)
 if [ ! -f "/tmp/backup_temp.db" ]; then
-    echo "📋 Copie directe de la base..."
-    cp "$DATABASE_FILE" "/tmp/backup_temp.db"
+    echo "📋 Backup via Python..."
+    python3 -c 'import sqlite3, sys; src = sqlite3.connect(sys.argv[1]); dst = sqlite3.connect(sys.argv[2]); src.backup(dst); dst.close(); src.close()' \
+        "$DATABASE_FILE" "/tmp/backup_temp.db"
 fi
 
 # Compresser
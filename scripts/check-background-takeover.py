@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Contrôle de la reprise des tâches de fond quand leur porteur est tué
+
+Un processus « porteur » prend le verrou des tâches de fond puis occupe
+les pools d'images et d'étiquettes. Il est tué par SIGKILL, comme le fait
+le timeout de gunicorn : ses workers de pool lui survivent, et le verrou
+doit pourtant être repris aussitôt par un autre processus.
+
+Usage : python3 scripts/check-background-takeover.py   (code retour 1 si échec)
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Base et répertoire d'exécution jetables : à définir avant tout import de config.py
+# (partagés avec les processus lancés par ce script, d'où PINARR_TAKEOVER_DIR)
+_workdir = os.environ.get("PINARR_TAKEOVER_DIR") or tempfile.mkdtemp(prefix="pinarr-takeover-")
+os.environ["PINARR_TAKEOVER_DIR"] = _workdir
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/takeover.db"
+os.environ["UPLOAD_DIR"] = f"{_workdir}/uploads"
+os.environ["RUN_DIR"] = _workdir
+os.environ.setdefault("IMAGE_WORKERS", "2")
+os.environ.setdefault("LABEL_WORKERS", "2")
+
+sys.path.insert(0, "/app/backend")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+TAKEOVER_DEADLINE_SECONDS = 5
+
+
+def _leader() -> None:
+    """Prend le verrou, occupe les deux pools et affiche les PID de leurs workers."""
+    import tasks
+    from services import label_service, upload_service
+
+    if not tasks._acquire_background_lock():
+        print("verrou indisponible", flush=True)
+        return
+
+    pids = []
+    for executor in (upload_service._get_executor(), label_service._get_executor()):
+        executor.submit(time.sleep, 3600)
+        pids.extend(executor._processes)
+    print(" ".join(str(pid) for pid in pids), flush=True)
+    time.sleep(3600)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def _try_acquire() -> bool:
+    """Tente de prendre le verrou depuis un processus neuf (un autre worker)."""
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, tasks; sys.exit(0 if tasks._acquire_background_lock() else 1)"],
+        cwd=str(Path(__file__).resolve().parent.parent / "backend"),
+        capture_output=True,
+    )
+    return result.returncode == 0
+
+
+def main() -> int:
+    leader = subprocess.Popen(
+        [sys.executable, __file__, "--leader"], stdout=subprocess.PIPE, text=True
+    )
+    pool_pids = []
+    try:
+        line = leader.stdout.readline().strip()
+        if not line or not line.replace(" ", "").isdigit():
+            print(f"✗ le porteur n'a pas démarré ses pools ({line or 'aucune sortie'})")
+            return 1
+        pool_pids = [int(pid) for pid in line.split()]
+        print(f"✓ porteur {leader.pid}, workers de pool {pool_pids}")
+
+        if _try_acquire():
+            print("✗ verrou pris par un second processus alors que le porteur vit")
+            return 1
+        print("✓ verrou refusé aux autres processus tant que le porteur vit")
+
+        leader.send_signal(signal.SIGKILL)
+        leader.wait()
+        survivors = [pid for pid in pool_pids if _alive(pid)]
+        print(f"  porteur tué, {len(survivors)} worker(s) de pool encore en vie")
+
+        deadline = time.monotonic() + TAKEOVER_DEADLINE_SECONDS
+        while not _try_acquire():
+            if time.monotonic() > deadline:
+                print(f"✗ verrou toujours retenu {TAKEOVER_DEADLINE_SECONDS} s après la mort du porteur")
+                return 1
+            time.sleep(0.2)
+        print("✓ verrou repris par un autre processus")
+        return 0
+    finally:
+        if leader.poll() is None:
+            leader.kill()
+            leader.wait()
+        for pid in pool_pids:
+            if _alive(pid):
+                os.kill(pid, signal.SIGKILL)
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--leader"]:
+        _leader()
+    else:
+        sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Contrôle de la passe de géocodage face aux erreurs réseau
+
+Joue geocode_pending_regions sur une base SQLite jetable avec un géocodeur
+factice : une région en erreur réseau est sautée sans entrer dans le cache
+négatif, les autres sont résolues ; la passe ne s'interrompt qu'après
+GEOCODE_MAX_NETWORK_ERRORS erreurs consécutives.
+
+Usage : python3 scripts/check-geocode-network-errors.py   (code retour 1 si échec)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Base jetable : à définir avant tout import de database.py
+_workdir = tempfile.mkdtemp(prefix="pinarr-geocode-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/geocode.db"
+os.environ["UPLOAD_DIR"] = f"{_workdir}/uploads"
+os.environ["RUN_DIR"] = _workdir
+os.environ["GEOCODER_MIN_INTERVAL"] = "0"
+
+sys.path.insert(0, "/app/backend")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import requests  # noqa: E402
+
+import models  # noqa: E402
+import schemas  # noqa: E402
+from config import GEOCODE_MAX_NETWORK_ERRORS  # noqa: E402
+from database import SessionLocal, create_db_tables  # noqa: E402
+from services import bottle_service, geo_service  # noqa: E402
+
+# Noms absents du gazetteer embarqué : seul le géocodeur factice les résout
+REGIONS = ("Zarvelle", "Quintobre", "Morsignac", "Brevaulx", "Oltrepan")
+
+
+class StubGeocoder:
+    """Résout toute région, sauf celles de `failing` (erreur réseau)."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.regions = []
+
+    def geocode(self, query):
+        region = query.split(",")[0]
+        self.regions.append(region)
+        if region in self.failing:
+            raise requests.ConnectionError(f"timeout pour {region}")
+        return (45.0, 2.0)
+
+
+def _check(name, ok, detail=""):
+    print(f"{'✓' if ok else '✗'} {name}{f' ({detail})' if detail else ''}")
+    return ok
+
+
+def _reset(db):
+    db.query(models.GeocodedRegion).delete()
+    db.query(models.GeocodeMiss).delete()
+    db.commit()
+
+
+def main() -> int:
+    create_db_tables()
+    db = SessionLocal()
+    try:
+        for region in REGIONS:
+            bottle_service.create_bottle(db, schemas.BottleCreate(name=f"Vin de {region}", region=region))
+
+        results = []
+
+        # Une région en erreur : sautée, les autres résolues, aucun cache négatif
+        failing = REGIONS[0]
+        resolved = geo_service.geocode_pending_regions(db, StubGeocoder(failing=[failing]))
+        misses = [m.name for m in db.query(models.GeocodeMiss)]
+        results.append(_check(
+            "une erreur réseau ne saute que sa région",
+            resolved == len(REGIONS) - 1, f"{resolved}/{len(REGIONS) - 1} résolues",
+        ))
+        results.append(_check("région en erreur hors du cache négatif", not misses, f"misses={misses}"))
+        results.append(_check(
+            "région en erreur retentée à la passe suivante",
+            geo_service.get_pending_regions(db) == [failing],
+        ))
+        _reset(db)
+
+        # Erreurs en série : la passe s'arrête après GEOCODE_MAX_NETWORK_ERRORS régions
+        geocoder = StubGeocoder(failing=REGIONS)
+        try:
+            geo_service.geocode_pending_regions(db, geocoder)
+            raised = False
+        except requests.RequestException:
+            raised = True
+        tried = len(set(geocoder.regions))
+        results.append(_check(
+            "passe interrompue après erreurs consécutives",
+            raised and tried == GEOCODE_MAX_NETWORK_ERRORS,
+            f"{tried} région(s) tentée(s), erreur relancée : {raised}",
+        ))
+    finally:
+        db.close()
+        shutil.rmtree(_workdir, ignore_errors=True)
+
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
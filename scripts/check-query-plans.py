@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Contrôle des plans d'exécution des requêtes des services Pinarr
+
+Crée une base SQLite jetable au schéma courant, y joue les fonctions des
+services, capture chaque requête émise et passe son EXPLAIN QUERY PLAN.
+Tout parcours complet (SCAN) d'une table est une erreur, sauf pour les
+cas qui lisent volontairement toute une table (listes, balayages, index
+reconstruits) et le déclarent.
+
+Usage : python3 scripts/check-query-plans.py   (code retour 1 si régression)
+"""
+
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# Base jetable : à définir avant tout import de database.py
+_workdir = tempfile.mkdtemp(prefix="pinarr-plans-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/plans.db"
+os.environ.setdefault("UPLOAD_DIR", f"{_workdir}/uploads")
+
+sys.path.insert(0, "/app/backend")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from sqlalchemy import event, text  # noqa: E402
+
+import models  # noqa: E402
+import schemas  # noqa: E402
+from database import SessionLocal, create_db_tables, engine  # noqa: E402
+from services import bottle_service, cave_service, catalog_service  # noqa: E402
+from services import duplicate_service, geo_service, label_service  # noqa: E402
+from services import physical_bottle_service, tag_service, upload_service  # noqa: E402
+
+TABLES = set(models.Base.metadata.tables)
+_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+def _scanned_table(detail: str):
+    """Table réelle parcourue par une ligne de plan, None sinon."""
+    match = _SCAN.match(detail)
+    if not match or "VIRTUAL TABLE" in detail:
+        return None
+    # Les alias SQLAlchemy (physical_bottles_1) désignent la même table
+    name = re.sub(r"_\d+$", "", match.group(1))
+    return name if name in TABLES else None
+
+
+class Recorder:
+    """Capture les requêtes émises pendant l'exécution d'un cas."""
+
+    def __init__(self):
+        self.statements = []
+        self.active = False
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        head = statement.lstrip().split(None, 1)[0].upper()
+        if self.active and not executemany and head in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            self.statements.append((statement, parameters))
+
+
+def _explain(statement, parameters):
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        raw.close()
+
+
+def _seed(db):
+    """Une cave, une rangée, trois vins placés ou non, des tags et une région."""
+    cave = cave_service.create_cave(db, schemas.CaveCreate(name="Cave"))
+    column = cave_service.create_column(db, cave.id, schemas.CaveColumnCreate(name="A"))
+    row = cave_service.create_row(
+        db, column.id, schemas.CaveRowCreate(name="R1", width=4, height=2)
+    )
+    wines = [
+        bottle_service.create_bottle(db, schemas.BottleCreate(**data))
+        for data in (
+            {"name": "Château Margaux", "year": 2015, "quantity": 3, "type": "Rouge",
+             "region": "Margaux", "country": "France", "tags": "garde, cadeau",
+             "image_path": "/uploads/margaux.webp"},
+            {"name": "Chablis", "year": 2020, "quantity": 2, "type": "Blanc",
+             "region": "Chablis", "tags": "apéro"},
+            {"name": "Sancerre", "year": 2019, "quantity": 1, "type": "Blanc"},
+        )
+    ]
+    positions = cave_service.get_positions_for_row(db, row.id)
+    cave_service.assign_bottle_to_position(db, positions[0].id, wines[0].id)
+    cave_service.assign_bottle_to_position(db, positions[1].id, wines[1].id)
+    geo_service.create_geocoded_region(
+        db, schemas.GeocodedRegionCreate(name="Margaux", lat=44.95, lon=-0.67)
+    )
+    return cave, column, row, wines, positions
+
+
+def _cases(cave, column, row, wines, positions):
+    """(nom, appel, tables dont le parcours complet est voulu)."""
+    margaux, chablis, sancerre = wines
+    filters = schemas.BottleFilters
+    pb_of = lambda db, wine: db.query(models.PhysicalBottle).filter(  # noqa: E731
+        models.PhysicalBottle.bottle_id == wine.id
+    ).first()
+
+    return [
+        # ── Vins ──
+        ("get_bottle_with_position",
+         lambda db: bottle_service.get_bottle_with_position(db, margaux.id), ()),
+        ("get_bottles_page (région)",
+         lambda db: bottle_service.get_bottles_page(db, filters=filters(region="Margaux")), ()),
+        ("get_bottles_page (millésime)",
+         lambda db: bottle_service.get_bottles_page(db, filters=filters(year=2015)), ()),
+        ("get_bottles_page (tag)",
+         lambda db: bottle_service.get_bottles_page(db, filters=filters(tag="garde")), ()),
+        # Parcours du catalogue dans l'ordre des ID : lecture paginée voulue
+        ("get_bottles_page (tout)",
+         lambda db: bottle_service.get_bottles_page(db), ("bottles",)),
+        ("get_bottles_with_positions",
+         lambda db: bottle_service.get_bottles_with_positions(db), ("bottles",)),
+        ("get_bottle_facets (type)",
+         lambda db: catalog_service.get_bottle_facets(db, filters(type="Blanc")), ()),
+        ("get_bottle_facets (tag)",
+         lambda db: catalog_service.get_bottle_facets(db, filters(tag="apéro")), ()),
+        # Compteurs de toute la cave : agrégats sur toutes les lignes
+        ("get_bottle_facets (tout)",
+         lambda db: catalog_service.get_bottle_facets(db),
+         ("bottles", "physical_bottles", "bottle_tags")),
+        ("search_bottles_by_name",
+         lambda db: bottle_service.search_bottles_by_name(db, "marg"), ()),
+        ("check_duplicate_bottles",
+         lambda db: bottle_service.check_duplicate_bottles(db, "Ch. Margaux", 2015), ()),
+        ("validate_bottle_placement",
+         lambda db: bottle_service.validate_bottle_placement(db, sancerre.id), ()),
+        ("patch_bottle",
+         lambda db: bottle_service.patch_bottle(
+             db, chablis.id, schemas.BottlePatch(name="Petit Chablis", tags="apéro, bio", quantity=3)
+         ), ()),
+        ("update_bottle",
+         lambda db: bottle_service.update_bottle(
+             db, sancerre.id, schemas.BottleCreate(name="Sancerre", year=2019, quantity=0)
+         ), ()),
+        ("count_image_references",
+         lambda db: upload_service.count_image_references(db, "margaux.webp"), ()),
+        ("tags (préfixe)",
+         lambda db: tag_service.get_tags(db, prefix="ga"), ()),
+        # ── Bouteilles physiques ──
+        ("get_physical_bottle_by_qr",
+         lambda db: physical_bottle_service.get_physical_bottle_by_qr(db, pb_of(db, margaux).qr_code), ()),
+        ("get_physical_bottle_with_details",
+         lambda db: physical_bottle_service.get_physical_bottle_with_details(db, pb_of(db, margaux).id), ()),
+        ("get_bottle_physical_bottles",
+         lambda db: physical_bottle_service.get_bottle_physical_bottles(db, margaux.id), ()),
+        ("get_physical_bottle_count_in_cellar",
+         lambda db: physical_bottle_service.get_physical_bottle_count_in_cellar(db, margaux.id), ()),
+        ("generate_qr_codes_for_bottle",
+         lambda db: physical_bottle_service.generate_qr_codes_for_bottle(db, margaux.id, 2), ()),
+        ("move_physical_bottle",
+         lambda db: physical_bottle_service.move_physical_bottle(
+             db, pb_of(db, margaux).id, positions[2].id
+         ), ()),
+        ("remove_physical_bottle",
+         lambda db: physical_bottle_service.remove_physical_bottle(db, pb_of(db, chablis).id), ()),
+        ("label _get_cellar_qr_codes",
+         lambda db: label_service._get_cellar_qr_codes(db, margaux.id), ()),
+        # ── Caves ──
+        ("get_cave", lambda db: cave_service.get_cave(db, cave.id), ()),
+        ("get_cave_grid", lambda db: cave_service.get_cave_grid(db, cave.id), ()),
+        ("get_positions_for_row",
+         lambda db: cave_service.get_positions_for_row(db, row.id), ()),
+        ("get_or_create_position",
+         lambda db: cave_service.get_or_create_position(db, row.id, 1, 1), ()),
+        ("assign_bottle_to_position",
+         lambda db: cave_service.assign_bottle_to_position(db, positions[3].id, margaux.id), ()),
+        ("remove_bottle_from_position",
+         lambda db: cave_service.remove_bottle_from_position(db, positions[3].id), ()),
+        ("consume_bottle_from_position",
+         lambda db: cave_service.consume_bottle_from_position(db, positions[0].id), ()),
+        ("update_row",
+         lambda db: cave_service.update_row(
+             db, row.id, schemas.CaveRowCreate(name="R1", width=3, height=3)
+         ), ()),
+        ("update_column",
+         lambda db: cave_service.update_column(db, column.id, schemas.CaveColumnCreate(name="B")), ()),
+        ("sync_position_locations (cave)",
+         lambda db: cave_service.sync_position_locations(db, cave_id=cave.id), ()),
+        # Liste de toutes les caves
+        ("get_caves", lambda db: cave_service.get_caves(db), ("caves",)),
+        # ── Carte ──
+        # Agrégat par région : sans statistiques (ANALYZE), SQLite ne sait pas
+        # la boîte sélective et part du catalogue, joint par l'index unique du nom
+        ("get_map_regions (bbox)",
+         lambda db: geo_service.get_map_regions(db, bbox=(-1.0, 44.0, 1.0, 46.0)),
+         ("geocoded_regions", "bottles")),
+        # Tâches de fond : balayages complets par construction
+        ("get_pending_regions",
+         lambda db: geo_service.get_pending_regions(db),
+         ("bottles", "geocoded_regions", "geocode_misses")),
+        ("duplicate_index_is_stale",
+         lambda db: duplicate_service.duplicate_index_is_stale(db),
+         ("bottles", "bottle_ngrams")),
+        ("tag_index_is_stale",
+         lambda db: tag_service.tag_index_is_stale(db), ("bottles",)),
+        ("delete_bottle",
+         lambda db: bottle_service.delete_bottle(db, sancerre.id), ()),
+        ("delete_row", lambda db: cave_service.delete_row(db, row.id), ()),
+    ]
+
+
+def main() -> int:
+    create_db_tables()
+    recorder = Recorder()
+    event.listen(engine, "before_cursor_execute", recorder)
+
+    db = SessionLocal()
+    try:
+        cases = _cases(*_seed(db))
+        failures = 0
+        for name, call, allowed in cases:
+            recorder.statements.clear()
+            recorder.active = True
+            try:
+                call(db)
+            finally:
+                recorder.active = False
+                db.rollback()
+
+            scans = []
+            for statement, parameters in recorder.statements:
+                for detail in _explain(statement, parameters):
+                    table = _scanned_table(detail)
+                    if table and table not in allowed:
+                        scans.append((detail, " ".join(statement.split())))
+            if scans:
+                failures += 1
+                print(f"✗ {name}")
+                for detail, statement in scans:
+                    print(f"    {detail}\n      {statement[:200]}")
+            else:
+                print(f"✓ {name} ({len(recorder.statements)} requêtes)")
+    finally:
+        db.close()
+
+    print(f"\n{len(cases) - failures}/{len(cases)} cas sans parcours complet")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,7 +15,8 @@ sys.path.insert(0, "/app/backend")
 
 try:
     from database import engine, Base, SessionLocal
-    from sqlalchemy import text
+    from models import User
+    from sqlalchemy import inspect, text
 
     print("✅ Connexion à la base de données réussie")
 except Exception as e:
@@ -48,34 +49,17 @@ def init_admin():
     try:
         with SessionLocal() as db:
             # Vérifier si la table users existe
-            result = db.execute(
-                text("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='users'
-            """)
-            ).fetchone()
-
-            if not result:
+            if not inspect(engine).has_table("users"):
                 print("📋 Création de la table users...")
-                db.execute(
-                    text("""
-                    CREATE TABLE users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT UNIQUE NOT NULL,
-                        password_hash TEXT NOT NULL,
-                        is_admin BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                )
-                db.commit()
+                User.__table__.create(bind=engine)
                 print("✅ Table users créée")
 
             # Vérifier si un admin existe déjà
             result = db.execute(
                 text("""
-                SELECT id FROM users WHERE is_admin = 1 LIMIT 1
-            """)
+                SELECT id FROM users WHERE is_admin = :is_admin LIMIT 1
+            """),
+                {"is_admin": True},
             ).fetchone()
 
             if result:
@@ -87,9 +71,13 @@ def init_admin():
             db.execute(
                 text("""
                 INSERT INTO users (username, password_hash, is_admin)
-                VALUES (:username, :password_hash, 1)
+                VALUES (:username, :password_hash, :is_admin)
             """),
-                {"username": admin_username, "password_hash": password_hash},
+                {
+                    "username": admin_username,
+                    "password_hash": password_hash,
+                    "is_admin": True,
+                },
             )
             db.commit()
 